@@ -3,18 +3,219 @@
 Odoo XML-RPC Client (Python)
 Client affidabile per chiamate Odoo usando xmlrpc.client nativo
 Funziona 100% - testato e verificato
+
+Versione ridotta, per un processo per comando con chiamate in sequenza, di
+odoo_ubs_banking/odoo_limiter.py, odoo_session.py e odoo_metrics.py (non
+inclusi nell'immagine Jetson):
+- le letture fallite per sovraccarico (429/502/503/504, timeout) vengono
+  ripetute con attesa esponenziale casuale; le scritture solo se rifiutate
+  prima dell'esecuzione (429/503)
+- il uid autenticato viene salvato (senza password) in ODOO_SESSION_CACHE e
+  riusato per ODOO_SESSION_TTL secondi; se Odoo lo rifiuta si autentica di nuovo
+- ODOO_METRICS=1 stampa su stderr chiamate, record, byte e durata p50/p95/p99
+  per modello.metodo a fine comando; ODOO_METRICS_FILE salva l'export (".prom"
+  = testo Prometheus come odoo_metrics.py, altrimenti una riga JSON aggiunta
+  per comando)
 """
 
 import xmlrpc.client
 import ssl
+import atexit
 import json
+import math
+import random
+import socket
 import sys
 import os
+import time
 from typing import Dict, List, Any, Optional
 
 # Disable SSL certificate verification (per ambienti dev Odoo)
 ssl._create_default_https_context = ssl._create_unverified_context
 
+# Cache uid tra esecuzioni (un processo per comando)
+SESSION_CACHE_FILE = os.getenv(
+    'ODOO_SESSION_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'odoo-client-sessions.json')
+)
+SESSION_TTL = float(os.getenv('ODOO_SESSION_TTL', '86400'))
+
+# Ripetizioni delle chiamate fallite per sovraccarico
+RETRIES = int(os.getenv('ODOO_RETRIES', '3'))
+RETRY_BACKOFF = 0.5
+
+# Metodi senza effetti: ripetibili dopo un sovraccarico
+READ_METHODS = frozenset({
+    'search', 'search_read', 'search_count', 'read', 'read_group', 'fields_get',
+    'name_search', 'name_get', 'default_get', 'check_access_rights',
+})
+
+# Percentili calcolati per ogni modello.metodo
+QUANTILES = (0.5, 0.95, 0.99)
+
+# Byte inviati/ricevuti dal processo (trasporti con conteggio)
+_io = {'sent': 0, 'received': 0}
+
+
+def _load_sessions() -> Dict[str, Dict[str, Any]]:
+    try:
+        with open(SESSION_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _save_session(key: str, uid: Optional[int]) -> None:
+    """Salva (o elimina con uid=None) il uid di key; errori di scrittura ignorati"""
+    now = time.time()
+    sessions = {k: v for k, v in _load_sessions().items() if v.get('expires', 0) > now}
+    if uid:
+        sessions[key] = {'uid': uid, 'expires': now + SESSION_TTL}
+    else:
+        sessions.pop(key, None)
+    temp_path = f"{SESSION_CACHE_FILE}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(os.path.dirname(SESSION_CACHE_FILE) or '.', exist_ok=True)
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w') as f:
+            json.dump(sessions, f)
+        os.replace(temp_path, SESSION_CACHE_FILE)
+    except OSError:
+        pass
+
+
+def _overload_status(error: Exception) -> Optional[int]:
+    """Stato HTTP di sovraccarico (0 per timeout/connessione), None se errore applicativo"""
+    if isinstance(error, xmlrpc.client.ProtocolError):
+        return error.errcode if error.errcode in (429, 502, 503, 504) else None
+    if isinstance(error, (socket.timeout, TimeoutError, ConnectionError)):
+        return 0
+    return None
+
+
+def _call_with_retry(function, idempotent: bool) -> Any:
+    """Esegue function ripetendola dopo un sovraccarico (letture sempre, scritture solo se 429/503)"""
+    for attempt in range(RETRIES + 1):
+        try:
+            return function()
+        except Exception as e:
+            status = _overload_status(e)
+            if status is None or attempt >= RETRIES or not (idempotent or status in (429, 503)):
+                raise
+        time.sleep(random.uniform(0, RETRY_BACKOFF * 2 ** attempt))
+
+
+class _MeteredMixin:
+    """Conta i byte di richieste e risposte XML-RPC"""
+
+    def send_content(self, connection, request_body):
+        _io['sent'] += len(request_body)
+        super().send_content(connection, request_body)
+
+    def parse_response(self, response):
+        data = response.read()
+        _io['received'] += len(data)
+        if response.getheader('Content-Encoding', '') == 'gzip':
+            data = xmlrpc.client.gzip_decode(data)
+        parser, unmarshaller = self.getparser()
+        parser.feed(data)
+        parser.close()
+        return unmarshaller.close()
+
+
+class _MeteredTransport(_MeteredMixin, xmlrpc.client.Transport):
+    pass
+
+
+class _MeteredSafeTransport(_MeteredMixin, xmlrpc.client.SafeTransport):
+    pass
+
+
+def _server_proxy(url: str) -> xmlrpc.client.ServerProxy:
+    transport = _MeteredSafeTransport() if url.startswith('https') else _MeteredTransport()
+    return xmlrpc.client.ServerProxy(url, transport=transport)
+
+
+def _record_count(method: str, args: list, result: Any) -> int:
+    # Record letti (lista restituita) o scritti (lista di id o di valori nel primo argomento)
+    if isinstance(result, list):
+        return len(result)
+    if method in READ_METHODS or result is None:
+        return 0
+    if args and isinstance(args[0], list):
+        return len(args[0])
+    return 1
+
+
+def _summarize(calls: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """Totali e p50/p95/p99 (secondi) per modello.metodo, per tempo totale decrescente"""
+    result = {}
+    for name, entry in sorted(calls.items(), key=lambda item: -item[1]['seconds']):
+        durations = sorted(entry['durations'])
+        summary = {key: value for key, value in entry.items() if key != 'durations'}
+        summary['seconds'] = round(entry['seconds'], 6)
+        for quantile in QUANTILES:
+            # Percentile "nearest rank" (tutte le durate: poche chiamate per comando)
+            value = durations[max(0, math.ceil(quantile * len(durations)) - 1)] if durations else 0.0
+            summary[f"p{int(quantile * 100)}"] = round(value, 6)
+        result[name] = summary
+    return result
+
+
+def _to_prometheus(summary: Dict[str, Dict[str, Any]]) -> str:
+    """Metriche nel formato testo di Prometheus (stessi nomi di odoo_metrics.py)"""
+    lines = [
+        '# HELP odoo_rpc_duration_seconds Durata delle chiamate RPC Odoo',
+        '# TYPE odoo_rpc_duration_seconds summary',
+    ]
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+    labels = {name: 'model="{}",method="{}"'.format(*map(escape, name.rsplit('.', 1))) for name in summary}
+    for name, entry in summary.items():
+        for quantile in QUANTILES:
+            lines.append(f'odoo_rpc_duration_seconds{{{labels[name]},quantile="{quantile}"}} '
+                         f'{entry[f"p{int(quantile * 100)}"]}')
+        lines.append(f"odoo_rpc_duration_seconds_sum{{{labels[name]}}} {entry['seconds']}")
+        lines.append(f"odoo_rpc_duration_seconds_count{{{labels[name]}}} {entry['calls']}")
+
+    counters = (
+        ('odoo_rpc_errors_total', 'errors', 'Chiamate RPC Odoo fallite'),
+        ('odoo_rpc_records_total', 'records', 'Record letti o scritti'),
+        ('odoo_rpc_request_bytes_total', 'sent_bytes', 'Byte inviati a Odoo'),
+        ('odoo_rpc_response_bytes_total', 'received_bytes', 'Byte ricevuti da Odoo'),
+    )
+    for metric, field, description in counters:
+        lines.append(f"# HELP {metric} {description}")
+        lines.append(f"# TYPE {metric} counter")
+        for name, entry in summary.items():
+            lines.append(f"{metric}{{{labels[name]}}} {entry[field]}")
+    return '\n'.join(lines) + '\n'
+
+
+def _report_calls(calls: Dict[str, Dict[str, Any]], table: bool, path: str) -> None:
+    """Tabella su stderr (stdout è la risposta JSON) e/o export su file"""
+    if not calls:
+        return
+    summary = _summarize(calls)
+    if table:
+        print(f"{'modello.metodo':<40} {'chiam.':>6} {'err':>4} {'record':>7} {'B inv':>8} {'B ric':>9} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}", file=sys.stderr)
+        for name, entry in summary.items():
+            print(f"{name:<40} {entry['calls']:>6} {entry['errors']:>4} {entry['records']:>7} "
+                  f"{entry['sent_bytes']:>8} {entry['received_bytes']:>9} {entry['p50'] * 1000:>8.1f} "
+                  f"{entry['p95'] * 1000:>8.1f} {entry['p99'] * 1000:>8.1f}", file=sys.stderr)
+    if path:
+        try:
+            if path.endswith('.prom'):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(_to_prometheus(summary))
+            else:
+                with open(path, 'a', encoding='utf-8') as f:
+                    f.write(json.dumps({'time': time.time(), 'command': sys.argv[1:2], 'calls': summary}) + '\n')
+        except OSError:
+            pass
+
+
 class OdooClient:
     def __init__(self, url: str, db: str, username: str, password: str):
         self.url = url
@@ -23,15 +224,34 @@ class OdooClient:
         self.password = password
         self.uid: Optional[int] = None
 
-        self.common = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/common")
-        self.models = xmlrpc.client.ServerProxy(f"{self.url}/xmlrpc/2/object")
-
-    def authenticate(self) -> int:
-        """Autentica e ottieni UID utente"""
-        if self.uid:
+        self.common = _server_proxy(f"{self.url}/xmlrpc/2/common")
+        self.models = _server_proxy(f"{self.url}/xmlrpc/2/object")
+        self._session_key = f"{self.url.rstrip('/')}|{self.db}|{self.username}"
+
+        # Per modello.metodo: totali {'calls', 'errors', 'records', 'sent_bytes', 'received_bytes', 'seconds'}
+        # e 'durations' di ogni chiamata (per i percentili)
+        self.calls: Dict[str, Dict[str, Any]] = {}
+        metrics_table = os.getenv('ODOO_METRICS', '0') == '1'
+        metrics_file = os.getenv('ODOO_METRICS_FILE', '')
+        if metrics_table or metrics_file:
+            atexit.register(_report_calls, self.calls, metrics_table, metrics_file)
+
+    def authenticate(self, refresh: bool = False) -> int:
+        """Autentica e ottieni UID utente (uid in cache se non scaduto, salvo refresh)"""
+        if self.uid and not refresh:
             return self.uid
 
-        self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+        if refresh:
+            self.uid = None
+            _save_session(self._session_key, None)
+        else:
+            cached = _load_sessions().get(self._session_key, {})
+            if cached.get('expires', 0) > time.time():
+                self.uid = cached.get('uid')
+        if not self.uid:
+            self.uid = self.common.authenticate(self.db, self.username, self.password, {})
+            if self.uid:
+                _save_session(self._session_key, self.uid)
 
         if not self.uid:
             raise Exception("Odoo authentication failed")
@@ -40,22 +260,52 @@ class OdooClient:
 
     def execute_kw(self, model: str, method: str, args: list = None, kwargs: dict = None) -> Any:
         """Esegui chiamata Odoo execute_kw"""
-        uid = self.authenticate()
-
         if args is None:
             args = []
         if kwargs is None:
             kwargs = {}
 
-        return self.models.execute_kw(
-            self.db,
-            uid,
-            self.password,
-            model,
-            method,
-            args,
-            kwargs
-        )
+        try:
+            return self._execute_kw(self.authenticate(), model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            # 3 = AccessDenied (uid in cache non più valido): nuova autenticazione, una volta
+            if e.faultCode != 3:
+                raise
+            return self._execute_kw(self.authenticate(refresh=True), model, method, args, kwargs)
+
+    def _execute_kw(self, uid: int, model: str, method: str, args: list, kwargs: dict) -> Any:
+        sent, received = _io['sent'], _io['received']
+        started = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = _call_with_retry(
+                lambda: self.models.execute_kw(
+                    self.db,
+                    uid,
+                    self.password,
+                    model,
+                    method,
+                    args,
+                    kwargs
+                ),
+                idempotent=method in READ_METHODS
+            )
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            entry = self.calls.setdefault(f"{model}.{method}", {
+                'calls': 0, 'errors': 0, 'records': 0, 'sent_bytes': 0, 'received_bytes': 0,
+                'seconds': 0.0, 'durations': []
+            })
+            entry['calls'] += 1
+            entry['errors'] += int(failed)
+            entry['records'] += _record_count(method, args, result)
+            entry['sent_bytes'] += _io['sent'] - sent
+            entry['received_bytes'] += _io['received'] - received
+            entry['seconds'] += seconds
+            entry['durations'].append(seconds)
 
     def create_partner(self, partner_data: Dict[str, Any]) -> int:
         """
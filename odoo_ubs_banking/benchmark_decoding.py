@@ -0,0 +1,112 @@
+"""
+Micro-benchmark decodifica importi/date UBS (righe al secondo)
+
+Confronta la conversione originale (str.replace + float, strptime/strftime
+per ogni riga) con swiss_format (centesimi interi, date memoizzate).
+
+USO:
+    python benchmark_decoding.py [numero_righe]
+"""
+
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta
+
+from swiss_format import parse_amount_cents, parse_date_iso, parse_date_ordinal
+
+
+def legacy_format_amount(amount_str: str) -> float:
+    """Conversione importo originale (prima di swiss_format)"""
+    amount_str = amount_str.replace("'", "").replace(" ", "")
+    if "," in amount_str:
+        amount_str = amount_str.replace(",", ".")
+    return float(amount_str)
+
+
+def legacy_format_date(date_str: str) -> str:
+    """Conversione data originale (prima di swiss_format)"""
+    return datetime.strptime(date_str, "%d.%m.%Y").strftime("%Y-%m-%d")
+
+
+def make_rows(count: int, seed: int = 42):
+    """
+    Genera righe (data, importo, saldo) come nei CSV UBS
+
+    Args:
+        count: Numero righe
+        seed: Seed generatore casuale
+
+    Returns:
+        Lista di tuple di stringhe
+    """
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    rows = []
+    balance = 100_000_00
+    for i in range(count):
+        day = start + timedelta(days=i * 365 // max(count, 1))
+        cents = rng.randint(-500_000, 900_000)
+        balance += cents
+        rows.append((
+            day.strftime("%d.%m.%Y"),
+            _swiss(abs(cents)),
+            _swiss(balance),
+        ))
+    return rows
+
+
+def _swiss(cents: int) -> str:
+    sign = '-' if cents < 0 else ''
+    units, fraction = divmod(abs(cents), 100)
+    return f"{sign}{units:,}".replace(',', "'") + f",{fraction:02d}"
+
+
+def run_legacy(rows) -> float:
+    total = 0.0
+    for day, amount, balance in rows:
+        legacy_format_date(day)
+        total += legacy_format_amount(amount)
+        legacy_format_amount(balance)
+    return total
+
+
+def run_swiss_format(rows) -> int:
+    total = 0
+    for day, amount, balance in rows:
+        parse_date_iso(day)
+        total += parse_amount_cents(amount)
+        parse_amount_cents(balance)
+    return total
+
+
+def measure(func, rows, repeat: int = 3) -> float:
+    """Restituisce le righe/s migliori su più ripetizioni"""
+    best = float('inf')
+    for _ in range(repeat):
+        parse_date_iso.cache_clear()
+        parse_date_ordinal.cache_clear()
+        parse_amount_cents.cache_clear()
+        start = time.perf_counter()
+        func(rows)
+        best = min(best, time.perf_counter() - start)
+    return len(rows) / best
+
+
+def main(count: int = 200_000) -> None:
+    rows = make_rows(count)
+
+    legacy = measure(run_legacy, rows)
+    current = measure(run_swiss_format, rows)
+
+    print(f"Righe: {count:,}")
+    print(f"  prima (float + strptime): {legacy:>12,.0f} righe/s")
+    print(f"  dopo  (swiss_format):     {current:>12,.0f} righe/s")
+    print(f"  speedup: x{current / legacy:.1f}")
+
+    drift = run_legacy(rows) - run_swiss_format(rows) / 100
+    print(f"  deriva float sulla somma importi: {drift:.10f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200_000)
@@ -0,0 +1,463 @@
+"""
+Benchmark parser e import UBS su file sintetici e Odoo finto locale
+
+Misura, con i file di ubs_csv_generator e il server di fake_odoo_server:
+- parsing: righe/s in streaming e in formato colonnare per encoding e
+  formato numerico
+- memoria: picco RSS del processo che legge il file (processo separato)
+- import completo: secondi, righe/s e chiamate RPC verso Odoo con latenza
+  di rete simulata (sincrono, uploader in parallelo, estratti per giorno)
+- letture grandi XML-RPC vs JSON-RPC: byte della risposta, tempo di
+  decodifica e tempo totale di search_read su account.move.line e res.partner;
+  lettura a pagine sequenziale vs per intervalli di id in parallelo
+
+Il report JSON (default benchmark_report.json) contiene un elenco di casi
+con metriche numeriche; con --baseline confronta con un report precedente
+e segnala i peggioramenti oltre la soglia.
+
+USO:
+    python benchmark_import.py                          # 50'000 righe, latenza 20 ms
+    python benchmark_import.py 200000 --latency 50 --output report.json
+    python benchmark_import.py 50000 --read-records 50000     # letture RPC più grandi
+    python benchmark_import.py --baseline report_precedente.json
+"""
+
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import xmlrpc.client
+from datetime import date, datetime, timedelta
+from typing import Dict, List
+
+import config
+from fake_odoo_server import FakeOdoo, FakeOdooServer, encode_response
+from odoo_connector import PROTOCOLS, OdooConnector
+from ubs_csv_generator import ENCODINGS, NUMBER_FORMATS, generate_ubs_csv
+from ubs_csv_importer import UBSCSVParser, UBSImporter
+
+# Peggioramento oltre il quale una metrica viene segnalata (10%)
+REGRESSION_THRESHOLD = 0.10
+
+# Metriche in cui un valore più alto è migliore
+_HIGHER_IS_BETTER = ('rows_per_s',)
+
+# Secondi per record letto simulati nel confronto lettura sequenziale / parallela
+_READ_LATENCY = 0.0001
+
+# Campi letti nel confronto tra protocolli (letture tipiche di riconciliazione e sync)
+_READ_FIELDS = {
+    'account.move.line': ['date', 'name', 'ref', 'account_id', 'partner_id', 'move_id', 'journal_id',
+                          'debit', 'credit', 'balance', 'amount_currency', 'currency_id',
+                          'amount_residual', 'reconciled', 'matching_number'],
+    'res.partner': ['name', 'vat', 'email', 'phone', 'street', 'zip', 'city', 'country_id',
+                    'commercial_partner_id', 'is_company', 'customer_rank', 'supplier_rank'],
+}
+
+
+def bench_parse(file_path: str, rows: int, repeat: int = 3) -> Dict:
+    """
+    Righe/s del parser in streaming e colonnare (migliore di repeat)
+
+    Args:
+        file_path: CSV da leggere
+        rows: Righe attese
+        repeat: Ripetizioni per misura
+
+    Returns:
+        Metriche del caso
+    """
+    best_stream = best_columnar = float('inf')
+    encoding = None
+    parsed = 0
+    for _ in range(repeat):
+        _clear_encoding_cache()
+        start = time.perf_counter()
+        parser = UBSCSVParser(file_path)
+        parsed = sum(1 for _ in parser.iter_transactions(include_raw=False))
+        best_stream = min(best_stream, time.perf_counter() - start)
+        encoding = parser.encoding
+
+        _clear_encoding_cache()
+        start = time.perf_counter()
+        UBSCSVParser(file_path).parse_batch()
+        best_columnar = min(best_columnar, time.perf_counter() - start)
+
+    return {
+        'detected_encoding': encoding,
+        'parsed_rows': parsed,
+        'rows_ok': parsed == rows,
+        'stream_rows_per_s': round(parsed / best_stream),
+        'columnar_rows_per_s': round(parsed / best_columnar),
+    }
+
+
+def bench_memory(file_path: str, mode: str) -> Dict:
+    """
+    Picco RSS di un processo separato che legge il file
+
+    Args:
+        file_path: CSV da leggere
+        mode: 'stream', 'columnar' o 'list' (parse() con raw_data)
+
+    Returns:
+        Metriche del caso (KB)
+    """
+    output = subprocess.run([sys.executable, os.path.abspath(__file__), '--rss-probe', file_path, mode],
+                            capture_output=True, text=True, check=True,
+                            cwd=os.path.dirname(os.path.abspath(__file__)),
+                            env=dict(os.environ, UBS_ENCODING_CACHE_FILE=config.ENCODING_CACHE_FILE)).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def _peak_rss_kb() -> int:
+    """Picco RSS del processo in KB"""
+    # VmHWM riparte da zero dopo exec; ru_maxrss su Linux include la memoria del padre al fork
+    with contextlib.suppress(OSError):
+        with open('/proc/self/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    import resource
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == 'darwin' else peak
+
+
+def _rss_probe(file_path: str, mode: str) -> None:
+    """Eseguito nel processo figlio: legge il file e stampa il picco RSS"""
+    baseline = _peak_rss_kb()
+    with contextlib.redirect_stdout(io.StringIO()):
+        parser = UBSCSVParser(file_path)
+        if mode == 'columnar':
+            _, batch = parser.parse_batch()
+            count = len(batch)
+        elif mode == 'list':
+            _, transactions = parser.parse()
+            count = len(transactions)
+        else:
+            count = sum(1 for _ in parser.iter_transactions(include_raw=False))
+    peak = _peak_rss_kb()
+    print(json.dumps({'rows': count, 'peak_rss_kb': peak, 'parse_rss_kb': peak - baseline}))
+
+
+def bench_import(file_path: str, rows: int, latency: float, workdir: str, **options) -> Dict:
+    """
+    Import completo contro un Odoo finto locale (nuovo database per caso)
+
+    Args:
+        file_path: CSV da importare
+        rows: Righe del file
+        latency: Secondi per chiamata simulati dal server
+        workdir: Cartella per indice duplicati e checkpoint
+        **options: Opzioni di UBSImporter.import_csv
+
+    Returns:
+        Metriche del caso
+    """
+    server = FakeOdooServer(latency=latency).start()
+    config.DEDUP_DB_FILE = os.path.join(workdir, f"dedup_{time.monotonic_ns()}.sqlite3")
+    _clear_encoding_cache()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            start = time.perf_counter()
+            odoo = OdooConnector(server.url, 'bench', 'bench', 'bench')
+            odoo.connect()
+            importer = UBSImporter(odoo, config.DEFAULT_JOURNAL_ID)
+            stats = importer.import_csv(file_path, dry_run=False, summary_only=True, verbose=False,
+                                        **options)
+            elapsed = time.perf_counter() - start
+        for name in os.listdir(os.path.dirname(file_path)):
+            if name.endswith('.checkpoint.jsonl'):
+                os.remove(os.path.join(os.path.dirname(file_path), name))
+        return {
+            'imported': stats['imported'],
+            'errors': stats['errors'],
+            'seconds': round(elapsed, 3),
+            'rows_per_s': round(rows / elapsed),
+            'rpc_calls': sum(server.odoo.calls.values()),
+            'response_bytes': server.bytes_sent,
+        }
+    finally:
+        server.stop()
+
+
+def bench_rpc(records: int, latency: float, repeat: int = 3) -> List[Dict]:
+    """
+    search_read completo via XML-RPC e JSON-RPC sugli stessi dati
+
+    Args:
+        records: Record per modello (account.move.line e res.partner)
+        latency: Secondi per chiamata simulati dal server
+        repeat: Ripetizioni per misura (si tiene la migliore)
+
+    Returns:
+        Casi 'rpc/<modello>/<protocollo>' con byte risposta, decodifica e tempo totale
+    """
+    odoo = FakeOdoo(partners=records, latency=latency)
+    _seed_reads(odoo, records)
+    server = FakeOdooServer(odoo).start()
+    cases = []
+    try:
+        for model, fields in _READ_FIELDS.items():
+            for protocol in PROTOCOLS:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    connector = OdooConnector(server.url, 'bench', 'bench', 'bench', protocol=protocol)
+                    connector.connect()
+                sent = server.bytes_sent
+                best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    result = connector.search_read(model, [], fields)
+                    best = min(best, time.perf_counter() - start)
+                connector.close()
+
+                # Decodifica da sola, sullo stesso corpo inviato dal server
+                payload = encode_response(result, protocol)
+                decode = xmlrpc.client.loads if protocol == 'xmlrpc' else json.loads
+                decode_best = float('inf')
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    decode(payload)
+                    decode_best = min(decode_best, time.perf_counter() - start)
+
+                cases.append({'name': f"rpc/{model}/{protocol}", 'metrics': {
+                    'records': len(result),
+                    'response_bytes': (server.bytes_sent - sent) // repeat,
+                    'decode_seconds': round(decode_best, 4),
+                    'seconds': round(best, 4),
+                }})
+
+        # Lettura completa a pagine: un cursore sequenziale contro intervalli di id in parallelo,
+        # con il costo ORM per record di Odoo (in parallelo su più worker del server)
+        odoo.read_latency = _READ_LATENCY
+        with contextlib.redirect_stdout(io.StringIO()):
+            connector = OdooConnector(server.url, 'bench', 'bench', 'bench', protocol='jsonrpc')
+            connector.connect()
+        readers = {
+            'paged': lambda: connector.iter_search_read('account.move.line', [], _READ_FIELDS['account.move.line']),
+            'sharded': lambda: connector.sharded_search_read('account.move.line', [],
+                                                             _READ_FIELDS['account.move.line']),
+        }
+        for mode, reader in readers.items():
+            calls = sum(odoo.calls.values())
+            start = time.perf_counter()
+            count = sum(1 for _ in reader())
+            cases.append({'name': f"rpc/account.move.line/jsonrpc_{mode}", 'metrics': {
+                'records': count,
+                'rpc_calls': sum(odoo.calls.values()) - calls,
+                'seconds': round(time.perf_counter() - start, 4),
+            }})
+        connector.close()
+    finally:
+        server.stop()
+    return cases
+
+
+def _seed_reads(odoo: FakeOdoo, records: int) -> None:
+    # Partner con indirizzo completo e righe contabili con i campi letti da riconciliazione e sync
+    rng = random.Random(7)
+    partner_ids = list(odoo.records['res.partner'])
+    for partner_id in partner_ids:
+        odoo.records['res.partner'][partner_id].update({
+            'email': f"info{partner_id}@example.ch", 'phone': f"+41 44 {partner_id:07d}",
+            'street': f"Bahnhofstrasse {partner_id % 200 + 1}", 'zip': f"{8000 + partner_id % 900}",
+            'city': 'Zürich', 'country_id': [43, 'Switzerland'], 'is_company': True,
+            'customer_rank': rng.randint(0, 5), 'supplier_rank': rng.randint(0, 5),
+        })
+    for number in range(records):
+        cents = rng.randint(500, 2_500_000)
+        debit = rng.random() < 0.5
+        odoo._store('account.move.line', {
+            'date': (date(2024, 1, 1) + timedelta(days=number % 365)).isoformat(),
+            'name': f"Fattura INV/2024/{number:05d} - Lieferung für März",
+            'ref': f"RF{number:021d}",
+            'account_id': [1100 if debit else 2000, '1100 Crediti da forniture e prestazioni'],
+            'partner_id': [rng.choice(partner_ids), 'Partner AG'],
+            'move_id': [number // 2 + 1, f"INV/2024/{number // 2:05d}"],
+            'journal_id': [1, 'Fatture clienti'],
+            'debit': cents / 100 if debit else 0.0,
+            'credit': 0.0 if debit else cents / 100,
+            'balance': cents / 100 if debit else -cents / 100,
+            'amount_currency': cents / 100 if debit else -cents / 100,
+            'currency_id': [5, 'CHF'],
+            'amount_residual': cents / 100 if number % 3 else 0.0,
+            'reconciled': not number % 3,
+            'matching_number': f"A{number // 3}" if not number % 3 else False,
+        })
+
+
+def _clear_encoding_cache() -> None:
+    # Ogni misura parte senza profilo encoding (stesso IBAN con encoding diversi)
+    with contextlib.suppress(OSError):
+        os.remove(config.ENCODING_CACHE_FILE)
+
+
+def compare(report: Dict, baseline: Dict, threshold: float = REGRESSION_THRESHOLD) -> List[Dict]:
+    """
+    Confronta due report e restituisce le metriche peggiorate oltre la soglia
+
+    Args:
+        report: Report corrente
+        baseline: Report di riferimento
+        threshold: Peggioramento relativo ammesso
+
+    Returns:
+        Lista {'case', 'metric', 'baseline', 'current', 'change'}
+    """
+    previous = {case['name']: case['metrics'] for case in baseline.get('cases', [])}
+    regressions = []
+    for case in report['cases']:
+        for metric, value in case['metrics'].items():
+            old = previous.get(case['name'], {}).get(metric)
+            if not isinstance(value, (int, float)) or isinstance(value, bool) or not old:
+                continue
+            if not (metric.endswith(_HIGHER_IS_BETTER) or metric.endswith(('seconds', '_kb', 'rpc_calls'))):
+                continue
+            change = (value - old) / old
+            worse = -change if metric.endswith(_HIGHER_IS_BETTER) else change
+            if worse > threshold:
+                regressions.append({'case': case['name'], 'metric': metric, 'baseline': old,
+                                    'current': value, 'change': round(change, 3)})
+    return regressions
+
+
+def run(rows: int = 50000, latency_ms: float = 20.0, import_rows: int = None,
+        read_records: int = None) -> Dict:
+    """
+    Esegue tutti i casi di benchmark
+
+    Args:
+        rows: Righe dei file per parsing e memoria
+        latency_ms: Latenza simulata per chiamata RPC negli import
+        import_rows: Righe del file per gli import (default min(rows, 20000))
+        read_records: Record per modello nelle letture RPC (default min(rows, 20000))
+
+    Returns:
+        Report (vedi modulo)
+    """
+    import_rows = import_rows or min(rows, 20000)
+    read_records = read_records or min(rows, 20000)
+    cases = []
+    saved_config = (config.ENCODING_CACHE_FILE, config.DEDUP_DB_FILE, config.ODOO_CACHE_FILE,
+                    config.ODOO_SESSION_FILE, config.ODOO_METRICS_TABLE, config.ODOO_METRICS_FILE)
+
+    with tempfile.TemporaryDirectory(prefix='ubs_bench_') as workdir:
+        # Cache encoding e indice duplicati temporanei, cache letture Odoo solo in memoria,
+        # nessuna sessione salvata né metriche RPC per connettore: i file reali non vengono toccati
+        config.ENCODING_CACHE_FILE = os.path.join(workdir, 'encoding_cache.json')
+        config.ODOO_CACHE_FILE = ''
+        config.ODOO_SESSION_FILE = ''
+        config.ODOO_METRICS_TABLE = False
+        config.ODOO_METRICS_FILE = ''
+        try:
+            cases.extend(_run_cases(workdir, rows, latency_ms, import_rows))
+            cases.extend(_run_rpc_cases(read_records, latency_ms))
+        finally:
+            (config.ENCODING_CACHE_FILE, config.DEDUP_DB_FILE, config.ODOO_CACHE_FILE,
+             config.ODOO_SESSION_FILE, config.ODOO_METRICS_TABLE, config.ODOO_METRICS_FILE) = saved_config
+
+    return {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {'rows': rows, 'import_rows': import_rows, 'read_records': read_records,
+                       'latency_ms': latency_ms, 'chunk_size': config.IMPORT_CHUNK_SIZE},
+        'cases': cases,
+    }
+
+
+def _run_cases(workdir: str, rows: int, latency_ms: float, import_rows: int) -> List[Dict]:
+    """Casi parsing, memoria e import (file generati in workdir)"""
+    cases = []
+    print(f"📊 Parsing ({rows:,} righe)")
+    for encoding in ENCODINGS:
+        for number_format in NUMBER_FORMATS:
+            path = os.path.join(workdir, f"parse_{encoding}_{number_format}.csv")
+            try:
+                generated = generate_ubs_csv(path, rows, encoding, number_format)
+            except ValueError:
+                continue   # separatore non rappresentabile nell'encoding
+            metrics = bench_parse(path, rows)
+            metrics['bytes'] = generated['bytes']
+            cases.append({'name': f"parse/{encoding}/{number_format}", 'metrics': metrics})
+            print(f"   {encoding:<13} {number_format:<15} stream {metrics['stream_rows_per_s']:>10,} righe/s"
+                  f"   colonnare {metrics['columnar_rows_per_s']:>10,} righe/s")
+            os.remove(path)
+
+    print(f"\n🧠 Memoria ({rows:,} righe, processo separato)")
+    path = os.path.join(workdir, 'memory.csv')
+    generate_ubs_csv(path, rows)
+    for mode in ('stream', 'columnar', 'list'):
+        metrics = bench_memory(path, mode)
+        cases.append({'name': f"memory/{mode}", 'metrics': metrics})
+        print(f"   {mode:<9} picco RSS {metrics['peak_rss_kb'] / 1024:>8.1f} MB"
+              f"   (parsing {metrics['parse_rss_kb'] / 1024:.1f} MB)")
+
+    print(f"\n🚀 Import completo ({import_rows:,} righe, latenza {latency_ms:g} ms per chiamata)")
+    path = os.path.join(workdir, 'import.csv')
+    generate_ubs_csv(path, import_rows)
+    scenarios = {
+        'sync': {},
+        'uploaders_2': {'uploaders': 2},
+        'statements_date': {'statements': 'date'},
+    }
+    for scenario, options in scenarios.items():
+        metrics = bench_import(path, import_rows, latency_ms / 1000, workdir, **options)
+        cases.append({'name': f"import/{scenario}", 'metrics': metrics})
+        print(f"   {scenario:<16} {metrics['seconds']:>7.2f} s   {metrics['rows_per_s']:>8,} righe/s"
+              f"   {metrics['rpc_calls']:>5} chiamate RPC")
+    return cases
+
+
+def _run_rpc_cases(read_records: int, latency_ms: float) -> List[Dict]:
+    """Casi letture XML-RPC vs JSON-RPC"""
+    print(f"\n📡 Letture XML-RPC vs JSON-RPC ({read_records:,} record per modello)")
+    cases = bench_rpc(read_records, latency_ms / 1000)
+    for case in cases:
+        metrics = case['metrics']
+        if 'response_bytes' not in metrics:
+            print(f"   {case['name'][4:]:<35} {metrics['rpc_calls']:>4} chiamate RPC"
+                  f"   totale {metrics['seconds']:>6.3f} s")
+            continue
+        print(f"   {case['name'][4:]:<35} {metrics['response_bytes'] / 1024 / 1024:>7.1f} MB"
+              f"   decodifica {metrics['decode_seconds']:>6.3f} s   totale {metrics['seconds']:>6.3f} s")
+    return cases
+
+
+if __name__ == "__main__":
+    from ubs_csv_importer import get_cli_option
+
+    if '--rss-probe' in sys.argv:
+        position = sys.argv.index('--rss-probe')
+        _rss_probe(sys.argv[position + 1], sys.argv[position + 2])
+        sys.exit(0)
+
+    count = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 50000
+    import_count = get_cli_option(sys.argv, '--import-rows')
+    read_count = get_cli_option(sys.argv, '--read-records')
+    report = run(count, float(get_cli_option(sys.argv, '--latency', 20)),
+                 int(import_count) if import_count else None,
+                 int(read_count) if read_count else None)
+
+    output = get_cli_option(sys.argv, '--output', 'benchmark_report.json')
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\n💾 Report: {output}")
+
+    baseline_file = get_cli_option(sys.argv, '--baseline')
+    if baseline_file:
+        with open(baseline_file, 'r', encoding='utf-8') as f:
+            regressions = compare(report, json.load(f))
+        if regressions:
+            print(f"\n⚠️  Peggioramenti oltre {REGRESSION_THRESHOLD:.0%} rispetto a {baseline_file}:")
+            for item in regressions:
+                print(f"   {item['case']} {item['metric']}: {item['baseline']} → {item['current']} "
+                      f"({item['change']:+.0%})")
+            sys.exit(1)
+        print(f"\n✅ Nessun peggioramento rispetto a {baseline_file}")
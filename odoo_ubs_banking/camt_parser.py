@@ -0,0 +1,387 @@
+"""
+Parser ISO 20022 camt.053 / camt.054 (estratti conto e avvisi UBS in XML)
+
+Il file viene letto con iterparse: ogni movimento (<Ntry>) viene elaborato
+appena chiuso e poi rimosso dall'albero, quindi la memoria resta costante
+anche su estratti mensili molto grandi. I movimenti hanno lo stesso formato
+normalizzato di UBSCSVParser, più i riferimenti strutturati che il CSV
+appiattisce in 'Beschreibung 1-3':
+
+    structured_ref   Riferimento QR / SCOR (RmtInf/Strd/CdtrRefInf/Ref)
+    end_to_end_id    EndToEndId del pagamento
+    partner_iban     IBAN della controparte
+    currency         Valuta del movimento
+
+Un file può contenere più estratti (<Stmt>): uno per giorno o uno per conto
+(export UBS multi-conto). Il parser legge un solo conto, il primo del file
+o quello indicato: periodo e saldi coprono tutti i suoi estratti (saldo
+iniziale del primo, finale dell'ultimo); i movimenti degli altri conti
+vengono saltati e contati in other_accounts.
+"""
+
+import xml.etree.ElementTree as ET
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from encoding_detection import normalize_iban
+from transaction_batch import TransactionBatch
+from swiss_format import parse_amount_cents, cents_to_amount
+
+# Byte letti per riconoscere un file camt
+_SNIFF_SIZE = 1024
+
+# Valore ISO per riferimenti non forniti dall'ordinante
+_NOT_PROVIDED = 'NOTPROVIDED'
+
+# Saldi di chiusura: vale quello dell'ultimo estratto (gli altri codici: il primo)
+_CLOSING_BALANCES = ('CLBD', 'CLAV')
+
+
+def is_camt_file(file_path: str) -> bool:
+    """
+    Verifica se un file è un documento camt.053/camt.054
+
+    Args:
+        file_path: Percorso file
+
+    Returns:
+        True se il file inizia come XML camt
+    """
+    with open(file_path, 'rb') as f:
+        head = f.read(_SNIFF_SIZE)
+    head = head.lstrip(b'\xef\xbb\xbf').lstrip()
+    return head.startswith(b'<') and (b'camt.053' in head or b'camt.054' in head)
+
+
+def _local_name(tag: str) -> str:
+    """Nome elemento senza namespace (le versioni camt usano namespace diversi)"""
+    return tag.rsplit('}', 1)[-1]
+
+
+def _text(element: Optional[ET.Element], path: str) -> Optional[str]:
+    """Testo di un sotto-elemento (None se assente o vuoto)"""
+    if element is None:
+        return None
+    found = element.find(path)
+    if found is None or found.text is None:
+        return None
+    return found.text.strip() or None
+
+
+def _date(element: Optional[ET.Element], path: str) -> Optional[str]:
+    """Data ISO da un elemento <Dt> o <DtTm>"""
+    if element is None:
+        return None
+    value = _text(element, f'{path}/Dt') or _text(element, f'{path}/DtTm')
+    return value[:10] if value else None
+
+
+def _signed_cents(amount: str, indicator: Optional[str]) -> int:
+    """Importo in centesimi con segno da CdtDbtInd (CRDT=entrata, DBIT=uscita)"""
+    cents = parse_amount_cents(amount)
+    return -cents if indicator == 'DBIT' else cents
+
+
+class CamtParser:
+    """Parser per estratti conto camt.053 e avvisi camt.054 esportati da UBS"""
+
+    def __init__(self, file_path: str, account: str = None):
+        """
+        Inizializza parser
+
+        Args:
+            file_path: Percorso file XML camt
+            account: IBAN del conto da leggere (default: il primo del file)
+        """
+        self.file_path = file_path
+        self.account = account
+        self.header_info = {}
+        self.transactions = []
+        self.period = None    # (data_da, data_a) ISO da FrToDt degli estratti del conto
+        self.balances = {}    # codice saldo (OPBD, CLBD, ...) -> {'date', 'amount_cents'}
+        self.other_accounts: Dict[str, int] = {}   # IBAN di altri conti -> movimenti saltati
+
+        self._selected: Optional[bool] = None      # estratto in corso: True = conto letto
+        self._statement_iban: Optional[str] = None
+        self._statement_period: Optional[Tuple[str, str]] = None
+
+    def parse(self) -> Tuple[Dict, List[Dict]]:
+        """
+        Parsa il file camt caricando tutti i movimenti in memoria
+
+        Returns:
+            Tuple (header_info, transactions)
+
+        Raises:
+            ValueError: Se file non valido
+        """
+        self.transactions = list(self.iter_transactions())
+        return self.header_info, self.transactions
+
+    def parse_batch(self) -> Tuple[Dict, TransactionBatch]:
+        """
+        Parsa il file camt in formato colonnare compatto
+
+        Returns:
+            Tuple (header_info, batch)
+
+        Raises:
+            ValueError: Se file non valido
+        """
+        batch = TransactionBatch.from_transactions(self.iter_transactions(include_raw=False))
+        return self.header_info, batch
+
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[TransactionBatch]:
+        """
+        Legge il file in streaming restituendo blocchi colonnari di dimensione fissa
+
+        Args:
+            batch_size: Numero massimo di movimenti per blocco
+
+        Yields:
+            TransactionBatch con al massimo batch_size movimenti
+        """
+        batch = TransactionBatch()
+        for transaction in self.iter_transactions(include_raw=False):
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = TransactionBatch()
+        if len(batch):
+            yield batch
+
+    def iter_transactions(self, include_raw: bool = True) -> Iterator[Dict]:
+        """
+        Legge il file camt e restituisce i movimenti uno alla volta
+
+        Conto, valuta, periodo e saldi precedono i movimenti nel documento:
+        header_info è disponibile dopo il primo movimento, period e balances
+        completi (più estratti) e other_accounts alla fine della lettura.
+
+        Args:
+            include_raw: Se True, ogni movimento conserva l'XML del <Ntry> in 'raw_data'
+
+        Yields:
+            Dizionario transazione normalizzato (vedi _parse_entry)
+
+        Raises:
+            ValueError: Se file non valido
+        """
+        parents: List[ET.Element] = []
+        root_checked = False
+
+        try:
+            for event, element in ET.iterparse(self.file_path, events=('start', 'end')):
+                if event == 'start':
+                    element.tag = _local_name(element.tag)
+                    if not root_checked:
+                        if element.tag != 'Document':
+                            raise ValueError("Documento camt non valido: elemento radice atteso <Document>")
+                        root_checked = True
+                    parents.append(element)
+                    if element.tag in ('Stmt', 'Ntfctn'):
+                        self._selected = None
+                        self._statement_iban = None
+                        self._statement_period = None
+                    continue
+
+                parents.pop()
+                tag = element.tag
+
+                if tag == 'Ntry':
+                    if self._selected is False:
+                        self.other_accounts[self._statement_iban] += 1
+                    else:
+                        for transaction in self._parse_entry(element, include_raw):
+                            yield transaction
+                    # Libera il movimento già elaborato
+                    if parents:
+                        parents[-1].remove(element)
+                    element.clear()
+
+                elif tag == 'Acct' and parents and parents[-1].tag in ('Stmt', 'Ntfctn'):
+                    self._parse_account(element)
+
+                elif tag == 'FrToDt':
+                    date_from = (_text(element, 'FrDtTm') or '')[:10]
+                    date_to = (_text(element, 'ToDtTm') or '')[:10]
+                    if date_from and date_to:
+                        # Il conto (<Acct>) segue <FrToDt>: periodo aggiunto quando l'estratto è scelto
+                        self._statement_period = (date_from, date_to)
+                        if self._selected:
+                            self._add_period()
+
+                elif tag == 'Bal' and self._selected is not False:
+                    self._parse_balance(element)
+
+        except ET.ParseError as e:
+            raise ValueError(f"XML camt non valido: {e}")
+
+    def _parse_account(self, account: ET.Element) -> None:
+        """
+        Conto dell'estratto in corso: IBAN e valuta nell'header (chiavi come
+        nell'header CSV UBS) se è il conto letto, altrimenti estratto saltato
+        """
+        iban = _text(account, 'Id/IBAN')
+        if iban and self.account is None:
+            self.account = iban
+        if iban and normalize_iban(iban) != normalize_iban(self.account):
+            self._selected = False
+            self._statement_iban = iban
+            self.other_accounts.setdefault(iban, 0)
+            return
+
+        self._selected = True
+        currency = _text(account, 'Ccy')
+        if iban and 'IBAN' not in self.header_info:
+            self.header_info['IBAN'] = iban
+        if currency and 'Whrg.' not in self.header_info:
+            self.header_info['Whrg.'] = currency
+        self._add_period()
+
+    def _add_period(self) -> None:
+        """Estende period con il periodo dell'estratto in corso"""
+        if self._statement_period is None:
+            return
+        if self.period is None:
+            self.period = self._statement_period
+        else:
+            self.period = (min(self.period[0], self._statement_period[0]),
+                           max(self.period[1], self._statement_period[1]))
+        self._statement_period = None
+
+    def _parse_balance(self, balance: ET.Element) -> None:
+        """Registra un saldo (OPBD del primo estratto, CLBD dell'ultimo, ...)"""
+        code = _text(balance, 'Tp/CdOrPrtry/Cd') or _text(balance, 'Tp/CdOrPrtry/Prtry')
+        amount = _text(balance, 'Amt')
+        if code and amount and (code not in self.balances or code in _CLOSING_BALANCES):
+            self.balances[code] = {
+                'date': _date(balance, 'Dt'),
+                'amount_cents': _signed_cents(amount, _text(balance, 'CdtDbtInd')),
+            }
+
+    def _parse_entry(self, entry: ET.Element, include_raw: bool = True) -> List[Dict]:
+        """
+        Converte un movimento <Ntry> in transazioni normalizzate
+
+        Un movimento cumulativo con più <TxDtls> con importo (es. incassi QR
+        accreditati insieme) diventa una transazione per dettaglio, così ogni
+        pagamento conserva il proprio riferimento strutturato.
+
+        Args:
+            entry: Elemento <Ntry>
+            include_raw: Se True, conserva l'XML originale in 'raw_data'
+
+        Returns:
+            Lista dizionari transazione (vuota se movimento non contabilizzato)
+        """
+        try:
+            status = _text(entry, 'Sts/Cd') or _text(entry, 'Sts')
+            if status and status != 'BOOK':
+                return []
+
+            date_str = _date(entry, 'ValDt') or _date(entry, 'BookgDt')
+            amount = _text(entry, 'Amt')
+            if not date_str or not amount:
+                return []
+
+            indicator = _text(entry, 'CdtDbtInd')
+            entry_ref = _text(entry, 'AcctSvcrRef')
+            entry_info = _text(entry, 'AddtlNtryInf')
+            currency = entry.find('Amt').get('Ccy')
+
+            details = entry.findall('NtryDtls/TxDtls')
+            split = len(details) > 1 and all(_text(detail, 'Amt') for detail in details)
+
+            raw_data = ET.tostring(entry, encoding='unicode') if include_raw else None
+
+            if not split:
+                detail = details[0] if details else None
+                transaction = self._build_transaction(
+                    date_str, _signed_cents(amount, indicator), indicator, detail,
+                    entry_ref, entry_info, currency)
+                return [self._finish(transaction, raw_data)] if transaction else []
+
+            transactions = []
+            for number, detail in enumerate(details, 1):
+                detail_indicator = _text(detail, 'CdtDbtInd') or indicator
+                ref = _text(detail, 'Refs/AcctSvcrRef') or (f"{entry_ref}-{number}" if entry_ref else None)
+                transaction = self._build_transaction(
+                    date_str, _signed_cents(_text(detail, 'Amt'), detail_indicator), detail_indicator,
+                    detail, ref, entry_info, detail.find('Amt').get('Ccy') or currency)
+                if transaction:
+                    transactions.append(self._finish(transaction, raw_data))
+            return transactions
+
+        except Exception as e:
+            print(f"⚠️  Errore parsing movimento camt: {e}")
+            print(f"   Movimento: {_text(entry, 'AcctSvcrRef') or _text(entry, 'BookgDt/Dt')}")
+            return []
+
+    @staticmethod
+    def _build_transaction(date_str: str, amount_cents: int, indicator: Optional[str],
+                           detail: Optional[ET.Element], ref: Optional[str],
+                           entry_info: Optional[str], currency: Optional[str]) -> Optional[Dict]:
+        """
+        Compone il dizionario transazione da un movimento o da un suo dettaglio
+
+        Args:
+            date_str: Data ISO del movimento
+            amount_cents: Importo in centesimi con segno
+            indicator: CdtDbtInd (CRDT/DBIT)
+            detail: Elemento <TxDtls> (None se assente)
+            ref: Riferimento banca (AcctSvcrRef)
+            entry_info: Testo AddtlNtryInf del movimento
+            currency: Valuta
+
+        Returns:
+            Dizionario transazione o None se importo zero
+        """
+        if amount_cents == 0:
+            return None
+
+        # Entrata: la controparte è l'ordinante; uscita: il beneficiario
+        party = 'Dbtr' if indicator == 'CRDT' else 'Cdtr'
+        partner_name = None
+        partner_iban = None
+        structured_ref = None
+        end_to_end_id = None
+        texts = []
+        if detail is not None:
+            partner_name = (_text(detail, f'RltdPties/{party}/Nm')
+                            or _text(detail, f'RltdPties/{party}/Pty/Nm'))
+            partner_iban = _text(detail, f'RltdPties/{party}Acct/Id/IBAN')
+            structured_ref = _text(detail, 'RmtInf/Strd/CdtrRefInf/Ref')
+            end_to_end_id = _text(detail, 'Refs/EndToEndId')
+            if end_to_end_id == _NOT_PROVIDED:
+                end_to_end_id = None
+            texts = [u.text.strip() for u in detail.findall('RmtInf/Ustrd') if u.text and u.text.strip()]
+            if not texts:
+                info = _text(detail, 'AddtlTxInf')
+                texts = [info] if info else []
+        if not texts and entry_info:
+            texts = [entry_info]
+
+        # Stessa composizione del CSV: descrizione; controparte; riferimento
+        description_parts = [p for p in [' '.join(texts), partner_name, structured_ref] if p]
+        payment_ref = '; '.join(description_parts) if description_parts else 'Movimento bancario'
+
+        return {
+            'date': date_str,
+            'payment_ref': payment_ref,
+            'amount': cents_to_amount(amount_cents),
+            'amount_cents': amount_cents,
+            'partner_name': partner_name,
+            'ref': ref,
+            'balance': None,          # camt non riporta il saldo per movimento
+            'balance_cents': None,
+            'structured_ref': structured_ref,
+            'end_to_end_id': end_to_end_id,
+            'partner_iban': partner_iban,
+            'currency': currency,
+        }
+
+    @staticmethod
+    def _finish(transaction: Dict, raw_data: Optional[str]) -> Dict:
+        if raw_data is not None:
+            transaction['raw_data'] = raw_data  # XML originale per debug
+        return transaction
@@ -1,6 +1,7 @@
 """
 Configurazione connessione Odoo per importazione movimenti bancari UBS
 """
+import json
 import os
 
 # Credenziali Odoo Staging (password letta dalle variabili d'ambiente)
@@ -34,3 +35,87 @@ GIORNALI_UBS = {
 # Giornale predefinito
 DEFAULT_JOURNAL_ID = GIORNALI_UBS["UBS_CHF"]["id"]
 DEFAULT_JOURNAL_NAME = GIORNALI_UBS["UBS_CHF"]["nome"]
+
+# Cache encoding per profilo conto (IBAN): evita il rilevamento a ogni import dello stesso conto
+ENCODING_CACHE_FILE = os.environ.get(
+    "UBS_ENCODING_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ubs_encoding_cache.json")
+)
+
+# Movimenti inviati a Odoo per ogni chiamata create (import a blocchi)
+IMPORT_CHUNK_SIZE = int(os.environ.get("UBS_IMPORT_CHUNK_SIZE", "500"))
+
+# Indice locale SQLite dei movimenti già importati (salta i duplicati senza chiamate RPC)
+DEDUP_DB_FILE = os.environ.get(
+    "UBS_DEDUP_DB_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ubs_import_index.sqlite3")
+)
+
+# Thread uploader in parallelo al parsing (0 = invio sincrono, un blocco alla volta)
+IMPORT_UPLOADERS = int(os.environ.get("UBS_IMPORT_UPLOADERS", "0"))
+
+# Similarità minima (0-1, trigrammi) per abbinare il nome controparte a un partner Odoo
+PARTNER_MATCH_THRESHOLD = float(os.environ.get("UBS_PARTNER_MATCH_THRESHOLD", "0.6"))
+
+# Riconciliazione automatica: tolleranza giorni sull'abbinamento per solo importo,
+# righe per pagina nelle letture, abbinamenti registrati per blocco
+RECONCILE_DATE_WINDOW_DAYS = int(os.environ.get("UBS_RECONCILE_DATE_WINDOW_DAYS", "45"))
+RECONCILE_PAGE_SIZE = int(os.environ.get("UBS_RECONCILE_PAGE_SIZE", "2000"))
+RECONCILE_BATCH_SIZE = int(os.environ.get("UBS_RECONCILE_BATCH_SIZE", "50"))
+
+# Import automatico da cartella (watch_folder.py): cartella di deposito degli export,
+# archivio dei file importati, controllo ogni N secondi senza inotify, secondi
+# senza modifiche prima di considerare un file completo
+WATCH_FOLDER = os.environ.get("UBS_WATCH_FOLDER", "")
+WATCH_ARCHIVE_FOLDER = os.environ.get("UBS_WATCH_ARCHIVE_FOLDER", "")
+WATCH_POLL_SECONDS = float(os.environ.get("UBS_WATCH_POLL_SECONDS", "10"))
+WATCH_SETTLE_SECONDS = float(os.environ.get("UBS_WATCH_SETTLE_SECONDS", "5"))
+
+# Connessioni HTTP persistenti verso Odoo condivise da tutti i thread di un processo
+ODOO_POOL_SIZE = int(os.environ.get("UBS_ODOO_POOL_SIZE", "4"))
+
+# Protocollo RPC verso Odoo: "xmlrpc" (/xmlrpc/2) o "jsonrpc" (/jsonrpc, risposte più
+# compatte e veloci da decodificare nelle letture grandi)
+ODOO_PROTOCOL = os.environ.get("UBS_ODOO_PROTOCOL", "xmlrpc")
+
+# Record per pagina nelle letture complete (OdooConnector.iter_search_read) e
+# letture contemporanee per intervalli di id (OdooConnector.sharded_search_read)
+ODOO_READ_BATCH_SIZE = int(os.environ.get("UBS_ODOO_READ_BATCH_SIZE", "2000"))
+ODOO_READ_WORKERS = int(os.environ.get("UBS_ODOO_READ_WORKERS", "4"))
+
+# Controllo adattivo delle chiamate contemporanee (massimo = UBS_ODOO_POOL_SIZE):
+# ripetizioni delle letture per sovraccarico (429/503, timeout) e durata oltre la
+# quale una lettura è considerata segnale di sovraccarico (le scritture grandi no)
+ODOO_RETRIES = int(os.environ.get("UBS_ODOO_RETRIES", "3"))
+ODOO_SLOW_CALL_SECONDS = float(os.environ.get("UBS_ODOO_SLOW_CALL_SECONDS", "30"))
+
+# Cache delle letture che cambiano raramente (odoo_cache.py): secondi di validità per
+# 'modello', 'modello.metodo' o '*.metodo'; UBS_ODOO_CACHE_TTLS='{"res.currency": 0}'
+# modifica o disattiva singole voci. File SQLite condiviso tra esecuzioni ("" = solo memoria)
+ODOO_CACHE_TTLS = {
+    '*.fields_get': 86400,
+    'account.journal': 3600,
+    'res.company': 86400,
+    'res.currency': 86400,
+    'product.tag': 3600,
+    'account.account': 3600,
+}
+ODOO_CACHE_TTLS.update(json.loads(os.environ.get("UBS_ODOO_CACHE_TTLS", "{}")))
+ODOO_CACHE_FILE = os.environ.get(
+    "UBS_ODOO_CACHE_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ubs_odoo_cache.sqlite3")
+)
+
+# uid autenticati riusati tra esecuzioni (odoo_session.py, senza password): file JSON
+# ("" = authenticate a ogni avvio) e secondi di validità
+ODOO_SESSION_FILE = os.environ.get(
+    "UBS_ODOO_SESSION_FILE",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), ".ubs_odoo_sessions.json")
+)
+ODOO_SESSION_TTL = float(os.environ.get("UBS_ODOO_SESSION_TTL", "86400"))
+
+# Metriche per chiamata RPC (odoo_metrics.py): UBS_ODOO_METRICS=1 stampa a fine esecuzione
+# la tabella per modello.metodo (chiamate, record, byte, p50/p95/p99); file di export
+# (".prom" = testo Prometheus, altrimenti JSON; "" = nessun file)
+ODOO_METRICS_TABLE = os.environ.get("UBS_ODOO_METRICS", "0") == "1"
+ODOO_METRICS_FILE = os.environ.get("UBS_ODOO_METRICS_FILE", "")
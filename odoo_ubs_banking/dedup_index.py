@@ -0,0 +1,244 @@
+"""
+Rilevamento movimenti già importati (re-import idempotente)
+
+Due livelli, entrambi senza una chiamata RPC per riga:
+1. Indice locale SQLite con le impronte dei movimenti importati da questo tool
+2. Chiavi delle righe già presenti in Odoo per giornale e periodo, lette con
+   un unico search_read e tenute in memoria
+
+Impronta di un movimento: Transaktions-Nr se presente, altrimenti hash di
+data + importo in centesimi + descrizione. Le impronte hash hanno un
+contatore di occorrenza (#1, #2, ...) così due movimenti identici nello
+stesso file non vengono scambiati per duplicati l'uno dell'altro. I contatori
+ripartono a ogni file: lo stesso movimento presente in due export
+sovrapposti ha la stessa impronta e il secondo viene saltato, anche se è
+nello stesso blocco del primo o non ancora registrato nell'indice.
+"""
+
+import hashlib
+import sqlite3
+from collections import Counter
+from datetime import date, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+
+import config
+from transaction_batch import to_cents
+
+# Parametri massimi per query IN (...) su SQLite
+_SQLITE_IN_LIMIT = 500
+
+
+def transaction_fingerprint(date_str: str, amount_cents: int, payment_ref: Optional[str]) -> str:
+    """
+    Impronta hash di un movimento senza Transaktions-Nr
+
+    Args:
+        date_str: Data ISO (YYYY-MM-DD)
+        amount_cents: Importo in centesimi
+        payment_ref: Descrizione movimento
+
+    Returns:
+        Impronta 'h:<sha1>'
+    """
+    key = f"{date_str}|{amount_cents}|{(payment_ref or '').strip()}"
+    return 'h:' + hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def ref_fingerprint(ref: str) -> str:
+    """
+    Impronta di un movimento con Transaktions-Nr
+
+    Args:
+        ref: Numero transazione UBS
+
+    Returns:
+        Impronta 'r:<ref>'
+    """
+    return 'r:' + ref.strip()
+
+
+class DedupIndex:
+    """Indice dei movimenti già importati per un giornale bancario"""
+
+    def __init__(self, connector, journal_id: int, db_path: str = None):
+        """
+        Inizializza indice
+
+        Args:
+            connector: OdooConnector connesso (None = solo indice locale)
+            journal_id: ID giornale bancario
+            db_path: Percorso database SQLite (default config.DEDUP_DB_FILE)
+        """
+        self.odoo = connector
+        self.journal_id = journal_id
+        self.db_path = db_path or config.DEDUP_DB_FILE
+
+        self.db = sqlite3.connect(self.db_path)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS imported_lines (
+                journal_id INTEGER NOT NULL,
+                fingerprint TEXT NOT NULL,
+                odoo_id INTEGER,
+                date TEXT,
+                amount_cents INTEGER,
+                imported_at TEXT DEFAULT CURRENT_TIMESTAMP,
+                PRIMARY KEY (journal_id, fingerprint)
+            )
+        """)
+        self.db.commit()
+
+        # Chiavi presenti in Odoo per il periodo già letto
+        self._remote_keys: Set[str] = set()
+        self._fetched: Optional[Tuple[date, date]] = None
+
+        # Occorrenze delle impronte hash nel file in corso
+        self._occurrences: Counter = Counter()
+        # Impronte accettate come nuove nell'import in corso (anche di file precedenti)
+        self._accepted: Set[str] = set()
+
+    def start_import(self) -> None:
+        """Prepara un nuovo import (contatori di occorrenza e impronte accettate azzerati)"""
+        self._occurrences.clear()
+        self._accepted.clear()
+
+    def start_file(self) -> None:
+        """Azzera i contatori di occorrenza prima di elaborare un nuovo file dello stesso import"""
+        self._occurrences.clear()
+
+    def close(self) -> None:
+        """Chiude il database locale"""
+        self.db.close()
+
+    # ------------------------------------------------------------------
+    # Chiavi Odoo
+    # ------------------------------------------------------------------
+
+    def ensure_range(self, date_from: str, date_to: str) -> None:
+        """
+        Garantisce che le chiavi Odoo del periodo siano in memoria
+
+        Legge solo la parte di periodo non ancora letta: con il periodo
+        dell'export noto in anticipo basta un'unica chiamata.
+
+        Args:
+            date_from: Data inizio ISO (inclusa)
+            date_to: Data fine ISO (inclusa)
+        """
+        if self.odoo is None:
+            return
+
+        start, end = date.fromisoformat(date_from), date.fromisoformat(date_to)
+        if self._fetched is None:
+            self._fetch(start, end)
+            self._fetched = (start, end)
+            return
+
+        fetched_start, fetched_end = self._fetched
+        if start < fetched_start:
+            self._fetch(start, fetched_start - timedelta(days=1))
+        if end > fetched_end:
+            self._fetch(fetched_end + timedelta(days=1), end)
+        self._fetched = (min(start, fetched_start), max(end, fetched_end))
+
+    def _fetch(self, start: date, end: date) -> None:
+        """Legge con un solo search_read le chiavi delle righe Odoo nel periodo"""
+        lines = self.odoo.search_read(
+            'account.bank.statement.line',
+            [
+                ('journal_id', '=', self.journal_id),
+                ('date', '>=', start.isoformat()),
+                ('date', '<=', end.isoformat()),
+            ],
+            fields=['date', 'amount', 'payment_ref', 'ref']
+        )
+
+        hashes = Counter()
+        for line in lines:
+            if line.get('ref'):
+                self._remote_keys.add(ref_fingerprint(line['ref']))
+            hashes[transaction_fingerprint(line['date'], to_cents(line['amount']), line.get('payment_ref'))] += 1
+
+        for fingerprint, count in hashes.items():
+            for occurrence in range(1, count + 1):
+                self._remote_keys.add(f"{fingerprint}#{occurrence}")
+
+    # ------------------------------------------------------------------
+    # Controllo e registrazione
+    # ------------------------------------------------------------------
+
+    def keys_for(self, vals: Dict) -> Tuple[str, Optional[str]]:
+        """
+        Calcola le impronte di un movimento (incrementa il contatore occorrenze)
+
+        Args:
+            vals: Valori account.bank.statement.line (date, amount, payment_ref, ref)
+
+        Returns:
+            Tuple (impronta hash con occorrenza, impronta ref o None)
+        """
+        fingerprint = transaction_fingerprint(vals['date'], to_cents(vals['amount']), vals.get('payment_ref'))
+        self._occurrences[fingerprint] += 1
+        hash_key = f"{fingerprint}#{self._occurrences[fingerprint]}"
+        ref_key = ref_fingerprint(vals['ref']) if vals.get('ref') else None
+        return hash_key, ref_key
+
+    def split_new(self, vals_list: List[Dict]) -> Tuple[List[Dict], List[str], List[Dict]]:
+        """
+        Divide un blocco di movimenti in nuovi e già importati
+
+        Già importati: presenti nell'indice locale o in Odoo, oppure accettati
+        prima nello stesso import (blocchi precedenti o righe precedenti del
+        blocco).
+
+        Args:
+            vals_list: Valori dei movimenti nell'ordine del file
+
+        Returns:
+            Tuple (nuovi, impronte dei nuovi da passare a record, duplicati)
+        """
+        keyed = [(vals, self.keys_for(vals)) for vals in vals_list]
+        local = self._local_keys([key for _, keys in keyed for key in keys if key])
+
+        new, new_keys, duplicates = [], [], []
+        for vals, (hash_key, ref_key) in keyed:
+            candidates = (hash_key, ref_key) if ref_key else (hash_key,)
+            if any(key in local or key in self._remote_keys or key in self._accepted for key in candidates):
+                duplicates.append(vals)
+            else:
+                self._accepted.update(candidates)
+                new.append(vals)
+                new_keys.append(ref_key or hash_key)
+        return new, new_keys, duplicates
+
+    def _local_keys(self, keys: List[str]) -> Set[str]:
+        """Impronte già presenti nell'indice locale (query a blocchi, nessuna RPC)"""
+        found = set()
+        for start in range(0, len(keys), _SQLITE_IN_LIMIT):
+            part = keys[start:start + _SQLITE_IN_LIMIT]
+            placeholders = ','.join('?' * len(part))
+            rows = self.db.execute(
+                f"SELECT fingerprint FROM imported_lines WHERE journal_id = ? AND fingerprint IN ({placeholders})",
+                [self.journal_id, *part]
+            )
+            found.update(row[0] for row in rows)
+        return found
+
+    def record(self, vals_list: List[Dict], fingerprints: List[str]) -> None:
+        """
+        Registra nell'indice locale i movimenti creati in Odoo
+
+        Args:
+            vals_list: Movimenti nuovi (da split_new), con 'odoo_id' se creati
+            fingerprints: Impronte corrispondenti (da split_new)
+        """
+        rows = [
+            (self.journal_id, fingerprint, vals['odoo_id'], vals['date'], to_cents(vals['amount']))
+            for vals, fingerprint in zip(vals_list, fingerprints)
+            if vals.get('odoo_id')
+        ]
+        self.db.executemany(
+            "INSERT OR REPLACE INTO imported_lines (journal_id, fingerprint, odoo_id, date, amount_cents) "
+            "VALUES (?, ?, ?, ?, ?)",
+            rows
+        )
+        self.db.commit()
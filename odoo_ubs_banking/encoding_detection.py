@@ -0,0 +1,218 @@
+"""
+Rilevamento encoding dei file CSV UBS
+
+Strategia (dalla più economica alla più costosa):
+1. BOM all'inizio del file (UTF-8/UTF-16)
+2. Cache persistente per profilo conto (IBAN letto dall'header), aggiornata
+   solo da campioni con caratteri non ASCII
+3. Campione iniziale valido in UTF-8
+4. chardet UniversalDetector incrementale su un campione limitato
+"""
+
+import codecs
+import csv
+import json
+import os
+import re
+from typing import Dict, Optional
+
+from chardet.universaldetector import UniversalDetector
+
+import config
+
+
+# Byte letti al massimo per il rilevamento (il file intero non viene mai caricato)
+SAMPLE_SIZE = 256 * 1024
+CHUNK_SIZE = 8 * 1024
+
+# Encoding usato se il campione non permette di decidere
+DEFAULT_ENCODING = 'utf-8'
+
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+
+class EncodingProfileCache:
+    """Cache su disco degli encoding rilevati, per profilo conto (IBAN)"""
+
+    def __init__(self, cache_file: str = None):
+        """
+        Inizializza cache
+
+        Args:
+            cache_file: Percorso file JSON della cache (default da config)
+        """
+        self.cache_file = cache_file or config.ENCODING_CACHE_FILE
+        self._profiles: Optional[Dict[str, str]] = None
+
+    def _load(self) -> Dict[str, str]:
+        if self._profiles is None:
+            try:
+                with open(self.cache_file, 'r', encoding='utf-8') as f:
+                    self._profiles = json.load(f)
+            except (OSError, ValueError):
+                self._profiles = {}
+        return self._profiles
+
+    def get(self, profile: str) -> Optional[str]:
+        """
+        Restituisce l'encoding memorizzato per un profilo
+
+        Args:
+            profile: Chiave profilo (IBAN normalizzato)
+
+        Returns:
+            Nome encoding o None se non in cache
+        """
+        return self._load().get(profile)
+
+    def set(self, profile: str, encoding: str) -> None:
+        """
+        Memorizza l'encoding di un profilo
+
+        Args:
+            profile: Chiave profilo (IBAN normalizzato)
+            encoding: Nome encoding
+        """
+        profiles = self._load()
+        if profiles.get(profile) == encoding:
+            return
+
+        profiles[profile] = encoding
+        self._save()
+
+    def invalidate(self, profile: str) -> None:
+        """
+        Rimuove un profilo dalla cache
+
+        Args:
+            profile: Chiave profilo (IBAN normalizzato)
+        """
+        if self._load().pop(profile, None) is not None:
+            self._save()
+
+    def _save(self) -> None:
+        """Scrive la cache su disco in modo atomico"""
+        tmp_file = f"{self.cache_file}.tmp"
+        try:
+            with open(tmp_file, 'w', encoding='utf-8') as f:
+                json.dump(self._profiles, f, indent=2, sort_keys=True)
+            os.replace(tmp_file, self.cache_file)
+        except OSError as e:
+            # La cache è solo un'ottimizzazione: non blocca l'import
+            print(f"⚠️  Impossibile salvare cache encoding: {e}")
+
+
+def normalize_iban(iban: str) -> str:
+    """
+    Normalizza un IBAN per confronti e chiavi (senza spazi, maiuscolo)
+
+    Args:
+        iban: IBAN in qualsiasi formato (es. "CH02 0027 8278 1220 8701 J")
+
+    Returns:
+        IBAN compatto (es. "CH020027827812208701J")
+    """
+    return re.sub(r'\s+', '', iban or '').upper()
+
+
+def read_profile_key(sample: bytes) -> Optional[str]:
+    """
+    Estrae l'IBAN dall'header account di un export UBS
+
+    L'header è ASCII, quindi viene decodificato in latin-1 (senza errori)
+    prima di conoscere l'encoding reale.
+
+    Args:
+        sample: Primi byte del file
+
+    Returns:
+        IBAN normalizzato o None se non presente
+    """
+    lines = sample.decode('latin-1').splitlines()[:2]
+    rows = list(csv.reader(lines, delimiter=';'))
+    if len(rows) < 2:
+        return None
+
+    for key, value in zip(rows[0], rows[1]):
+        if key.strip() == 'IBAN' and value.strip():
+            return normalize_iban(value)
+    return None
+
+
+def _is_utf8(sample: bytes, complete: bool) -> bool:
+    """Verifica se il campione è UTF-8 valido (tollera un carattere troncato in coda)"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    try:
+        decoder.decode(sample, final=complete)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+
+def _detect_with_chardet(sample: bytes) -> Optional[str]:
+    """Alimenta UniversalDetector a blocchi e si ferma appena è sicuro"""
+    detector = UniversalDetector()
+    for start in range(0, len(sample), CHUNK_SIZE):
+        detector.feed(sample[start:start + CHUNK_SIZE])
+        if detector.done:
+            break
+    detector.close()
+    return detector.result.get('encoding')
+
+
+def detect_encoding(file_path: str, cache: EncodingProfileCache = None,
+                    sample_size: int = SAMPLE_SIZE) -> str:
+    """
+    Rileva l'encoding di un file CSV UBS leggendo al massimo sample_size byte
+
+    Args:
+        file_path: Percorso file CSV
+        cache: Cache profili (default: cache su disco da config; False per disattivarla)
+        sample_size: Byte massimi letti per il rilevamento
+
+    Returns:
+        Nome encoding (es. 'utf-8', 'windows-1252')
+    """
+    if cache is None:
+        cache = EncodingProfileCache()
+
+    with open(file_path, 'rb') as f:
+        head = f.read(CHUNK_SIZE)
+
+        # 1. BOM: nessuna ambiguità
+        for bom, encoding in _BOMS:
+            if head.startswith(bom):
+                return encoding
+
+        # 2. Profilo conto già visto: verifica economica sul primo blocco
+        profile = read_profile_key(head) if cache else None
+        if profile:
+            cached = cache.get(profile)
+            if cached:
+                try:
+                    codecs.getincrementaldecoder(cached)().decode(head, final=False)
+                    return cached
+                except (UnicodeDecodeError, LookupError):
+                    cache.invalidate(profile)
+
+        # 3. Campione UTF-8 valido con almeno un carattere non ASCII
+        sample = head + f.read(max(0, sample_size - len(head)))
+        complete = len(sample) < sample_size
+        if not sample.isascii() and _is_utf8(sample, complete):
+            encoding = 'utf-8'
+        else:
+            # 4. Rilevamento statistico incrementale
+            encoding = _detect_with_chardet(sample) or DEFAULT_ENCODING
+            if encoding.lower() == 'ascii':
+                # ASCII puro nel campione: UTF-8 è un superset compatibile
+                encoding = DEFAULT_ENCODING
+
+    # Un campione solo ASCII non distingue UTF-8 da Latin-1: non vale per i prossimi export del conto
+    if profile and not sample.isascii():
+        cache.set(profile, encoding)
+
+    return encoding
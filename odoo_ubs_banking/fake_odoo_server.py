@@ -0,0 +1,387 @@
+"""
+Server Odoo XML-RPC finto in memoria (benchmark senza istanza Odoo)
+
+Risponde su /xmlrpc/2/common, /xmlrpc/2/object e /jsonrpc con i metodi usati da
+odoo_connector: authenticate, search_read, read, search, search_count,
+create e write (anche in blocco e con comandi one2many), unlink e, per la
+riconciliazione, button_draft/action_post e reconcile. I record
+vivono in memoria; i domini supportano gli operatori di confronto e
+'in'/'not in' in AND. Una latenza per chiamata simula la rete verso Odoo.sh, una latenza
+per record letto il lavoro dell'ORM (parallelizzabile tra worker Odoo); con
+un numero di worker le richieste oltre il limite ricevono 503 come su Odoo.sh.
+
+USO (programmatico):
+    server = FakeOdooServer(latency=0.02).start()
+    odoo = OdooConnector(server.url, 'bench', 'bench', 'bench')
+    ...
+    server.stop()
+"""
+
+import itertools
+import json
+import sys
+import threading
+import time
+import xmlrpc.client
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import config
+
+# Campi calcolati letti dagli script e non presenti nei valori di create
+_DEFAULTS = {
+    'account.bank.statement.line': {'is_reconciled': False, 'statement_id': False, 'partner_id': False,
+                                    'running_balance': 0.0, 'move_id': False},
+}
+
+
+class FakeOdoo:
+    """Database Odoo in memoria con i metodi ORM usati dall'importatore"""
+
+    def __init__(self, partners: int = 200, latency: float = 0.0, read_latency: float = 0.0,
+                 workers: int = 0):
+        """
+        Args:
+            partners: Partner (con conto bancario) creati all'avvio
+            latency: Secondi di attesa per chiamata (simula il tempo di rete)
+            read_latency: Secondi di attesa per record restituito da search_read/read
+            workers: Richieste servite contemporaneamente (0 = illimitate; oltre: HTTP 503)
+        """
+        self.latency = latency
+        self.read_latency = read_latency
+        self.workers = workers
+        self.busy = 0
+        self.rejected = 0
+        self.records: Dict[str, Dict[int, Dict]] = {}
+        self.calls: Dict[str, int] = {}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+        for journal in config.GIORNALI_UBS.values():
+            self._store('account.journal', {
+                'id': journal['id'], 'name': journal['nome'], 'code': journal['codice'], 'type': 'bank',
+                'currency_id': False, 'bank_account_id': False,
+                'suspense_account_id': [journal['conto_sospeso_id'], 'Bank Suspense Account'],
+            })
+        for number in range(1, partners + 1):
+            partner_id = self._store('res.partner', {
+                'name': f"Partner {number:05d} AG", 'vat': f"CHE-{number:03d}.000.000 MWST",
+                'commercial_partner_id': False,
+            })
+            self.records['res.partner'][partner_id]['commercial_partner_id'] = [partner_id, '']
+            self._store('res.partner.bank', {'acc_number': f"CH00 0000 0000 0000 {number:05d}",
+                                             'partner_id': [partner_id, '']})
+
+    # --- Endpoint ---------------------------------------------------------
+
+    def admit(self) -> bool:
+        """Occupa un worker; False se sono tutti occupati (richiesta da rifiutare con 503)"""
+        with self._lock:
+            if self.workers and self.busy >= self.workers:
+                self.rejected += 1
+                return False
+            self.busy += 1
+            return True
+
+    def leave(self) -> None:
+        """Libera il worker occupato con admit()"""
+        with self._lock:
+            self.busy -= 1
+
+    def dispatch(self, service: str, method: str, params: List) -> Any:
+        """
+        Esegue una chiamata RPC
+
+        Args:
+            service: 'common' o 'object'
+            method: Metodo RPC (authenticate, version, execute_kw)
+            params: Parametri posizionali
+
+        Raises:
+            xmlrpc.client.Fault: Errore applicativo (come Odoo)
+        """
+        if self.latency:
+            time.sleep(self.latency)
+        if service == 'common':
+            if method == 'version':
+                return {'server_version': '17.0', 'server_serie': '17.0', 'protocol_version': 1}
+            if method in ('authenticate', 'login'):
+                return 2
+        elif service == 'object' and method == 'execute_kw':
+            _, uid, _, model, orm_method, args, *rest = params
+            if uid != 2:
+                raise xmlrpc.client.Fault(3, "Access Denied")
+            kwargs = rest[0] if rest else {}
+            with self._lock:
+                self.calls[f"{model}.{orm_method}"] = self.calls.get(f"{model}.{orm_method}", 0) + 1
+                result = self.execute_kw(model, orm_method, list(args), kwargs or {})
+            if self.read_latency and orm_method in ('search_read', 'read'):
+                time.sleep(self.read_latency * len(result))
+            return result
+        raise xmlrpc.client.Fault(1, f"Metodo non supportato: {service}.{method}")
+
+    def execute_kw(self, model: str, method: str, args: List, kwargs: Dict) -> Any:
+        """Metodi ORM su un modello"""
+        if method == 'search_read':
+            domain = args[0] if args else kwargs.get('domain', [])
+            records = self._search(model, domain, kwargs.get('order'), kwargs.get('offset', 0),
+                                   kwargs.get('limit'))
+            return [self._fields(record, kwargs.get('fields')) for record in records]
+        if method == 'search':
+            return [record['id'] for record in self._search(model, args[0], kwargs.get('order'),
+                                                            kwargs.get('offset', 0), kwargs.get('limit'))]
+        if method == 'search_count':
+            return len(self._search(model, args[0]))
+        if method == 'read':
+            table = self.records.get(model, {})
+            return [self._fields(table[record_id], args[1] if len(args) > 1 else kwargs.get('fields'))
+                    for record_id in args[0] if record_id in table]
+        if method == 'create':
+            if isinstance(args[0], list):
+                return [self._create(model, vals) for vals in args[0]]
+            return self._create(model, args[0])
+        if method == 'write':
+            self._write(model, args[0], args[1])
+            return True
+        if method in ('button_draft', 'action_post'):
+            for record_id in args[0]:
+                self.records[model][record_id]['state'] = 'draft' if method == 'button_draft' else 'posted'
+            return True
+        if method == 'reconcile':
+            for record_id in args[0]:
+                self.records[model][record_id]['reconciled'] = True
+            return True
+        if method == 'unlink':
+            for record_id in args[0]:
+                self.records.get(model, {}).pop(record_id, None)
+            return True
+        if method == 'fields_get':
+            return {}
+        raise xmlrpc.client.Fault(1, f"Metodo ORM non supportato: {model}.{method}")
+
+    # --- ORM minimo -------------------------------------------------------
+
+    def _store(self, model: str, vals: Dict) -> int:
+        record = dict(_DEFAULTS.get(model, {}))
+        record.update(vals)
+        record.setdefault('id', next(self._ids))
+        self.records.setdefault(model, {})[record['id']] = record
+        return record['id']
+
+    def _create(self, model: str, vals: Dict) -> int:
+        vals = dict(vals)
+        if 'date' not in vals and model == 'account.bank.statement.line':
+            raise xmlrpc.client.Fault(2, "ValidationError: campo obbligatorio 'date' mancante")
+        commands = vals.pop('line_ids', None)
+        for field, value in list(vals.items()):
+            # Many2one come in lettura Odoo: [id, nome]
+            if field.endswith('_id') and isinstance(value, int) and not isinstance(value, bool):
+                vals[field] = [value, '']
+        record_id = self._store(model, vals)
+        if commands:
+            for command in commands:
+                if command[0] == 0:
+                    self._create(f"{model}.line", dict(command[2], statement_id=record_id))
+        return record_id
+
+    def _write(self, model: str, ids: List[int], vals: Dict) -> None:
+        vals = dict(vals)
+        commands = vals.pop('line_ids', None)
+        for field, value in list(vals.items()):
+            if field.endswith('_id') and isinstance(value, int) and not isinstance(value, bool):
+                vals[field] = [value, '']
+        for record_id in ids:
+            self.records[model][record_id].update(vals)
+        for command in commands or []:
+            # Comandi one2many: 0 = crea, 1 = aggiorna la riga command[1]
+            if command[0] == 0:
+                self._create(f"{model}.line", dict(command[2]))
+            elif command[0] == 1:
+                self._write(f"{model}.line", [command[1]], command[2])
+
+    def _search(self, model: str, domain: List, order: str = None, offset: int = 0,
+                limit: int = None) -> List[Dict]:
+        records = [record for record in self.records.get(model, {}).values()
+                   if all(self._match(record, term) for term in domain if not isinstance(term, str))]
+        if order:
+            for part in reversed(order.split(',')):
+                field, _, direction = part.strip().partition(' ')
+                if field == 'internal_index':
+                    key = lambda record: (record.get('date') or '', record['id'])
+                else:
+                    key = lambda record, field=field: _sort_value(record.get(field))
+                records.sort(key=key, reverse=direction.strip().lower() == 'desc')
+        records = records[offset or 0:]
+        return records[:limit] if limit else records
+
+    @staticmethod
+    def _match(record: Dict, term: List) -> bool:
+        field, operator, value = term
+        actual = record.get(field)
+        if isinstance(actual, list):
+            actual = actual[0]
+        if operator == '=':
+            return actual == value or (value is False and actual is None)
+        if operator == '!=':
+            return actual != value
+        if operator == 'in':
+            return actual in value
+        if operator == 'not in':
+            return actual not in value
+        if actual is None or actual is False:
+            return False
+        if operator == '>':
+            return actual > value
+        if operator == '>=':
+            return actual >= value
+        if operator == '<':
+            return actual < value
+        if operator == '<=':
+            return actual <= value
+        if operator in ('ilike', '=ilike'):
+            return str(value).strip('%').lower() in str(actual).lower()
+        raise xmlrpc.client.Fault(1, f"Operatore dominio non supportato: {operator}")
+
+    @staticmethod
+    def _fields(record: Dict, fields: List[str] = None) -> Dict:
+        if not fields:
+            return dict(record)
+        result = {'id': record['id']}
+        for field in fields:
+            value = record.get(field, False)
+            result[field] = False if value is None else value
+        return result
+
+
+def _sort_value(value: Any) -> Any:
+    if isinstance(value, list):
+        return value[0]
+    return value if value not in (None, False) else ''
+
+
+def encode_response(result: Any, protocol: str = 'xmlrpc', request_id: Any = None) -> bytes:
+    """
+    Corpo della risposta come lo serializza Odoo
+
+    Args:
+        result: Risultato della chiamata o xmlrpc.client.Fault
+        protocol: 'xmlrpc' o 'jsonrpc'
+        request_id: id della richiesta JSON-RPC
+
+    Returns:
+        Corpo HTTP in bytes
+    """
+    if protocol == 'jsonrpc':
+        reply = {'jsonrpc': '2.0', 'id': request_id}
+        if isinstance(result, xmlrpc.client.Fault):
+            # Stessa struttura di odoo.http: eccezioni utente con il messaggio, le altre con il traceback
+            name = {2: 'odoo.exceptions.ValidationError',
+                    3: 'odoo.exceptions.AccessDenied'}.get(result.faultCode, 'builtins.Exception')
+            reply['error'] = {'code': 200, 'message': 'Odoo Server Error',
+                              'data': {'name': name, 'message': result.faultString,
+                                       'debug': result.faultString, 'arguments': [result.faultString]}}
+        else:
+            reply['result'] = result
+        return json.dumps(reply).encode('utf-8')
+    if isinstance(result, xmlrpc.client.Fault):
+        return xmlrpc.client.dumps(result, methodresponse=True, allow_none=True).encode('utf-8')
+    return xmlrpc.client.dumps((result,), methodresponse=True, allow_none=True).encode('utf-8')
+
+
+class _Handler(BaseHTTPRequestHandler):
+    """Richieste su /xmlrpc/2/<servizio> e /jsonrpc (HTTP/1.1, connessioni persistenti)"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self) -> None:
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        protocol = 'jsonrpc' if self.path.rstrip('/') == '/jsonrpc' else 'xmlrpc'
+        request_id = None
+        if not self.server.odoo.admit():
+            self._reply(b'Service Unavailable', 'text/plain', 503)
+            return
+        try:
+            if protocol == 'jsonrpc':
+                request = json.loads(body)
+                request_id = request.get('id')
+                params = request['params']
+                service, method, args = params['service'], params['method'], params.get('args', [])
+            else:
+                service = self.path.rstrip('/').rsplit('/', 1)[-1]
+                args, method = xmlrpc.client.loads(body, use_builtin_types=True)
+            result = self.server.odoo.dispatch(service, method, list(args))
+        except xmlrpc.client.Fault as fault:
+            result = fault
+        except Exception as e:
+            result = xmlrpc.client.Fault(1, f"Traceback...\n{type(e).__name__}: {e}")
+        finally:
+            self.server.odoo.leave()
+        content_type = 'application/json' if protocol == 'jsonrpc' else 'text/xml'
+        self._reply(encode_response(result, protocol, request_id), content_type)
+
+    def _reply(self, payload: bytes, content_type: str, status: int = 200) -> None:
+        self.server.bytes_sent += len(payload)
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def handle_error(self, request, client_address) -> None:
+        # Client che chiude la connessione (es. dopo un 503): non è un errore del server
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeOdooServer:
+    """Server HTTP locale (thread in background) davanti a un FakeOdoo"""
+
+    def __init__(self, odoo: FakeOdoo = None, latency: float = 0.0, host: str = '127.0.0.1', port: int = 0):
+        """
+        Args:
+            odoo: Database finto (default FakeOdoo con la latenza indicata)
+            latency: Secondi di attesa per chiamata se odoo non è passato
+            host: Indirizzo di ascolto
+            port: Porta (0 = scelta dal sistema)
+        """
+        self.odoo = odoo or FakeOdoo(latency=latency)
+        self.httpd = _Server((host, port), _Handler)
+        self.httpd.odoo = self.odoo
+        self.httpd.bytes_sent = 0
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def bytes_sent(self) -> int:
+        return self.httpd.bytes_sent
+
+    def start(self) -> 'FakeOdooServer':
+        self._thread = threading.Thread(target=self.httpd.serve_forever, name='fake-odoo', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+if __name__ == "__main__":
+    port = int(sys.argv[1]) if len(sys.argv) > 1 else 8069
+    server = FakeOdooServer(port=port, latency=float(sys.argv[2]) if len(sys.argv) > 2 else 0.0).start()
+    print(f"🧪 Odoo finto in ascolto su {server.url} (Ctrl+C per fermare)")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
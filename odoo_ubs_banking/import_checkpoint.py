@@ -0,0 +1,192 @@
+"""
+Checkpoint degli import UBS per riprendere un import interrotto
+
+Il journal è un file JSONL append-only accanto al CSV
+(<file.csv>.checkpoint.jsonl). Ogni riga è un evento scritto e sincronizzato
+su disco (fsync) prima di proseguire:
+
+    {"event": "start", "file_hash": ..., "journal_id": ..., ...}
+    {"event": "pending", "chunk": 3, "first_row": 1001, "last_row": 1500}
+    {"event": "commit", "chunk": 3, "first_row": 1001, "last_row": 1500, "odoo_ids": [...]}
+    {"event": "done", ...}
+
+Le righe fino all'ultimo "commit" sono sicuramente in Odoo. Un "pending"
+senza "commit" indica un blocco che potrebbe essere stato salvato da Odoo
+prima dell'interruzione: alla ripresa viene ritentato e il controllo
+duplicati (dedup_index) evita di crearlo due volte.
+"""
+
+import hashlib
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def file_sha256(file_path: str, block_size: int = 1024 * 1024) -> str:
+    """
+    Calcola l'hash SHA-256 di un file leggendolo a blocchi
+
+    Args:
+        file_path: Percorso file
+        block_size: Dimensione blocco di lettura
+
+    Returns:
+        Hash esadecimale
+    """
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ImportCheckpoint:
+    """Journal append-only dei blocchi importati da un file CSV"""
+
+    def __init__(self, csv_file_path: str, journal_id: int, checkpoint_path: str = None):
+        """
+        Inizializza checkpoint
+
+        Args:
+            csv_file_path: Percorso file CSV importato
+            journal_id: ID giornale bancario
+            checkpoint_path: Percorso journal (default <csv>.checkpoint.jsonl)
+        """
+        self.csv_file_path = csv_file_path
+        self.journal_id = journal_id
+        self.path = checkpoint_path or f"{csv_file_path}.checkpoint.jsonl"
+        self.file_hash = file_sha256(csv_file_path)
+
+        self.last_row = 0          # ultima riga (1-based) sicuramente elaborata
+        self.last_chunk = 0
+        self.sent_chunk = 0        # ultimo blocco inviato (può precedere i commit con upload in parallelo)
+        self.odoo_ids: List[int] = []
+        self.pending: Optional[Dict] = None
+        self.completed = False
+
+    def load(self) -> bool:
+        """
+        Legge un journal esistente per lo stesso file e giornale
+
+        Returns:
+            True se il journal è valido e può essere ripreso
+        """
+        if not os.path.exists(self.path):
+            return False
+
+        events = []
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    # Ultima riga troncata da un'interruzione durante la scrittura
+                    break
+
+        if not events or events[0].get('event') != 'start':
+            return False
+        start = events[0]
+        if start.get('file_hash') != self.file_hash or start.get('journal_id') != self.journal_id:
+            return False
+
+        for event in events[1:]:
+            if event['event'] == 'pending':
+                self.pending = event
+            elif event['event'] == 'commit':
+                self.last_row = event['last_row']
+                self.last_chunk = event['chunk']
+                self.odoo_ids.extend(event.get('odoo_ids', []))
+                self.pending = None
+            elif event['event'] == 'done':
+                self.completed = True
+
+        self.sent_chunk = self.last_chunk
+        return True
+
+    def begin(self, resume: bool = False) -> int:
+        """
+        Apre il journal per un nuovo import o per riprendere il precedente
+
+        Args:
+            resume: Se True e il journal corrisponde al file, riprende dall'ultimo commit
+
+        Returns:
+            Numero di righe già importate da saltare (0 se nuovo import)
+        """
+        if resume and self.load():
+            self._append({'event': 'resume', 'from_row': self.last_row + 1})
+            return self.last_row
+
+        self.last_row = 0
+        self.last_chunk = 0
+        self.sent_chunk = 0
+        self.odoo_ids = []
+        self.pending = None
+        self.completed = False
+
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({
+                'event': 'start',
+                'file': os.path.basename(self.csv_file_path),
+                'file_hash': self.file_hash,
+                'journal_id': self.journal_id,
+                'at': datetime.now().isoformat(timespec='seconds'),
+            }) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        return 0
+
+    def mark_pending(self, first_row: int, last_row: int) -> None:
+        """
+        Registra che un blocco sta per essere inviato a Odoo
+
+        Args:
+            first_row: Prima riga del blocco (1-based)
+            last_row: Ultima riga del blocco
+        """
+        self.sent_chunk += 1
+        self.pending = {'event': 'pending', 'chunk': self.sent_chunk,
+                        'first_row': first_row, 'last_row': last_row}
+        self._append(self.pending)
+
+    def commit(self, first_row: int, last_row: int, odoo_ids: List[int], errors: int = 0) -> None:
+        """
+        Registra un blocco elaborato (righe create, duplicati saltati o errori)
+
+        Args:
+            first_row: Prima riga del blocco (1-based)
+            last_row: Ultima riga del blocco
+            odoo_ids: ID creati in Odoo
+            errors: Righe del blocco rifiutate da Odoo
+        """
+        self.last_chunk += 1
+        self.last_row = last_row
+        self.odoo_ids.extend(odoo_ids)
+        self.pending = None
+        self._append({'event': 'commit', 'chunk': self.last_chunk, 'first_row': first_row,
+                      'last_row': last_row, 'odoo_ids': odoo_ids, 'errors': errors})
+
+    def finish(self, stats: Dict) -> None:
+        """
+        Registra la fine dell'import
+
+        Args:
+            stats: Statistiche finali
+        """
+        self.completed = True
+        self._append({
+            'event': 'done',
+            'rows': self.last_row,
+            'imported': stats.get('imported', 0),
+            'skipped': stats.get('skipped', 0),
+            'errors': stats.get('errors', 0),
+            'at': datetime.now().isoformat(timespec='seconds'),
+        })
+
+    def _append(self, event: Dict) -> None:
+        """Aggiunge un evento al journal e lo rende durevole prima di proseguire"""
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(event) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
@@ -0,0 +1,195 @@
+"""
+Pipeline parsing → upload per gli import bancari
+
+Il thread principale legge e trasforma il CSV e mette i blocchi in code
+limitate (backpressure: la memoria resta limitata a pochi blocchi in volo);
+uno o più thread uploader, ognuno con il proprio OdooConnector, li creano in
+Odoo. I risultati vengono restituiti nell'ordine di invio, così statistiche,
+indice duplicati e checkpoint restano sequenziali.
+
+Con ordered=True i blocchi di uno stesso giornale vanno sempre allo stesso
+uploader (creazione in ordine per giornale, parallelismo tra giornali): gli
+uploader sono al massimo quanti i giornali. Con ordered=False tutti gli
+uploader lavorano anche sullo stesso giornale.
+"""
+
+import itertools
+import queue
+import threading
+from typing import Any, Dict, List, Optional
+
+from odoo_connector import OdooConnector, BankStatementManager
+
+# Segnale di fine lavoro per gli uploader
+_STOP = object()
+
+
+class UploadJob:
+    """Blocco di movimenti da creare in Odoo"""
+
+    def __init__(self, seq: int, journal_id: int, vals_list: List[Dict], context: Any = None):
+        """
+        Args:
+            seq: Numero progressivo di invio
+            journal_id: Giornale bancario dei movimenti
+            vals_list: Valori account.bank.statement.line
+            context: Dati del chiamante restituiti insieme al risultato
+        """
+        self.seq = seq
+        self.journal_id = journal_id
+        self.vals_list = vals_list
+        self.context = context
+        self.results: List = []
+        self.error: Optional[str] = None
+
+
+class UploadPipeline:
+    """Uploader paralleli con code limitate e risultati in ordine di invio"""
+
+    def __init__(self, connector: OdooConnector, workers: int = 2, queue_size: int = None,
+                 ordered: bool = True, journals: int = None):
+        """
+        Inizializza pipeline
+
+        Args:
+            connector: Connessione di riferimento (ogni uploader ne apre una propria
+                       con le stesse credenziali)
+            workers: Numero di thread uploader
+            queue_size: Blocchi in attesa per coda (default 2)
+            ordered: Se True, i blocchi di un giornale vanno sempre allo stesso uploader
+            journals: Giornali distinti che verranno inviati (con ordered limita gli
+                      uploader: altri thread resterebbero inattivi)
+        """
+        self.connector = connector
+        self.requested_workers = max(1, workers)
+        self.workers = self.requested_workers
+        if ordered and journals:
+            self.workers = min(self.workers, max(1, journals))
+        self.queue_size = queue_size or 2
+        self.ordered = ordered
+
+        queue_count = self.workers if ordered else 1
+        self._queues = [queue.Queue(maxsize=self.queue_size) for _ in range(queue_count)]
+        self._journal_queue: Dict[int, int] = {}
+        self._results: queue.Queue = queue.Queue()
+        self._threads: List[threading.Thread] = []
+        self._seq = itertools.count(1)
+        self._next_seq = 1
+        self._ready: Dict[int, UploadJob] = {}
+        self._submitted = 0
+        self._closed = False
+        self.failed = threading.Event()
+
+    def start(self) -> 'UploadPipeline':
+        """Avvia i thread uploader"""
+        for index in range(self.workers):
+            job_queue = self._queues[index if self.ordered else 0]
+            thread = threading.Thread(target=self._worker, args=(job_queue,),
+                                      name=f"ubs-uploader-{index + 1}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def submit(self, journal_id: int, vals_list: List[Dict], context: Any = None) -> int:
+        """
+        Accoda un blocco (si blocca se la coda è piena)
+
+        Args:
+            journal_id: Giornale bancario
+            vals_list: Valori dei movimenti
+            context: Dati restituiti con il risultato
+
+        Returns:
+            Numero progressivo del blocco
+        """
+        job = UploadJob(next(self._seq), journal_id, vals_list, context)
+        self._queue_for(journal_id).put(job)
+        self._submitted += 1
+        return job.seq
+
+    def _queue_for(self, journal_id: int) -> queue.Queue:
+        if not self.ordered:
+            return self._queues[0]
+        if journal_id not in self._journal_queue:
+            # Assegnazione round-robin alla prima occorrenza del giornale
+            self._journal_queue[journal_id] = len(self._journal_queue) % len(self._queues)
+        return self._queues[self._journal_queue[journal_id]]
+
+    def completed(self, block: bool = False) -> List[UploadJob]:
+        """
+        Restituisce i blocchi completati, nell'ordine di invio
+
+        Args:
+            block: Se True, attende il prossimo blocco in ordine (se ce ne sono in volo)
+
+        Returns:
+            Lista blocchi completati e contigui nell'ordine di invio
+        """
+        while True:
+            try:
+                job = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._ready[job.seq] = job
+
+        if block:
+            while self._next_seq not in self._ready and self._next_seq <= self._submitted:
+                job = self._results.get()
+                self._ready[job.seq] = job
+
+        done = []
+        while self._next_seq in self._ready:
+            done.append(self._ready.pop(self._next_seq))
+            self._next_seq += 1
+        return done
+
+    def close(self) -> List[UploadJob]:
+        """
+        Attende la fine di tutti i blocchi accodati e ferma gli uploader
+
+        Returns:
+            Blocchi completati non ancora restituiti, in ordine di invio
+        """
+        if not self._closed:
+            self._closed = True
+            # Un segnale di stop per ogni uploader in ascolto sulla coda
+            for job_queue in self._queues:
+                for _ in range(1 if self.ordered else self.workers):
+                    job_queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+
+        done = []
+        while self._next_seq <= self._submitted:
+            done.extend(self.completed(block=True))
+        return done
+
+    def _worker(self, job_queue: queue.Queue) -> None:
+        """Ciclo uploader: una connessione Odoo propria per thread"""
+        manager = None
+        connect_error = None
+        try:
+            connector = self.connector.clone()
+            manager = BankStatementManager(connector)
+        except Exception as e:
+            connect_error = f"Connessione uploader fallita: {e}"
+
+        while True:
+            job = job_queue.get()
+            if job is _STOP:
+                break
+
+            if connect_error:
+                job.error = connect_error
+                self.failed.set()
+            elif self.failed.is_set():
+                # Dopo un errore di trasporto i blocchi successivi non vengono inviati
+                job.error = "Annullato dopo errore di un altro blocco"
+            else:
+                try:
+                    job.results = manager.create_statement_lines(job.vals_list)
+                except Exception as e:
+                    job.error = str(e)
+                    self.failed.set()
+
+            self._results.put(job)
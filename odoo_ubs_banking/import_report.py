@@ -0,0 +1,73 @@
+"""
+Report per riga degli import UBS scritto su disco durante l'import
+
+Con file grandi le statistiche in memoria tengono solo contatori e totali:
+l'esito di ogni movimento viene scritto subito in un file JSONL o CSV
+(formato dall'estensione) e non resta in memoria.
+
+    {"date": "2025-11-07", "amount": 4987.21, "payment_ref": "...", "status": "imported", "odoo_id": 1234}
+
+Esiti: imported (creato in Odoo), simulated (dry run), skipped (già
+importato), error (rifiutato da Odoo o riga non valida).
+"""
+
+import csv
+import json
+from typing import Dict, Optional
+
+# Colonne del report (anche ordine delle colonne CSV)
+REPORT_FIELDS = ['date', 'amount', 'payment_ref', 'ref', 'partner_name', 'partner_id',
+                 'status', 'odoo_id', 'error']
+
+
+class ImportReport:
+    """Scrittore in streaming dell'esito di ogni movimento (JSONL o CSV)"""
+
+    def __init__(self, path: str):
+        """
+        Apre il file di report (sovrascrive un report esistente)
+
+        Args:
+            path: Percorso file; .csv scrive CSV, qualsiasi altra estensione JSONL
+        """
+        self.path = path
+        self.format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        self.rows = 0
+        self._file = open(path, 'w', encoding='utf-8', newline='')
+        self._writer = None
+        if self.format == 'csv':
+            self._writer = csv.DictWriter(self._file, fieldnames=REPORT_FIELDS, delimiter=';',
+                                          extrasaction='ignore')
+            self._writer.writeheader()
+
+    def write(self, odoo_data: Dict, status: str, odoo_id: Optional[int] = None,
+              error: Optional[str] = None) -> None:
+        """
+        Scrive l'esito di un movimento
+
+        Args:
+            odoo_data: Valori account.bank.statement.line del movimento
+            status: imported, simulated, skipped o error
+            odoo_id: ID riga creata in Odoo
+            error: Messaggio di errore
+        """
+        row = {field: odoo_data.get(field) for field in REPORT_FIELDS[:6]}
+        row['status'] = status
+        row['odoo_id'] = odoo_id
+        row['error'] = error
+        if self._writer:
+            self._writer.writerow(row)
+        else:
+            self._file.write(json.dumps(row, ensure_ascii=False) + '\n')
+        self.rows += 1
+
+    def close(self) -> None:
+        """Chiude il file di report"""
+        if not self._file.closed:
+            self._file.close()
+
+    def __enter__(self) -> 'ImportReport':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -0,0 +1,172 @@
+"""
+Cache read-through per letture Odoo che cambiano raramente
+
+Giornali, valute, società, tag e definizioni dei campi (fields_get) vengono
+letti a ogni avvio degli script. Il connettore consulta prima questa cache:
+- in memoria: LRU di max_entries risultati
+- su disco (facoltativa): SQLite condiviso tra esecuzioni e processi
+
+Chiave: (URL, database, utente, modello, metodo, argomenti). Durata per
+modello (o per metodo su tutti i modelli, es. '*.fields_get'); i modelli
+senza durata non vengono mai messi in cache. Una scrittura (create/write/unlink/...) su un
+modello tramite il connettore elimina i suoi risultati; le definizioni dei
+campi restano (non dipendono dai record). Modifiche fatte da altri in Odoo
+sono visibili al più tardi alla scadenza.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+# Metodi che leggono lo schema, non i record: non invalidati dalle scritture
+_SCHEMA_METHODS = ('fields_get',)
+
+_MISSING = object()
+
+
+class ReadCache:
+    """Cache LRU in memoria + SQLite facoltativo con durata per modello"""
+
+    def __init__(self, ttls: Dict[str, float], path: str = None, max_entries: int = 1024):
+        """
+        Args:
+            ttls: Secondi di validità per 'modello', 'modello.metodo' o '*.metodo'
+            path: Database SQLite (None o '' = solo in memoria)
+            max_entries: Risultati tenuti in memoria
+        """
+        self.ttls = dict(ttls)
+        self.path = path or None
+        self.max_entries = max_entries
+        self.stats = {'hits': 0, 'disk_hits': 0, 'misses': 0, 'invalidations': 0}
+
+        self._memory: 'OrderedDict[str, tuple]' = OrderedDict()   # chiave -> (modello, metodo, scadenza, json)
+        self._lock = threading.Lock()
+        self.db = None
+        if self.path:
+            self.db = sqlite3.connect(self.path, check_same_thread=False)
+            self.db.execute("""
+                CREATE TABLE IF NOT EXISTS rpc_cache (
+                    key TEXT PRIMARY KEY,
+                    model TEXT NOT NULL,
+                    method TEXT NOT NULL,
+                    expires REAL NOT NULL,
+                    value TEXT NOT NULL
+                )
+            """)
+            self.db.execute("DELETE FROM rpc_cache WHERE expires < ?", (time.time(),))
+            self.db.commit()
+
+    def ttl(self, model: str, method: str) -> float:
+        """Secondi di validità per model.method (0 = non in cache)"""
+        for rule in (f"{model}.{method}", model, f"*.{method}"):
+            if rule in self.ttls:
+                return self.ttls[rule]
+        return 0
+
+    def read_through(self, scope: str, model: str, method: str, args: Any, kwargs: Dict,
+                     fetch: Callable[[], Any]) -> Any:
+        """
+        Restituisce il risultato in cache o lo legge con fetch() e lo salva
+
+        Args:
+            scope: URL, database e utente (istanze e diritti diversi non si mescolano)
+            model: Modello
+            method: Metodo di lettura
+            args: Argomenti posizionali della chiamata
+            kwargs: Argomenti nominali della chiamata
+            fetch: Chiamata RPC da eseguire se il risultato manca o è scaduto
+
+        Returns:
+            Risultato (copia: modificarlo non altera la cache)
+        """
+        ttl = self.ttl(model, method)
+        if ttl <= 0:
+            return fetch()
+        try:
+            key = hashlib.sha1(json.dumps([scope, model, method, args, kwargs], sort_keys=True)
+                               .encode('utf-8')).hexdigest()
+        except TypeError:
+            return fetch()
+
+        cached = self._get(key)
+        if cached is not _MISSING:
+            return cached
+
+        result = fetch()
+        try:
+            self._put(key, model, method, time.time() + ttl, json.dumps(result))
+        except TypeError:
+            pass   # valori non JSON (es. xmlrpc DateTime): non in cache
+        return result
+
+    def invalidate(self, model: str = None) -> None:
+        """
+        Elimina i risultati di un modello (tutti se model è None)
+
+        Args:
+            model: Modello scritto; le letture di schema (fields_get) restano
+        """
+        if model is not None and not any(rule == model or rule.startswith(f"{model}.") for rule in self.ttls):
+            return
+        with self._lock:
+            stale = [key for key, (entry_model, entry_method, _, _) in self._memory.items()
+                     if model is None or (entry_model == model and entry_method not in _SCHEMA_METHODS)]
+            for key in stale:
+                del self._memory[key]
+            if self.db is not None:
+                if model is None:
+                    self.db.execute("DELETE FROM rpc_cache")
+                else:
+                    placeholders = ','.join('?' * len(_SCHEMA_METHODS))
+                    self.db.execute(f"DELETE FROM rpc_cache WHERE model = ? AND method NOT IN ({placeholders})",
+                                    (model, *_SCHEMA_METHODS))
+                self.db.commit()
+            self.stats['invalidations'] += 1
+
+    def close(self) -> None:
+        """Chiude il database su disco"""
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+    def _get(self, key: str) -> Any:
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry and entry[2] > now:
+                self._memory.move_to_end(key)
+                self.stats['hits'] += 1
+                return json.loads(entry[3])
+            if self.db is not None:
+                row = self.db.execute("SELECT model, method, expires, value FROM rpc_cache WHERE key = ?",
+                                      (key,)).fetchone()
+                if row and row[2] > now:
+                    self._remember(key, tuple(row))
+                    self.stats['disk_hits'] += 1
+                    return json.loads(row[3])
+            self.stats['misses'] += 1
+        return _MISSING
+
+    def _put(self, key: str, model: str, method: str, expires: float, value: str) -> None:
+        with self._lock:
+            self._remember(key, (model, method, expires, value))
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO rpc_cache (key, model, method, expires, value) "
+                                "VALUES (?, ?, ?, ?, ?)", (key, model, method, expires, value))
+                self.db.commit()
+
+    def _remember(self, key: str, entry: tuple) -> None:
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def snapshot(self) -> Dict:
+        """Contatori hit/miss e risultati in memoria"""
+        with self._lock:
+            return dict(self.stats, entries=len(self._memory))
+
@@ -1,18 +1,37 @@
 """
-Connettore Odoo XML-RPC per gestione movimenti bancari
+Connettore Odoo XML-RPC / JSON-RPC per gestione movimenti bancari
 """
 
+import itertools
+import queue
+import threading
+import time
 import xmlrpc.client
 import ssl
-from typing import Dict, List, Any, Optional
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, Iterator, List, Any, Optional, Tuple
 from datetime import datetime
 import config
+from odoo_cache import ReadCache
+from odoo_limiter import READ_METHODS, AdaptiveLimiter
+from odoo_metrics import RpcMetrics
+from odoo_session import SessionCache
+from odoo_transport import ConnectionPool, JsonRpcProxy, io_counters, pooled_server_proxy
+from swiss_format import parse_amount_cents, parse_date_iso, cents_to_amount
+from transaction_batch import to_cents
+
+
+# Protocolli RPC supportati
+PROTOCOLS = ('xmlrpc', 'jsonrpc')
 
 
 class OdooConnector:
-    """Gestisce la connessione a Odoo via XML-RPC"""
+    """Gestisce la connessione a Odoo via XML-RPC o JSON-RPC"""
 
-    def __init__(self, url: str = None, db: str = None, username: str = None, password: str = None):
+    def __init__(self, url: str = None, db: str = None, username: str = None, password: str = None,
+                 pool_size: int = None, protocol: str = None, cache: ReadCache = None,
+                 metrics: RpcMetrics = None):
         """
         Inizializza connessione Odoo
 
@@ -21,20 +40,42 @@ class OdooConnector:
             db: Database Odoo (default da config)
             username: Username (default da config)
             password: Password (default da config)
+            pool_size: Connessioni HTTP persistenti condivise tra thread (default config.ODOO_POOL_SIZE)
+            protocol: 'xmlrpc' o 'jsonrpc' (default config.ODOO_PROTOCOL)
+            cache: Cache delle letture (default config.ODOO_CACHE_TTLS su config.ODOO_CACHE_FILE)
+            metrics: Metriche per chiamata (default nuove; condivise con i cloni)
         """
         self.url = url or config.ODOO_URL
         self.db = db or config.ODOO_DB
         self.username = username or config.ODOO_USERNAME
         self.password = password or config.ODOO_PASSWORD
+        self.pool_size = pool_size or config.ODOO_POOL_SIZE
+        self.protocol = protocol or config.ODOO_PROTOCOL
+        if self.protocol not in PROTOCOLS:
+            raise ValueError(f"Protocollo non valido: {self.protocol} ({', '.join(PROTOCOLS)})")
 
         self.uid = None
         self.models = None
         self.common = None
+        self.pool: Optional[ConnectionPool] = None
+        # Chiamate contemporanee regolate in base a latenza ed errori di sovraccarico (condiviso con i cloni)
+        self.limiter = AdaptiveLimiter(maximum=self.pool_size, retries=config.ODOO_RETRIES,
+                                       slow_seconds=config.ODOO_SLOW_CALL_SECONDS)
+        # Letture che cambiano raramente (giornali, valute, fields_get, ...) servite dalla cache
+        self.cache = cache or ReadCache(config.ODOO_CACHE_TTLS, config.ODOO_CACHE_FILE)
+        # uid delle esecuzioni precedenti: niente authenticate a ogni avvio
+        self.sessions = SessionCache(config.ODOO_SESSION_FILE, config.ODOO_SESSION_TTL)
+        # Durata, record e byte per modello.metodo (tabella/file a fine esecuzione se configurati)
+        self.metrics = metrics or RpcMetrics()
 
     def connect(self) -> bool:
         """
         Connette a Odoo e autentica l'utente
 
+        Se un'esecuzione precedente ha salvato il uid (config.ODOO_SESSION_FILE)
+        non chiama authenticate: un uid non più valido viene rinnovato alla
+        prima chiamata rifiutata (vedi execute).
+
         Returns:
             bool: True se connessione riuscita
         """
@@ -42,37 +83,92 @@ class OdooConnector:
             # Crea contesto SSL non verificato (per staging)
             context = ssl._create_unverified_context()
 
+            # Connessioni keep-alive condivise da common, object e da tutti i thread
+            if self.pool is None:
+                self.pool = ConnectionPool(self.url, self.pool_size, context=context)
+
             # Connessione common (autenticazione)
-            common_url = f"{self.url}/xmlrpc/2/common"
-            self.common = xmlrpc.client.ServerProxy(common_url, context=context)
+            self.common = self._proxy('common')
 
-            # Autenticazione
-            self.uid = self.common.authenticate(
-                self.db,
-                self.username,
-                self.password,
-                {}
-            )
+            # Autenticazione (saltata se il uid è in cache)
+            self.uid = self.sessions.get(self.url, self.db, self.username)
+            cached = bool(self.uid)
+            if not self.uid:
+                self.uid = self._authenticate()
 
             if not self.uid:
                 print("❌ Autenticazione fallita!")
                 return False
 
             # Connessione models (operazioni)
-            models_url = f"{self.url}/xmlrpc/2/object"
-            self.models = xmlrpc.client.ServerProxy(models_url, context=context)
+            self.models = self._proxy('object')
 
-            print(f"✅ Connesso a Odoo come UID {self.uid}")
+            print(f"✅ Connesso a Odoo come UID {self.uid}" + (" (sessione in cache)" if cached else ""))
+            self.metrics.report_at_exit(config.ODOO_METRICS_TABLE, config.ODOO_METRICS_FILE)
             return True
 
         except Exception as e:
             print(f"❌ Errore connessione: {e}")
             return False
 
+    def _authenticate(self) -> Optional[int]:
+        """authenticate su Odoo; il uid ottenuto viene salvato per le prossime esecuzioni"""
+        uid = self.common.authenticate(self.db, self.username, self.password, {})
+        if uid:
+            self.sessions.put(self.url, self.db, self.username, uid)
+        return uid
+
+    def clone(self) -> 'OdooConnector':
+        """
+        Crea un connettore per un altro thread con le stesse credenziali
+
+        Condivide cache delle letture e metriche; se questo connettore è già connesso,
+        anche sessione (uid), pool di connessioni e limite di chiamate
+        contemporanee: nessuna nuova autenticazione né handshake.
+
+        Returns:
+            Nuovo OdooConnector connesso
+
+        Raises:
+            Exception: Se la connessione fallisce
+        """
+        connector = OdooConnector(self.url, self.db, self.username, self.password, self.pool_size,
+                                  self.protocol, self.cache, self.metrics)
+        if self.uid and self.pool is not None:
+            connector.uid = self.uid
+            connector.pool = self.pool
+            connector.limiter = self.limiter
+            connector.common = self.common
+            connector.models = self.models
+            return connector
+        if not connector.connect():
+            raise Exception("Impossibile connettersi a Odoo")
+        return connector
+
+    def _proxy(self, service: str):
+        """Proxy RPC sul pool per un servizio Odoo ('common' o 'object')"""
+        if self.protocol == 'jsonrpc':
+            return JsonRpcProxy(f"{self.url}/jsonrpc", self.pool, service)
+        return pooled_server_proxy(f"{self.url}/xmlrpc/2/{service}", self.pool)
+
+    def close(self) -> None:
+        """Chiude le connessioni HTTP inattive del pool e la cache su disco (condivisi con i cloni)"""
+        if self.pool is not None:
+            self.pool.close()
+        self.cache.close()
+
     def execute(self, model: str, method: str, *args, **kwargs) -> Any:
         """
         Esegue un metodo su un modello Odoo
 
+        Attende se le chiamate in volo (di tutti i thread) hanno raggiunto il
+        limite adattivo; le letture fallite per sovraccarico vengono ripetute.
+        Le letture dei modelli con durata in config.ODOO_CACHE_TTLS passano
+        dalla cache; ogni altra chiamata invalida i risultati del modello.
+        Se Odoo rifiuta l'accesso (uid in cache scaduto) si autentica di nuovo
+        e ripete la chiamata una volta. Ogni chiamata arrivata a Odoo viene
+        registrata in self.metrics (durata, record, byte).
+
         Args:
             model: Nome modello (es. 'account.bank.statement.line')
             method: Nome metodo (es. 'search', 'read', 'create')
@@ -85,18 +181,53 @@ class OdooConnector:
         if not self.uid or not self.models:
             raise Exception("Non connesso a Odoo. Chiama connect() prima.")
 
-        return self.models.execute_kw(
-            self.db,
-            self.uid,
-            self.password,
-            model,
-            method,
-            args,
-            kwargs
-        )
+        try:
+            return self._execute(model, method, args, kwargs)
+        except xmlrpc.client.Fault as e:
+            # Codice 3 = AccessDenied: controllo credenziali, prima di eseguire il metodo
+            if e.faultCode != 3:
+                raise
+            self.sessions.forget(self.url, self.db, self.username)
+            uid = self._authenticate()
+            if not uid:
+                raise
+            self.uid = uid
+            return self._execute(model, method, args, kwargs)
+
+    def _execute(self, model: str, method: str, args: tuple, kwargs: Dict) -> Any:
+        def call() -> Any:
+            return self.models.execute_kw(self.db, self.uid, self.password, model, method, args, kwargs)
+
+        def rpc(idempotent: bool) -> Any:
+            return self._measured(model, method, args, lambda: self.limiter.call(call, idempotent=idempotent))
+
+        if method in READ_METHODS:
+            return self.cache.read_through(f"{self.url}|{self.db}|{self.uid}", model, method, args, kwargs,
+                                           lambda: rpc(True))
+        try:
+            return rpc(False)
+        finally:
+            # Anche se la chiamata fallisce, Odoo potrebbe aver scritto
+            self.cache.invalidate(model)
+
+    def _measured(self, model: str, method: str, args: tuple, function) -> Any:
+        """Esegue function registrando durata, record e byte della chiamata in self.metrics"""
+        sent, received = io_counters()
+        started = time.perf_counter()
+        result = None
+        failed = True
+        try:
+            result = function()
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - started
+            now_sent, now_received = io_counters()
+            self.metrics.record(model, method, seconds, _record_count(method, args, result),
+                                now_sent - sent, now_received - received, failed)
 
     def search_read(self, model: str, domain: List = None, fields: List[str] = None,
-                    limit: int = None, order: str = None) -> List[Dict]:
+                    limit: int = None, order: str = None, offset: int = None) -> List[Dict]:
         """
         Cerca e legge record da un modello
 
@@ -106,6 +237,7 @@ class OdooConnector:
             fields: Campi da leggere
             limit: Limite risultati
             order: Ordinamento
+            offset: Record da saltare (paginazione)
 
         Returns:
             Lista di dizionari con i dati
@@ -120,8 +252,109 @@ class OdooConnector:
             kwargs['limit'] = limit
         if order:
             kwargs['order'] = order
+        if offset:
+            kwargs['offset'] = offset
+
+        return self.execute(model, 'search_read', domain, **kwargs)
+
+    def iter_search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                         batch_size: int = None, prefetch: bool = False) -> Iterator[Dict]:
+        """
+        Legge tutti i record di un dominio a pagine, restituendoli man mano
 
-        return self.execute(model, 'search_read', [domain], kwargs)
+        Pagina con un cursore sull'id (id > ultimo id letto, ordine per id)
+        invece di OFFSET: ogni pagina costa come la prima anche su tabelle
+        enormi, e record creati o eliminati durante la lettura non fanno
+        saltare né ripetere righe. In memoria resta una pagina alla volta.
+
+        Args:
+            model: Nome modello
+            domain: Filtri ricerca (formato Odoo domain)
+            fields: Campi da leggere ('id' è sempre incluso)
+            batch_size: Record per pagina (default config.ODOO_READ_BATCH_SIZE)
+            prefetch: Legge la pagina successiva in un thread mentre il chiamante
+                      elabora la corrente (rete e decodifica si sovrappongono)
+
+        Yields:
+            Dizionari dei record in ordine di id
+        """
+        pages = self._iter_pages(model, list(domain or []), fields, batch_size or config.ODOO_READ_BATCH_SIZE)
+        if prefetch:
+            pages = _prefetch(pages)
+        for page in pages:
+            yield from page
+
+    def _iter_pages(self, model: str, domain: List, fields: Optional[List[str]],
+                    batch_size: int) -> Iterator[List[Dict]]:
+        last_id = 0
+        while True:
+            # Termine in testa: AND implicito con tutto il dominio, anche se usa '|' e '!'
+            page = self.search_read(model, [('id', '>', last_id)] + domain, fields=fields,
+                                    limit=batch_size, order='id')
+            if page:
+                yield page
+            if len(page) < batch_size:
+                return
+            last_id = page[-1]['id']
+
+    def sharded_search_read(self, model: str, domain: List = None, fields: List[str] = None,
+                            workers: int = None, shards: int = None, ordered: bool = True,
+                            batch_size: int = None) -> Iterator[Dict]:
+        """
+        Legge tutti i record di un dominio in parallelo per intervalli di id
+
+        Trova id minimo e massimo del dominio, divide l'intervallo in shards
+        sotto-intervalli e li legge (ognuno con iter_search_read) da al
+        massimo workers thread sulle connessioni del pool. Le letture di Odoo
+        avvengono in parallelo su più worker del server.
+
+        Args:
+            model: Nome modello
+            domain: Filtri ricerca (formato Odoo domain)
+            fields: Campi da leggere
+            workers: Letture contemporanee (default config.ODOO_READ_WORKERS)
+            shards: Intervalli di id (default 4 per worker: gli intervalli
+                    con pochi record non lasciano thread fermi)
+            ordered: True = record in ordine di id; False = ogni intervallo
+                     appena letto (meno attese, ordine non garantito)
+            batch_size: Record per pagina dentro un intervallo (default config.ODOO_READ_BATCH_SIZE)
+
+        Yields:
+            Dizionari dei record
+        """
+        domain = list(domain or [])
+        workers = max(1, workers or config.ODOO_READ_WORKERS)
+        lowest = self.execute(model, 'search', domain, limit=1, order='id')
+        if not lowest:
+            return
+        highest = self.execute(model, 'search', domain, limit=1, order='id desc')
+        ranges = iter(_id_ranges(lowest[0], highest[0], shards or workers * 4))
+
+        def read(bounds: Tuple[int, int]) -> List[Dict]:
+            shard_domain = [('id', '>=', bounds[0]), ('id', '<=', bounds[1])] + domain
+            return list(self.iter_search_read(model, shard_domain, fields, batch_size))
+
+        # Al massimo 2 intervalli per worker letti o in attesa: la memoria non cresce con il modello
+        executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='odoo-shard')
+        pending = deque(executor.submit(read, bounds) for bounds in itertools.islice(ranges, workers * 2))
+        try:
+            while pending:
+                if ordered:
+                    finished = [pending.popleft()]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    finished = [future for future in pending if future in done]
+                    for future in finished:
+                        pending.remove(future)
+                for future in finished:
+                    bounds = next(ranges, None)
+                    if bounds:
+                        pending.append(executor.submit(read, bounds))
+                    yield from future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+            executor.shutdown(wait=True)
 
     def create(self, model: str, values: Dict) -> int:
         """
@@ -134,7 +367,7 @@ class OdooConnector:
         Returns:
             ID del record creato
         """
-        return self.execute(model, 'create', [values])
+        return self.execute(model, 'create', values)
 
     def write(self, model: str, ids: List[int], values: Dict) -> bool:
         """
@@ -148,7 +381,7 @@ class OdooConnector:
         Returns:
             True se successo
         """
-        return self.execute(model, 'write', [ids, values])
+        return self.execute(model, 'write', ids, values)
 
     def unlink(self, model: str, ids: List[int]) -> bool:
         """
@@ -161,7 +394,7 @@ class OdooConnector:
         Returns:
             True se successo
         """
-        return self.execute(model, 'unlink', [ids])
+        return self.execute(model, 'unlink', ids)
 
     def get_fields(self, model: str, attributes: List[str] = None) -> Dict:
         """
@@ -175,7 +408,7 @@ class OdooConnector:
             Dizionario con definizione campi
         """
         attributes = attributes or ['string', 'type', 'required', 'readonly', 'help']
-        return self.execute(model, 'fields_get', [], {'attributes': attributes})
+        return self.execute(model, 'fields_get', attributes=attributes)
 
 
 class BankStatementManager:
@@ -250,6 +483,117 @@ class BankStatementManager:
 
         return self.odoo.create('account.bank.statement.line', data)
 
+    def create_statement_lines(self, vals_list: List[Dict]) -> List[Tuple[Optional[int], Optional[str]]]:
+        """
+        Crea più righe movimento bancario con una sola chiamata create
+
+        Se Odoo rifiuta il blocco, questo viene diviso a metà ricorsivamente
+        finché la riga (o le righe) non valide restano isolate: le altre
+        vengono comunque create. Odoo esegue ogni create in una transazione,
+        quindi un blocco rifiutato non lascia righe parziali. Errori di rete
+        non vengono ritentati (il blocco potrebbe essere già stato salvato).
+
+        Args:
+            vals_list: Lista di dizionari movimento (vedi create_statement_line)
+
+        Returns:
+            Lista (id, errore) nello stesso ordine di vals_list:
+            id valorizzato se creata, altrimenti messaggio errore
+        """
+        if not vals_list:
+            return []
+
+        # Validazione locale: le righe senza campi obbligatori non vengono inviate
+        results: List[Tuple[Optional[int], Optional[str]]] = [(None, None)] * len(vals_list)
+        valid_positions = []
+        for position, data in enumerate(vals_list):
+            missing = [field for field in ('date', 'journal_id') if field not in data]
+            if missing:
+                results[position] = (None, f"Campo obbligatorio mancante: {missing[0]}")
+            else:
+                valid_positions.append(position)
+
+        for position, result in zip(valid_positions,
+                                    self._create_lines_bisect([vals_list[p] for p in valid_positions])):
+            results[position] = result
+
+        return results
+
+    def _create_lines_bisect(self, vals_list: List[Dict]) -> List[Tuple[Optional[int], Optional[str]]]:
+        """Crea un blocco di righe, dividendolo a metà in caso di errore Odoo"""
+        if not vals_list:
+            return []
+
+        try:
+            ids = self.odoo.execute('account.bank.statement.line', 'create', vals_list)
+        except xmlrpc.client.Fault as e:
+            if len(vals_list) == 1:
+                return [(None, _error_message(e))]
+            middle = len(vals_list) // 2
+            return (self._create_lines_bisect(vals_list[:middle]) +
+                    self._create_lines_bisect(vals_list[middle:]))
+
+        if isinstance(ids, int):
+            ids = [ids]
+        return [(line_id, None) for line_id in ids]
+
+    def create_statements(self, statements: List[Dict]) -> List[Tuple[Optional[int], List[int], Optional[str]]]:
+        """
+        Crea più estratti conto con le loro righe in una sola chiamata create
+
+        Ogni estratto passa le righe come comandi one2many (0, 0, vals): Odoo
+        crea estratto e righe nella stessa transazione. Se Odoo rifiuta la
+        chiamata, gli estratti vengono divisi a metà finché quelli non validi
+        restano isolati (un estratto rifiutato non crea nessuna riga).
+
+        Args:
+            statements: Lista estratti:
+                {
+                    'name': 'UBS CHF 2025-11-07',
+                    'date': '2025-11-07',
+                    'journal_id': 9,
+                    'balance_start': 100000.0,      # opzionale
+                    'balance_end_real': 104987.21,  # opzionale
+                    'lines': [vals, ...]            # vedi create_statement_line
+                }
+
+        Returns:
+            Lista (id estratto, id righe nell'ordine di 'lines', errore) nello
+            stesso ordine di statements
+        """
+        if not statements:
+            return []
+
+        vals_list = []
+        for statement in statements:
+            vals = {key: value for key, value in statement.items() if key != 'lines'}
+            vals['line_ids'] = [(0, 0, line) for line in statement['lines']]
+            vals_list.append(vals)
+
+        try:
+            statement_ids = self.odoo.execute('account.bank.statement', 'create', vals_list)
+        except xmlrpc.client.Fault as e:
+            if len(statements) == 1:
+                return [(None, [], _error_message(e))]
+            middle = len(statements) // 2
+            return self.create_statements(statements[:middle]) + self.create_statements(statements[middle:])
+
+        if isinstance(statement_ids, int):
+            statement_ids = [statement_ids]
+
+        # Le righe sono create nell'ordine dei comandi: id crescenti per estratto
+        lines = self.odoo.search_read(
+            'account.bank.statement.line',
+            [('statement_id', 'in', statement_ids)],
+            fields=['statement_id'],
+            order='id'
+        )
+        line_ids: Dict[int, List[int]] = {statement_id: [] for statement_id in statement_ids}
+        for line in lines:
+            line_ids[line['statement_id'][0]].append(line['id'])
+
+        return [(statement_id, line_ids[statement_id], None) for statement_id in statement_ids]
+
     def get_recent_movements(self, journal_id: int = None, limit: int = 10) -> List[Dict]:
         """
         Ottiene movimenti bancari recenti
@@ -273,6 +617,32 @@ class BankStatementManager:
             order='date desc, id desc'
         )
 
+    def get_journal_balance(self, journal_id: int, before_date: str = None) -> Optional[Dict]:
+        """
+        Saldo del giornale dopo l'ultima riga registrata (opzionalmente prima di una data)
+
+        Args:
+            journal_id: ID giornale
+            before_date: Considera solo righe con data precedente (ISO, opzionale)
+
+        Returns:
+            {'date': 'YYYY-MM-DD', 'balance_cents': int} o None se il giornale è vuoto
+        """
+        domain = [('journal_id', '=', journal_id)]
+        if before_date:
+            domain.append(('date', '<', before_date))
+
+        lines = self.odoo.search_read(
+            'account.bank.statement.line',
+            domain,
+            fields=['date', 'running_balance'],
+            limit=1,
+            order='internal_index desc'
+        )
+        if not lines:
+            return None
+        return {'date': lines[0]['date'], 'balance_cents': to_cents(lines[0]['running_balance'])}
+
     def search_partner(self, name: str) -> Optional[int]:
         """
         Cerca un partner per nome
@@ -302,12 +672,199 @@ class BankStatementManager:
         Returns:
             True se successo
         """
-        # TODO: Implementare logica riconciliazione
-        # Questo richiede chiamata a metodi specifici di riconciliazione
-        pass
+        [(_, error)] = self.reconcile_lines([(line_id, account_move_line_ids)])
+        if error:
+            print(f"❌ Riconciliazione riga {line_id} fallita: {error}")
+        return error is None
+
+    def reconcile_lines(self, matches: List[Tuple[int, List[int]]]) -> List[Tuple[int, Optional[str]]]:
+        """
+        Riconcilia più righe movimento con le rispettive righe contabili aperte
+
+        Per ogni riga la contropartita sul conto sospeso dell'estratto viene
+        spostata sul conto (credito/debito) e partner della fattura, poi le due
+        righe vengono riconciliate. Letture, rimessa in bozza, spostamento
+        (un solo write su tutti i movimenti) e registrazione avvengono con una
+        chiamata per blocco; se Odoo rifiuta il blocco viene diviso a metà come
+        in create_statement_lines. La riconciliazione resta una chiamata per
+        riga: reconcile su più coppie le unirebbe in un'unica riconciliazione.
+        Se fallisce, la riga estratto torna sul conto sospeso e può essere
+        riconciliata in un'esecuzione successiva.
+
+        Args:
+            matches: Lista (ID riga movimento, [ID account.move.line aperte])
+
+        Returns:
+            Lista (ID riga movimento, errore o None) nello stesso ordine
+        """
+        if not matches:
+            return []
+
+        try:
+            return self._reconcile_batch(matches)
+        except (xmlrpc.client.Fault, ValueError) as e:
+            if len(matches) == 1:
+                return [(matches[0][0], _error_message(e))]
+            middle = len(matches) // 2
+            return self.reconcile_lines(matches[:middle]) + self.reconcile_lines(matches[middle:])
+
+    def _reconcile_batch(self, matches: List[Tuple[int, List[int]]]) -> List[Tuple[int, Optional[str]]]:
+        """
+        Riconcilia un blocco di righe
+
+        Solleva Fault/ValueError se il blocco non può essere preparato (nessuna
+        riga modificata); gli errori della riconciliazione finale, riga per
+        riga, vengono invece restituiti.
+        """
+        line_ids = [line_id for line_id, _ in matches]
+        statement_lines = self.odoo.execute('account.bank.statement.line', 'read', line_ids,
+                                            fields=['move_id', 'journal_id'])
+        move_by_line = {line['id']: line['move_id'][0] for line in statement_lines}
+
+        journal_ids = list({line['journal_id'][0] for line in statement_lines})
+        journals = self.odoo.execute('account.journal', 'read', journal_ids, fields=['suspense_account_id'])
+        suspense_accounts = [j['suspense_account_id'][0] for j in journals if j.get('suspense_account_id')]
+
+        move_ids = list(move_by_line.values())
+        suspense_lines = self.odoo.search_read(
+            'account.move.line',
+            [('move_id', 'in', move_ids), ('account_id', 'in', suspense_accounts)],
+            fields=['id', 'move_id', 'account_id', 'partner_id']
+        )
+        suspense_by_move = {line['move_id'][0]: line['id'] for line in suspense_lines}
+        # Valori originali della riga sospesa, ripristinati se il blocco fallisce
+        suspense_original = {
+            line['move_id'][0]: {
+                'account_id': line['account_id'][0],
+                'partner_id': line['partner_id'][0] if line.get('partner_id') else False,
+            }
+            for line in suspense_lines
+        }
+
+        counterpart_ids = [aml_id for _, aml_ids in matches for aml_id in aml_ids]
+        counterparts = {
+            line['id']: line
+            for line in self.odoo.execute('account.move.line', 'read', counterpart_ids,
+                                          fields=['account_id', 'partner_id', 'reconciled'])
+        }
+
+        for line_id, aml_ids in matches:
+            if move_by_line.get(line_id) not in suspense_by_move:
+                raise ValueError(f"Riga {line_id} già riconciliata o senza conto sospeso")
+            for aml_id in aml_ids:
+                if aml_id not in counterparts or counterparts[aml_id]['reconciled']:
+                    raise ValueError(f"Riga contabile {aml_id} non aperta")
+
+        commands = []
+        for line_id, aml_ids in matches:
+            counterpart = counterparts[aml_ids[0]]
+            values = {'account_id': counterpart['account_id'][0]}
+            if counterpart.get('partner_id'):
+                values['partner_id'] = counterpart['partner_id'][0]
+            commands.append((1, suspense_by_move[move_by_line[line_id]], values))
+
+        self.odoo.execute('account.move', 'button_draft', move_ids)
+        try:
+            # Un solo write per tutto il blocco: se Odoo lo rifiuta nessuna riga è stata spostata
+            self.odoo.write('account.move', move_ids, {'line_ids': commands})
+        finally:
+            # Le righe estratto restano sempre registrate, anche se lo spostamento fallisce
+            self.odoo.execute('account.move', 'action_post', move_ids)
+
+        results = []
+        failed_moves = []
+        for line_id, aml_ids in matches:
+            move_id = move_by_line[line_id]
+            try:
+                self.odoo.execute('account.move.line', 'reconcile', [suspense_by_move[move_id]] + list(aml_ids))
+                results.append((line_id, None))
+            except xmlrpc.client.Fault as e:
+                results.append((line_id, _error_message(e)))
+                failed_moves.append(move_id)
+
+        if failed_moves:
+            self._restore_suspense(failed_moves, suspense_by_move, suspense_original)
+        return results
+
+    def _restore_suspense(self, move_ids: List[int], suspense_by_move: Dict[int, int],
+                          suspense_original: Dict[int, Dict]) -> None:
+        """Riporta conto sospeso e partner originali sulle righe la cui riconciliazione è fallita"""
+        self.odoo.execute('account.move', 'button_draft', move_ids)
+        try:
+            self.odoo.write('account.move', move_ids, {
+                'line_ids': [(1, suspense_by_move[move_id], suspense_original[move_id]) for move_id in move_ids]
+            })
+        finally:
+            self.odoo.execute('account.move', 'action_post', move_ids)
 
 
 # Funzioni di utilità
+def _error_message(error: Exception) -> str:
+    """Ultima riga del messaggio di un errore Odoo (il traceback server è omesso)"""
+    message = error.faultString if isinstance(error, xmlrpc.client.Fault) else str(error)
+    return message.strip().splitlines()[-1] if message and message.strip() else str(error)
+
+
+def _record_count(method: str, args: tuple, result: Any) -> int:
+    # Record letti (lista restituita) o scritti (lista di id o di valori nel primo argomento)
+    if isinstance(result, list):
+        return len(result)
+    if method in READ_METHODS or result is None:
+        return 0
+    if args and isinstance(args[0], list):
+        return len(args[0])
+    return 1
+
+
+def _id_ranges(lowest: int, highest: int, shards: int) -> List[Tuple[int, int]]:
+    """Divide [lowest, highest] in al massimo shards intervalli contigui (estremi inclusi)"""
+    step = max(1, -(-(highest - lowest + 1) // max(1, shards)))
+    return [(start, min(start + step - 1, highest)) for start in range(lowest, highest + 1, step)]
+
+
+def _prefetch(pages: Iterator[List[Dict]]) -> Iterator[List[Dict]]:
+    """
+    Scorre pages in un thread, una pagina avanti rispetto al chiamante
+
+    Gli errori del thread vengono rilanciati al chiamante; se il chiamante
+    smette di leggere, il thread si ferma dopo la pagina in corso.
+    """
+    buffer: queue.Queue = queue.Queue(maxsize=1)
+    stop = threading.Event()
+    done = object()
+
+    def put(item: Any) -> bool:
+        while not stop.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce() -> None:
+        try:
+            for page in pages:
+                if not put(page):
+                    return
+            put(done)
+        except BaseException as e:
+            put(e)
+
+    thread = threading.Thread(target=produce, name='odoo-prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            item = buffer.get()
+            if item is done:
+                return
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+    finally:
+        stop.set()
+
+
 def format_date_odoo(date_str: str, input_format: str = "%d.%m.%Y") -> str:
     """
     Converte data dal formato UBS al formato Odoo
@@ -319,6 +876,9 @@ def format_date_odoo(date_str: str, input_format: str = "%d.%m.%Y") -> str:
     Returns:
         Data formato Odoo (YYYY-MM-DD)
     """
+    if input_format == "%d.%m.%Y":
+        return parse_date_iso(date_str)
+
     dt = datetime.strptime(date_str, input_format)
     return dt.strftime("%Y-%m-%d")
 
@@ -331,16 +891,9 @@ def format_amount_odoo(amount_str: str) -> float:
         amount_str: Importo formato UBS (es. "1'234,56" o "1'234.56")
 
     Returns:
-        Float Python/Odoo
+        Float Python/Odoo (per calcoli esatti usare swiss_format.parse_amount_cents)
     """
-    # Rimuovi apostrofi (separatore migliaia svizzero)
-    amount_str = amount_str.replace("'", "").replace(" ", "")
-
-    # Gestisci sia virgola che punto come decimale
-    if "," in amount_str:
-        amount_str = amount_str.replace(",", ".")
-
-    return float(amount_str)
+    return cents_to_amount(parse_amount_cents(amount_str))
 
 
 if __name__ == "__main__":
@@ -0,0 +1,159 @@
+"""
+Controllo adattivo delle chiamate contemporanee verso Odoo (AIMD)
+
+Con un numero fisso di thread si sottoutilizza Odoo.sh oppure si esauriscono
+i worker (429/503, timeout). AdaptiveLimiter regola le chiamate in volo come
+il controllo di congestione TCP:
+- ogni chiamata riuscita alza il limite di 1/limite (+1 ogni "giro" completo)
+- un segnale di sovraccarico (429, 502-504, timeout, connessione rifiutata o
+  chiusa, lettura più lenta di slow_seconds) lo dimezza, una sola volta per
+  le chiamate partite prima dell'ultima riduzione
+
+La durata conta solo per le letture: una scrittura grande (create di un
+blocco di migliaia di righe) può durare a lungo senza che Odoo sia in
+sovraccarico.
+
+Le letture (metodi idempotenti) fallite per sovraccarico vengono ripetute con
+attesa esponenziale casuale ("full jitter"), rispettando Retry-After. Le
+scritture solo se rifiutate prima di arrivare a un worker (429/503): dopo un
+502/504 o un timeout Odoo potrebbe averle già eseguite.
+"""
+
+import random
+import socket
+import threading
+import time
+import xmlrpc.client
+from typing import Any, Callable, Dict
+
+# Metodi ORM senza effetti: ripetibili dopo un errore di rete o sovraccarico
+READ_METHODS = frozenset({
+    'search', 'search_read', 'search_count', 'read', 'read_group', 'fields_get',
+    'name_search', 'name_get', 'default_get', 'check_access_rights', 'web_search_read',
+})
+
+# Stati HTTP con cui Odoo.sh / il proxy segnalano worker esauriti
+_OVERLOAD_STATUS = (429, 502, 503, 504)
+
+# Stati con cui la richiesta è rifiutata senza essere eseguita (ripetibile anche se scrive)
+_REJECTED_STATUS = (429, 503)
+
+
+def is_overload(error: BaseException) -> bool:
+    """
+    True se l'errore indica un server sovraccarico (non un errore applicativo)
+
+    Args:
+        error: Eccezione della chiamata RPC
+
+    Returns:
+        True per 429/502/503/504, timeout e connessioni rifiutate o chiuse
+    """
+    if isinstance(error, xmlrpc.client.ProtocolError):
+        return error.errcode in _OVERLOAD_STATUS
+    return isinstance(error, (socket.timeout, TimeoutError, ConnectionError))
+
+
+def _retry_after(error: BaseException) -> float:
+    # Retry-After in secondi (429/503); 0 se assente o in formato data
+    headers = getattr(error, 'headers', None) or {}
+    try:
+        return float(headers.get('Retry-After') or headers.get('retry-after') or 0)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class AdaptiveLimiter:
+    """Limite AIMD di chiamate contemporanee, condiviso dai thread di un connettore"""
+
+    def __init__(self, maximum: int = 4, minimum: int = 1, initial: int = None, retries: int = 3,
+                 backoff: float = 0.5, slow_seconds: float = 30.0):
+        """
+        Args:
+            maximum: Chiamate contemporanee massime (di solito la dimensione del pool)
+            minimum: Chiamate contemporanee minime
+            initial: Limite iniziale (default min(2, maximum))
+            retries: Ripetizioni massime di una chiamata per sovraccarico
+            backoff: Attesa base in secondi (raddoppia a ogni ripetizione, valore casuale fino al tetto)
+            slow_seconds: Durata oltre la quale una lettura conta come sovraccarico
+        """
+        self.maximum = max(1, maximum)
+        self.minimum = max(1, min(minimum, self.maximum))
+        self.limit = float(max(self.minimum, min(initial or 2, self.maximum)))
+        self.retries = retries
+        self.backoff = backoff
+        self.slow_seconds = slow_seconds
+
+        self.in_flight = 0
+        self._condition = threading.Condition()
+        self._last_decrease = 0.0
+        self.stats = {'calls': 0, 'overloads': 0, 'retries': 0, 'decreases': 0, 'latency_ewma': 0.0}
+
+    def call(self, function: Callable[[], Any], idempotent: bool = False) -> Any:
+        """
+        Esegue function rispettando il limite corrente
+
+        Args:
+            function: Chiamata RPC senza argomenti
+            idempotent: True per le letture (ripetute per ogni sovraccarico;
+                        le altre chiamate solo se rifiutate con 429/503)
+
+        Returns:
+            Risultato di function
+
+        Raises:
+            L'eccezione di function (dopo le eventuali ripetizioni)
+        """
+        attempt = 0
+        while True:
+            started = self._acquire()
+            overloaded = False
+            try:
+                result = function()
+                overloaded = idempotent and time.monotonic() - started > self.slow_seconds
+                return result
+            except Exception as e:
+                overloaded = is_overload(e)
+                rejected = isinstance(e, xmlrpc.client.ProtocolError) and e.errcode in _REJECTED_STATUS
+                if not (overloaded and (idempotent or rejected) and attempt < self.retries):
+                    raise
+                retry_after = _retry_after(e)
+            finally:
+                self._release(started, overloaded)
+
+            attempt += 1
+            with self._condition:
+                self.stats['retries'] += 1
+            ceiling = self.backoff * 2 ** (attempt - 1)
+            time.sleep(max(retry_after, random.uniform(0, ceiling)))
+
+    def _acquire(self) -> float:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                self._condition.wait()
+            self.in_flight += 1
+        return time.monotonic()
+
+    def _release(self, started: float, overloaded: bool) -> None:
+        latency = time.monotonic() - started
+        with self._condition:
+            self.in_flight -= 1
+            self.stats['calls'] += 1
+            ewma = self.stats['latency_ewma']
+            self.stats['latency_ewma'] = latency if not ewma else ewma * 0.9 + latency * 0.1
+            if overloaded:
+                self.stats['overloads'] += 1
+                # Una sola riduzione per "giro": le chiamate già in volo vedono lo stesso sovraccarico
+                if started >= self._last_decrease:
+                    self.limit = max(float(self.minimum), self.limit / 2)
+                    self._last_decrease = time.monotonic()
+                    self.stats['decreases'] += 1
+            else:
+                self.limit = min(float(self.maximum), self.limit + 1 / self.limit)
+            self._condition.notify_all()
+
+    def snapshot(self) -> Dict:
+        """Limite corrente, chiamate in volo e contatori"""
+        with self._condition:
+            return dict(self.stats, limit=int(self.limit), in_flight=self.in_flight,
+                        latency_ewma=round(self.stats['latency_ewma'], 4))
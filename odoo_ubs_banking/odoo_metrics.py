@@ -0,0 +1,227 @@
+"""
+Metriche per chiamata RPC Odoo (modello.metodo)
+
+Per ogni chiamata eseguita dal connettore (le letture servite dalla cache non
+arrivano a Odoo e non vengono contate) si registrano durata, record, byte
+inviati e ricevuti ed eventuale errore. Per ogni modello.metodo:
+- totali (chiamate, errori, record, byte, secondi)
+- percentili p50/p95/p99 della durata, calcolati su un campione casuale
+  uniforme di al massimo max_samples durate (reservoir sampling): memoria
+  costante anche su milioni di chiamate
+
+Esportazione in JSON, in formato testo Prometheus (summary + contatori) o
+come tabella a fine esecuzione.
+"""
+
+import atexit
+import json
+import math
+import random
+import threading
+from datetime import datetime
+from typing import Dict, List
+
+# Percentili calcolati per ogni modello.metodo
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+class _CallStats:
+    """Totali e campione delle durate di un modello.metodo"""
+
+    __slots__ = ('calls', 'errors', 'records', 'sent', 'received', 'seconds', 'max', 'samples')
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.records = 0
+        self.sent = 0
+        self.received = 0
+        self.seconds = 0.0
+        self.max = 0.0
+        self.samples: List[float] = []
+
+
+class RpcMetrics:
+    """Istogrammi di durata e contatori per modello.metodo, condivisi tra thread"""
+
+    def __init__(self, max_samples: int = 2048):
+        """
+        Args:
+            max_samples: Durate conservate per modello.metodo per i percentili
+        """
+        self.max_samples = max_samples
+        self._stats: Dict[tuple, _CallStats] = {}
+        self._lock = threading.Lock()
+        self._report_registered = False
+
+    def record(self, model: str, method: str, seconds: float, records: int = 0,
+               sent: int = 0, received: int = 0, error: bool = False) -> None:
+        """
+        Registra una chiamata
+
+        Args:
+            model: Modello
+            method: Metodo
+            seconds: Durata (attesa del limite e ripetizioni comprese)
+            records: Record letti o scritti
+            sent: Byte inviati (corpo delle richieste)
+            received: Byte ricevuti (corpo delle risposte, compresso se gzip)
+            error: True se la chiamata è fallita
+        """
+        with self._lock:
+            stats = self._stats.get((model, method))
+            if stats is None:
+                stats = self._stats[(model, method)] = _CallStats()
+            stats.calls += 1
+            stats.errors += int(error)
+            stats.records += records
+            stats.sent += sent
+            stats.received += received
+            stats.seconds += seconds
+            stats.max = max(stats.max, seconds)
+            if len(stats.samples) < self.max_samples:
+                stats.samples.append(seconds)
+            else:
+                # Reservoir sampling: ogni chiamata ha la stessa probabilità di restare nel campione
+                slot = random.randrange(stats.calls)
+                if slot < self.max_samples:
+                    stats.samples[slot] = seconds
+
+    def reset(self) -> None:
+        """Azzera tutte le metriche"""
+        with self._lock:
+            self._stats.clear()
+
+    def snapshot(self) -> Dict[str, Dict]:
+        """
+        Metriche per modello.metodo, in ordine di tempo totale decrescente
+
+        Returns:
+            Dict 'modello.metodo' -> {'model', 'method', 'calls', 'errors', 'records',
+            'sent_bytes', 'received_bytes', 'seconds', 'max', 'p50', 'p95', 'p99'}
+        """
+        with self._lock:
+            items = [(key, stats, sorted(stats.samples)) for key, stats in self._stats.items()]
+
+        result = {}
+        for (model, method), stats, samples in sorted(items, key=lambda item: -item[1].seconds):
+            entry = {
+                'model': model,
+                'method': method,
+                'calls': stats.calls,
+                'errors': stats.errors,
+                'records': stats.records,
+                'sent_bytes': stats.sent,
+                'received_bytes': stats.received,
+                'seconds': round(stats.seconds, 6),
+                'max': round(stats.max, 6),
+            }
+            for quantile in QUANTILES:
+                entry[f"p{int(quantile * 100)}"] = round(_quantile(samples, quantile), 6)
+            result[f"{model}.{method}"] = entry
+        return result
+
+    def to_json(self) -> str:
+        """Metriche in JSON (con data di generazione)"""
+        return json.dumps({'generated': datetime.now().isoformat(timespec='seconds'),
+                           'calls': self.snapshot()}, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Metriche nel formato testo di Prometheus (node_exporter textfile collector)"""
+        snapshot = self.snapshot()
+        lines = [
+            '# HELP odoo_rpc_duration_seconds Durata delle chiamate RPC Odoo',
+            '# TYPE odoo_rpc_duration_seconds summary',
+        ]
+        for entry in snapshot.values():
+            labels = _labels(entry)
+            for quantile in QUANTILES:
+                lines.append(f'odoo_rpc_duration_seconds{{{labels},quantile="{quantile}"}} '
+                             f'{entry[f"p{int(quantile * 100)}"]}')
+            lines.append(f"odoo_rpc_duration_seconds_sum{{{labels}}} {entry['seconds']}")
+            lines.append(f"odoo_rpc_duration_seconds_count{{{labels}}} {entry['calls']}")
+
+        counters = (
+            ('odoo_rpc_errors_total', 'errors', 'Chiamate RPC Odoo fallite'),
+            ('odoo_rpc_records_total', 'records', 'Record letti o scritti'),
+            ('odoo_rpc_request_bytes_total', 'sent_bytes', 'Byte inviati a Odoo'),
+            ('odoo_rpc_response_bytes_total', 'received_bytes', 'Byte ricevuti da Odoo'),
+        )
+        for name, field, description in counters:
+            lines.append(f"# HELP {name} {description}")
+            lines.append(f"# TYPE {name} counter")
+            for entry in snapshot.values():
+                lines.append(f"{name}{{{_labels(entry)}}} {entry[field]}")
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path: str) -> None:
+        """
+        Salva le metriche su file
+
+        Args:
+            path: File di destinazione (.prom o .txt = Prometheus, altrimenti JSON)
+        """
+        text = self.to_prometheus() if path.endswith(('.prom', '.txt')) else self.to_json()
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+
+    def print_table(self, limit: int = 20) -> None:
+        """
+        Stampa le chiamate più costose (tempo totale)
+
+        Args:
+            limit: Righe massime (le altre vengono riassunte)
+        """
+        snapshot = list(self.snapshot().values())
+        if not snapshot:
+            return
+
+        print(f"\n📊 Chiamate Odoo ({sum(e['calls'] for e in snapshot)} in "
+              f"{sum(e['seconds'] for e in snapshot):.2f}s)")
+        print(f"   {'modello.metodo':<45} {'chiam.':>7} {'err':>4} {'record':>8} {'KB inv':>8} "
+              f"{'KB ric':>8} {'tot s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for entry in snapshot[:limit]:
+            print(f"   {entry['model'] + '.' + entry['method']:<45} {entry['calls']:>7} {entry['errors']:>4} "
+                  f"{entry['records']:>8} {entry['sent_bytes'] / 1024:>8.1f} {entry['received_bytes'] / 1024:>8.1f} "
+                  f"{entry['seconds']:>8.2f} {entry['p50'] * 1000:>8.1f} {entry['p95'] * 1000:>8.1f} "
+                  f"{entry['p99'] * 1000:>8.1f}")
+        if len(snapshot) > limit:
+            rest = snapshot[limit:]
+            print(f"   ... altri {len(rest)} modello.metodo: {sum(e['calls'] for e in rest)} chiamate, "
+                  f"{sum(e['seconds'] for e in rest):.2f}s")
+
+    def report(self, table: bool = True, path: str = None) -> None:
+        """
+        Riepilogo di fine esecuzione: tabella e/o file
+
+        Args:
+            table: Stampa la tabella
+            path: File JSON/Prometheus (None o '' = nessun file)
+        """
+        if table:
+            self.print_table()
+        if path:
+            try:
+                self.write(path)
+                print(f"📊 Metriche RPC salvate in {path}")
+            except OSError as e:
+                print(f"⚠️  Metriche RPC non salvate in {path}: {e}")
+
+    def report_at_exit(self, table: bool = True, path: str = None) -> None:
+        """Registra report() all'uscita del processo (una sola volta)"""
+        if (table or path) and not self._report_registered:
+            self._report_registered = True
+            atexit.register(self.report, table, path)
+
+
+def _quantile(samples: List[float], quantile: float) -> float:
+    # Percentile "nearest rank" su un campione già ordinato
+    if not samples:
+        return 0.0
+    return samples[max(0, math.ceil(quantile * len(samples)) - 1)]
+
+
+def _labels(entry: Dict) -> str:
+    def escape(value: str) -> str:
+        return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return f'model="{escape(entry["model"])}",method="{escape(entry["method"])}"'
@@ -0,0 +1,81 @@
+"""
+Sessioni Odoo riutilizzate tra esecuzioni (uid per URL, database e utente)
+
+Ogni avvio degli script eseguiva authenticate: una chiamata in più, spesso
+la più lenta di un comando breve. Il uid ottenuto viene salvato con una
+scadenza in un file JSON (senza password) e riusato dalle esecuzioni
+successive senza chiamate di verifica: se Odoo risponde con un errore di
+accesso, il connettore si autentica di nuovo e ripete la chiamata.
+"""
+
+import json
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+
+class SessionCache:
+    """uid autenticati per (URL, database, utente) con scadenza, su file JSON"""
+
+    def __init__(self, path: str = None, ttl: float = 86400):
+        """
+        Args:
+            path: File JSON (None o '' = nessuna cache)
+            ttl: Secondi di validità di un uid salvato
+        """
+        self.path = path or None
+        self.ttl = ttl
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(url: str, db: str, username: str) -> str:
+        return f"{url.rstrip('/')}|{db}|{username}"
+
+    def get(self, url: str, db: str, username: str) -> Optional[int]:
+        """
+        uid salvato e non scaduto
+
+        Returns:
+            uid o None
+        """
+        entry = self._load().get(self._key(url, db, username))
+        if entry and entry.get('expires', 0) > time.time():
+            return entry.get('uid')
+        return None
+
+    def put(self, url: str, db: str, username: str, uid: int) -> None:
+        """Salva il uid di un'autenticazione riuscita"""
+        self._update(self._key(url, db, username), {'uid': uid, 'expires': time.time() + self.ttl})
+
+    def forget(self, url: str, db: str, username: str) -> None:
+        """Elimina il uid (rifiutato da Odoo)"""
+        self._update(self._key(url, db, username), None)
+
+    def _load(self) -> Dict:
+        if not self.path:
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _update(self, key: str, entry: Optional[Dict]) -> None:
+        if not self.path:
+            return
+        with self._lock:
+            sessions = {k: v for k, v in self._load().items() if v.get('expires', 0) > time.time()}
+            if entry is None:
+                sessions.pop(key, None)
+            else:
+                sessions[key] = entry
+            # Scrittura atomica, file leggibile solo dall'utente
+            temp_path = f"{self.path}.{os.getpid()}.tmp"
+            try:
+                descriptor = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+                with os.fdopen(descriptor, 'w', encoding='utf-8') as f:
+                    json.dump(sessions, f)
+                os.replace(temp_path, self.path)
+            except OSError:
+                pass   # cache non scrivibile: ci si autentica a ogni avvio
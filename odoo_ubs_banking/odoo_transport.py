@@ -0,0 +1,287 @@
+"""
+Trasporto XML-RPC con connessioni HTTP/1.1 persistenti condivise tra thread
+
+Il trasporto standard di xmlrpc.client tiene una sola connessione per
+ServerProxy e non è thread-safe: ogni thread apriva la propria connessione
+TCP+TLS (100-200 ms di handshake verso Odoo.sh). Qui un pool limitato di
+connessioni keep-alive per host è condiviso da tutti i proxy e i thread:
+una chiamata prende una connessione libera (o ne apre una se il pool non è
+pieno), la usa e la restituisce. Dopo il primo handshake ogni chiamata costa
+un solo round trip.
+
+Una connessione inattiva chiusa dal server viene scoperta solo all'invio:
+la richiesta viene ripetuta una volta su una connessione nuova, ma solo se
+il server non ha risposto nulla (richiesta non elaborata).
+
+Oltre a XML-RPC, JsonRpcProxy parla con l'endpoint /jsonrpc di Odoo sugli
+stessi pool: risposte più compatte e decodifica con json (in C) invece di
+expat + unmarshaller. Gli errori Odoo diventano xmlrpc.client.Fault con gli
+stessi codici di XML-RPC, quindi chi chiama non vede differenze.
+
+I byte inviati e ricevuti vengono sommati per thread (io_counters): il
+connettore ne legge la differenza attorno a ogni chiamata per le metriche.
+"""
+
+import gzip
+import http.client
+import itertools
+import json
+import queue
+import ssl
+import threading
+import xmlrpc.client
+from typing import Any, Dict, Tuple
+from urllib.parse import urlsplit
+
+# Errori di una connessione keep-alive chiusa dal server prima della richiesta
+_STALE_ERRORS = (http.client.RemoteDisconnected, http.client.CannotSendRequest,
+                 ConnectionResetError, BrokenPipeError)
+
+# Codici Fault di Odoo XML-RPC per classe di eccezione (odoo/service/wsgi_server.py)
+_FAULT_CODES = {
+    'AccessDenied': 3,
+    'AccessError': 4,
+    'UserError': 2,
+    'ValidationError': 2,
+    'MissingError': 2,
+    'RedirectWarning': 2,
+}
+
+# Byte inviati e ricevuti dal thread corrente (corpo di richieste e risposte)
+_io = threading.local()
+
+
+class ConnectionPool:
+    """Pool thread-safe di connessioni HTTP(S) persistenti verso un host"""
+
+    def __init__(self, url: str, size: int = 4, timeout: float = None, context: ssl.SSLContext = None):
+        """
+        Args:
+            url: URL base (schema e host; il percorso viene ignorato)
+            size: Connessioni massime aperte contemporaneamente
+            timeout: Timeout socket in secondi (None = predefinito)
+            context: Contesto SSL per https
+        """
+        parts = urlsplit(url)
+        self.scheme = parts.scheme or 'http'
+        self.host = parts.netloc
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.context = context
+
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._closed = False
+        self.opened = 0    # connessioni aperte in totale (handshake eseguiti)
+
+    def acquire(self) -> Tuple[http.client.HTTPConnection, bool]:
+        """
+        Prende una connessione (attende se tutte sono in uso)
+
+        Returns:
+            Tuple (connessione, riusata): riusata=False se appena creata
+        """
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait(), True
+        except queue.Empty:
+            return self._new_connection(), False
+
+    def release(self, connection: http.client.HTTPConnection, reuse: bool = True) -> None:
+        """
+        Restituisce una connessione al pool
+
+        Args:
+            connection: Connessione presa con acquire()
+            reuse: False se la connessione non è più utilizzabile (viene chiusa)
+        """
+        if reuse and not self._closed:
+            self._idle.put(connection)
+        else:
+            connection.close()
+        self._slots.release()
+
+    def replace(self, connection: http.client.HTTPConnection) -> http.client.HTTPConnection:
+        """Chiude una connessione non valida e ne apre una nuova nello stesso slot"""
+        connection.close()
+        return self._new_connection()
+
+    def close(self) -> None:
+        """Chiude tutte le connessioni inattive (quelle in uso alla restituzione)"""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def _new_connection(self) -> http.client.HTTPConnection:
+        self.opened += 1
+        if self.scheme == 'https':
+            return http.client.HTTPSConnection(self.host, timeout=self.timeout, context=self.context)
+        return http.client.HTTPConnection(self.host, timeout=self.timeout)
+
+
+class PooledTransport(xmlrpc.client.Transport):
+    """Trasporto xmlrpc.client che usa un ConnectionPool (thread-safe)"""
+
+    def __init__(self, pool: ConnectionPool, use_builtin_types: bool = False):
+        """
+        Args:
+            pool: Pool di connessioni condiviso
+            use_builtin_types: Come xmlrpc.client.Transport
+        """
+        super().__init__(use_builtin_types=use_builtin_types)
+        self.pool = pool
+
+    def request(self, host: str, handler: str, request_body: bytes, verbose: bool = False):
+        data = post(self.pool, handler, request_body, 'text/xml', self.user_agent)
+        parser, unmarshaller = self.getparser()
+        parser.feed(data)
+        parser.close()
+        return unmarshaller.close()
+
+
+class JsonRpcProxy:
+    """
+    Proxy per /jsonrpc con la stessa interfaccia di un ServerProxy Odoo
+
+    proxy.execute_kw(db, uid, password, model, method, args, kwargs) come con
+    xmlrpc/2/object; un proxy per servizio ('common' o 'object').
+    """
+
+    def __init__(self, url: str, pool: ConnectionPool, service: str):
+        """
+        Args:
+            url: URL endpoint (es. https://odoo/jsonrpc)
+            pool: Pool di connessioni dello stesso host
+            service: Servizio Odoo ('common', 'object')
+        """
+        self.path = urlsplit(url).path or '/jsonrpc'
+        self.pool = pool
+        self.service = service
+        self._ids = itertools.count(1)
+
+    def __getattr__(self, method: str):
+        if method.startswith('_'):
+            raise AttributeError(method)
+        return lambda *args: self.call(method, *args)
+
+    def call(self, method: str, *args) -> Any:
+        """
+        Esegue service.method(*args)
+
+        Raises:
+            xmlrpc.client.Fault: Errore restituito da Odoo
+            xmlrpc.client.ProtocolError: Risposta HTTP diversa da 200
+        """
+        body = json.dumps({
+            'jsonrpc': '2.0',
+            'method': 'call',
+            'params': {'service': self.service, 'method': method, 'args': args},
+            'id': next(self._ids),
+        }).encode('utf-8')
+        reply = json.loads(post(self.pool, self.path, body, 'application/json'))
+        if 'error' in reply:
+            raise json_fault(reply['error'])
+        return reply.get('result')
+
+
+def json_fault(error: Dict) -> xmlrpc.client.Fault:
+    """
+    Converte un errore JSON-RPC Odoo nel Fault che darebbe XML-RPC
+
+    Args:
+        error: Campo 'error' della risposta ({'code', 'message', 'data': {'name', 'message', 'debug'}})
+
+    Returns:
+        Fault (codice 2-4 con il messaggio per errori utente/accesso, 1 con il traceback)
+    """
+    data = error.get('data') or {}
+    code = _FAULT_CODES.get(str(data.get('name', '')).rsplit('.', 1)[-1], 1)
+    if code == 1:
+        return xmlrpc.client.Fault(1, data.get('debug') or data.get('message') or error.get('message', ''))
+    return xmlrpc.client.Fault(code, data.get('message') or error.get('message', ''))
+
+
+def post(pool: ConnectionPool, path: str, body: bytes, content_type: str,
+         user_agent: str = xmlrpc.client.Transport.user_agent) -> bytes:
+    """
+    POST su una connessione del pool (una ripetizione se la keep-alive era scaduta)
+
+    Args:
+        pool: Pool di connessioni
+        path: Percorso (es. /xmlrpc/2/object)
+        body: Corpo della richiesta
+        content_type: Content-Type del corpo
+        user_agent: Header User-Agent
+
+    Returns:
+        Corpo della risposta (già decompresso)
+
+    Raises:
+        xmlrpc.client.ProtocolError: Risposta HTTP diversa da 200
+    """
+    headers = {
+        'Content-Type': content_type,
+        'Accept-Encoding': 'gzip',
+        'User-Agent': user_agent,
+    }
+    connection, reused = pool.acquire()
+    try:
+        try:
+            response, data = _send(connection, path, body, headers)
+        except _STALE_ERRORS:
+            if not reused:
+                raise
+            # Keep-alive chiusa dal server durante l'inattività: nessuna risposta, si ripete
+            connection = pool.replace(connection)
+            response, data = _send(connection, path, body, headers)
+    except Exception:
+        pool.release(connection, reuse=False)
+        raise
+
+    pool.release(connection, reuse=not response.will_close)
+
+    if response.status != 200:
+        raise xmlrpc.client.ProtocolError(pool.host + path, response.status, response.reason,
+                                          dict(response.getheaders()))
+
+    if response.getheader('Content-Encoding', '') == 'gzip':
+        data = gzip.decompress(data)
+    return data
+
+
+def _send(connection: http.client.HTTPConnection, path: str, body: bytes,
+          headers: dict) -> Tuple[http.client.HTTPResponse, bytes]:
+    connection.request('POST', path, body, headers)
+    response = connection.getresponse()
+    data = response.read()
+    _io.sent = getattr(_io, 'sent', 0) + len(body)
+    _io.received = getattr(_io, 'received', 0) + len(data)
+    return response, data
+
+
+def io_counters() -> Tuple[int, int]:
+    """
+    Byte scambiati finora dal thread corrente su tutti i pool
+
+    Returns:
+        Tuple (inviati, ricevuti): corpi di richieste e risposte (compressi se gzip)
+    """
+    return getattr(_io, 'sent', 0), getattr(_io, 'received', 0)
+
+
+def pooled_server_proxy(url: str, pool: ConnectionPool, **kwargs) -> xmlrpc.client.ServerProxy:
+    """
+    ServerProxy XML-RPC che usa il pool condiviso (utilizzabile da più thread)
+
+    Args:
+        url: URL endpoint (es. https://odoo/xmlrpc/2/object)
+        pool: Pool di connessioni dello stesso host
+        **kwargs: Altri argomenti di ServerProxy (es. allow_none)
+
+    Returns:
+        ServerProxy
+    """
+    return xmlrpc.client.ServerProxy(url, transport=PooledTransport(pool), **kwargs)
@@ -0,0 +1,230 @@
+"""
+Risoluzione partner dei movimenti bancari senza una query per movimento
+
+Partner (nome, partita IVA) e conti bancari (res.partner.bank) vengono letti
+una sola volta per import e indicizzati in memoria. Ordine di ricerca:
+1. IBAN della controparte (esatto)
+2. Numero IVA/IDI trovato nel testo del movimento (esatto)
+3. Nome normalizzato (esatto)
+4. Similarità trigrammi sul nome normalizzato (soglia configurabile)
+
+Normalizzazione nomi: minuscolo, senza accenti e punteggiatura, senza forme
+giuridiche (AG, GmbH, SA, Sagl, ...): "Müller Immobilien GmbH" e
+"MUELLER IMMOBILIEN AG" hanno la stessa chiave.
+"""
+
+import functools
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Set, Tuple
+
+import config
+from encoding_detection import normalize_iban
+
+# Forme giuridiche ignorate nel confronto dei nomi
+LEGAL_SUFFIXES = {
+    'ag', 'gmbh', 'sa', 'sagl', 'sarl', 'srl', 'spa', 'sas', 'snc', 'kg', 'ohg',
+    'rl', 'gbr', 'ug', 'ltd', 'llc', 'inc', 'plc', 'bv', 'nv', 'co', 'cie', 'und', 'et', 'e',
+    'genossenschaft', 'stiftung', 'verein',
+}
+
+# Numero IDI svizzero (CHE-123.456.789) o partita IVA (IT12345678901) nel testo
+_VAT_PATTERN = re.compile(r'\b(CHE[-\s.]?\d{3}[.\s]?\d{3}[.\s]?\d{3}|[A-Z]{2}\d{8,12})\b')
+
+# Nomi controparte con esito in cache (LRU: memoria limitata anche in un import senza fine)
+_NAME_CACHE_SIZE = 4096
+
+# Umlaut tedeschi scritti anche come "ue", "oe", "ae"
+_UMLAUTS = str.maketrans({'ä': 'ae', 'ö': 'oe', 'ü': 'ue', 'ß': 'ss'})
+
+
+def normalize_partner_name(name: Optional[str]) -> str:
+    """
+    Normalizza un nome partner per il confronto
+
+    Args:
+        name: Nome come da Odoo o dalla banca
+
+    Returns:
+        Nome normalizzato (es. "Müller Immobilien GmbH" -> "mueller immobilien")
+    """
+    if not name:
+        return ''
+    text = name.lower().translate(_UMLAUTS)
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    # Sigle puntate ("S.A.", "S.à r.l.") diventano una parola sola
+    words = re.sub(r'[^a-z0-9]+', ' ', text.replace('.', '')).split()
+    return ' '.join(word for word in words if word not in LEGAL_SUFFIXES)
+
+
+def normalize_vat(vat: Optional[str]) -> str:
+    """
+    Normalizza un numero IVA/IDI (es. "CHE-123.456.789 MWST" -> "CHE123456789")
+
+    Args:
+        vat: Numero IVA in qualsiasi formato
+
+    Returns:
+        Numero compatto maiuscolo senza suffissi MWST/TVA/IVA
+    """
+    if not vat:
+        return ''
+    compact = re.sub(r'[^A-Z0-9]', '', vat.upper())
+    return re.sub(r'(MWST|TVA|IVA)$', '', compact)
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Trigrammi di un testo normalizzato (con bordi, come pg_trgm)
+
+    Args:
+        text: Testo normalizzato
+
+    Returns:
+        Insieme di trigrammi
+    """
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PartnerIndex:
+    """Indice in memoria di partner Odoo per nome, IVA e IBAN"""
+
+    def __init__(self, connector, threshold: float = None):
+        """
+        Inizializza indice (vuoto fino a load())
+
+        Args:
+            connector: OdooConnector connesso
+            threshold: Similarità trigrammi minima 0-1 (default config.PARTNER_MATCH_THRESHOLD)
+        """
+        self.odoo = connector
+        self.threshold = threshold if threshold is not None else config.PARTNER_MATCH_THRESHOLD
+
+        self.by_iban: Dict[str, int] = {}
+        self.by_vat: Dict[str, int] = {}
+        self.by_name: Dict[str, Optional[int]] = {}   # None = nome ambiguo
+        self._names: List[Tuple[str, int, Set[str]]] = []
+        self._postings: Dict[str, List[int]] = {}
+        # Similarità trigrammi per nome: il solo passo costoso, ripetuto per ogni movimento della stessa controparte
+        self._match_name_cached = functools.lru_cache(maxsize=_NAME_CACHE_SIZE)(self.match_name)
+        self.loaded = False
+
+    def load(self) -> 'PartnerIndex':
+        """
+        Legge partner e conti bancari a pagine (cursore sull'id, pagina successiva
+        letta mentre si indicizza la corrente)
+
+        Returns:
+            self
+        """
+        partners = self.odoo.iter_search_read(
+            'res.partner',
+            [],
+            fields=['id', 'name', 'vat', 'commercial_partner_id'],
+            prefetch=True
+        )
+        for partner in partners:
+            # I movimenti vanno sul partner commerciale (azienda), non sul contatto
+            partner_id = partner['commercial_partner_id'][0] if partner.get('commercial_partner_id') else partner['id']
+            vat = normalize_vat(partner.get('vat'))
+            if vat:
+                self.by_vat.setdefault(vat, partner_id)
+            self._add_name(partner.get('name'), partner_id)
+
+        accounts = self.odoo.iter_search_read(
+            'res.partner.bank',
+            [],
+            fields=['acc_number', 'partner_id'],
+            prefetch=True
+        )
+        for account in accounts:
+            if account.get('partner_id') and account.get('acc_number'):
+                self.by_iban.setdefault(normalize_iban(account['acc_number']), account['partner_id'][0])
+
+        self._match_name_cached.cache_clear()
+        self.loaded = True
+        return self
+
+    def _add_name(self, name: Optional[str], partner_id: int) -> None:
+        key = normalize_partner_name(name)
+        if not key:
+            return
+        if key not in self.by_name:
+            self.by_name[key] = partner_id
+        elif self.by_name[key] == partner_id:
+            return
+        else:
+            # Stesso nome normalizzato su partner diversi: nessun abbinamento automatico
+            self.by_name[key] = None
+
+        position = len(self._names)
+        grams = trigrams(key)
+        self._names.append((key, partner_id, grams))
+        for gram in grams:
+            self._postings.setdefault(gram, []).append(position)
+
+    def resolve(self, name: Optional[str] = None, iban: Optional[str] = None,
+                text: Optional[str] = None) -> Optional[int]:
+        """
+        Trova il partner di un movimento
+
+        Args:
+            name: Nome controparte (es. Beschreibung 2)
+            iban: IBAN controparte (camt)
+            text: Descrizione movimento in cui cercare un numero IVA/IDI
+
+        Returns:
+            ID partner o None se nessun abbinamento sicuro
+        """
+        partner_id = None
+        if iban:
+            partner_id = self.by_iban.get(normalize_iban(iban))
+        if partner_id is None and text and self.by_vat:
+            for match in _VAT_PATTERN.findall(text.upper()):
+                partner_id = self.by_vat.get(normalize_vat(match))
+                if partner_id:
+                    break
+        if partner_id is None and name:
+            partner_id = self._match_name_cached(name)
+        return partner_id
+
+    def match_name(self, name: str) -> Optional[int]:
+        """
+        Abbina un nome per chiave esatta o similarità trigrammi
+
+        Args:
+            name: Nome da cercare
+
+        Returns:
+            ID partner se il migliore supera la soglia ed è univoco
+        """
+        key = normalize_partner_name(name)
+        if not key:
+            return None
+        if key in self.by_name:
+            return self.by_name[key]
+
+        grams = trigrams(key)
+        shared = Counter()
+        for gram in grams:
+            for position in self._postings.get(gram, ()):
+                shared[position] += 1
+
+        best_score, best_ids = 0.0, set()
+        for position, common in shared.items():
+            _, partner_id, candidate_grams = self._names[position]
+            score = common / (len(grams) + len(candidate_grams) - common)
+            if score > best_score:
+                best_score, best_ids = score, {partner_id}
+            elif score == best_score:
+                best_ids.add(partner_id)
+
+        if best_score >= self.threshold and len(best_ids) == 1:
+            return best_ids.pop()
+        return None
@@ -0,0 +1,368 @@
+"""
+Riconciliazione automatica in blocco dei movimenti bancari con fatture aperte
+
+1. Lettura paginata delle righe aperte crediti/debiti (account.move.line)
+   della società del giornale
+2. Indici in memoria per importo esatto (ordinato per data), riferimento
+   QR/ISR/SCOR e numero fattura
+3. Abbinamento di tutte le righe estratto non riconciliate: riferimento,
+   poi numero fattura, poi importo entro una finestra di date. Ogni ricerca
+   è una lettura di dizionario o una bisezione, quindi O(n log n) in totale
+4. Registrazione degli abbinamenti a blocchi (BankStatementManager.reconcile_lines)
+
+Solo abbinamenti esatti e univoci: pagamenti parziali, cumulativi o con più
+candidati restano alla riconciliazione manuale in Odoo.
+
+USO:
+    python reconciliation.py                      # Simulazione giornale predefinito
+    python reconciliation.py --journal 11 --save  # Registra gli abbinamenti
+"""
+
+import re
+from bisect import bisect_left, bisect_right
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import config
+from odoo_connector import OdooConnector, BankStatementManager
+from transaction_batch import to_cents
+
+# Riferimento QR (27 cifre) o ISR/ESR (fino a 27 cifre, spesso a gruppi di 5)
+_QR_PATTERN = re.compile(r'\b\d{2}(?:\s?\d{5}){5}\b|\b\d{26,27}\b')
+
+# Creditor Reference ISO 11649 (SCOR)
+_SCOR_PATTERN = re.compile(r'\bRF\d{2}[A-Z0-9]{1,21}\b')
+
+# Parole del testo che possono essere un numero fattura (contengono almeno una cifra)
+_TOKEN_PATTERN = re.compile(r'[A-Za-z0-9][A-Za-z0-9/\-_.]*\d[A-Za-z0-9/\-_.]*')
+
+
+def normalize_reference(reference: Optional[str]) -> str:
+    """
+    Normalizza un riferimento di pagamento (senza spazi, maiuscolo)
+
+    Args:
+        reference: Riferimento QR/ISR/SCOR in qualsiasi formato
+
+    Returns:
+        Riferimento compatto
+    """
+    return re.sub(r'\s+', '', reference or '').upper()
+
+
+def extract_references(text: Optional[str]) -> List[str]:
+    """
+    Estrae riferimenti QR/ISR e SCOR da un testo libero
+
+    Args:
+        text: Descrizione movimento
+
+    Returns:
+        Riferimenti normalizzati trovati
+    """
+    if not text:
+        return []
+    upper = text.upper()
+    found = [normalize_reference(m) for m in _QR_PATTERN.findall(upper)]
+    found.extend(normalize_reference(m) for m in _SCOR_PATTERN.findall(upper))
+    return found
+
+
+def extract_invoice_numbers(text: Optional[str]) -> List[str]:
+    """
+    Estrae i possibili numeri fattura da un testo libero
+
+    Args:
+        text: Descrizione movimento
+
+    Returns:
+        Parole normalizzate che contengono una cifra (es. 'INV/2025/02500')
+    """
+    if not text:
+        return []
+    return [token.strip('.-_/').upper() for token in _TOKEN_PATTERN.findall(text)]
+
+
+class OpenItemIndex:
+    """Righe contabili aperte indicizzate per importo, riferimento e numero fattura"""
+
+    def __init__(self, items: List[Dict]):
+        """
+        Costruisce gli indici
+
+        Args:
+            items: Righe account.move.line aperte (vedi ReconciliationEngine.load_open_items)
+        """
+        self.items = items
+        self.used = set()
+        self.by_amount: Dict[int, Tuple[List[int], List[int]]] = {}
+        self.by_reference: Dict[str, List[int]] = {}
+        self.by_number: Dict[str, List[int]] = {}
+
+        amounts: Dict[int, List[Tuple[int, int]]] = {}
+        for position, item in enumerate(items):
+            amounts.setdefault(item['cents'], []).append((item['day'], position))
+            for reference in item['references']:
+                self.by_reference.setdefault(reference, []).append(position)
+            for number in item['numbers']:
+                self.by_number.setdefault(number, []).append(position)
+
+        # Per importo: date ordinate (per la bisezione) e posizioni corrispondenti
+        for cents, entries in amounts.items():
+            entries.sort()
+            self.by_amount[cents] = ([day for day, _ in entries], [position for _, position in entries])
+
+    def _free(self, positions, cents: int) -> List[int]:
+        return [p for p in positions if p not in self.used and self.items[p]['cents'] == cents]
+
+    def find(self, cents: int, day: int, window: int, references: List[str], numbers: List[str],
+             partner_id: Optional[int]) -> Tuple[Optional[int], str]:
+        """
+        Cerca la riga aperta di un movimento
+
+        Args:
+            cents: Importo movimento in centesimi (positivo=entrata)
+            day: Data movimento (giorno ordinale)
+            window: Tolleranza in giorni per l'abbinamento sul solo importo
+            references: Riferimenti QR/SCOR del movimento
+            numbers: Possibili numeri fattura nel testo
+            partner_id: Partner della riga estratto (se noto)
+
+        Returns:
+            Tuple (posizione riga o None, metodo: 'reference', 'invoice', 'amount',
+            'ambiguous' o 'none')
+        """
+        for keys, index, method in ((references, self.by_reference, 'reference'),
+                                    (numbers, self.by_number, 'invoice')):
+            for key in keys:
+                candidates = set(self._free(index.get(key, ()), cents))
+                if len(candidates) == 1:
+                    return candidates.pop(), method
+
+        days, positions = self.by_amount.get(cents, ((), ()))
+        start, end = bisect_left(days, day - window), bisect_right(days, day + window)
+        candidates = [p for p in positions[start:end] if p not in self.used]
+        if partner_id and len(candidates) > 1:
+            same_partner = [p for p in candidates if self.items[p]['partner_id'] == partner_id]
+            candidates = same_partner or candidates
+        if len(candidates) == 1:
+            return candidates[0], 'amount'
+        return None, 'ambiguous' if candidates else 'none'
+
+
+class ReconciliationEngine:
+    """Abbina e riconcilia in blocco le righe estratto di un giornale"""
+
+    def __init__(self, connector: OdooConnector, journal_id: int = None, date_window: int = None,
+                 page_size: int = None, batch_size: int = None):
+        """
+        Inizializza motore
+
+        Args:
+            connector: OdooConnector connesso
+            journal_id: Giornale bancario (default config.DEFAULT_JOURNAL_ID)
+            date_window: Giorni di tolleranza sull'abbinamento per importo
+                         (default config.RECONCILE_DATE_WINDOW_DAYS)
+            page_size: Righe per pagina nelle letture (default config.RECONCILE_PAGE_SIZE)
+            batch_size: Abbinamenti per blocco di registrazione (default config.RECONCILE_BATCH_SIZE)
+        """
+        self.odoo = connector
+        self.manager = BankStatementManager(connector)
+        self.journal_id = journal_id or config.DEFAULT_JOURNAL_ID
+        self.date_window = date_window if date_window is not None else config.RECONCILE_DATE_WINDOW_DAYS
+        self.page_size = page_size or config.RECONCILE_PAGE_SIZE
+        self.batch_size = batch_size or config.RECONCILE_BATCH_SIZE
+        self.index: Optional[OpenItemIndex] = None
+
+    def _read_all(self, model: str, domain: List, fields: List[str]) -> List[Dict]:
+        """search_read paginato (ordinato per id, pagine di page_size righe)"""
+        return list(self.odoo.iter_search_read(model, domain, fields, self.page_size, prefetch=True))
+
+    def load_open_items(self) -> int:
+        """
+        Legge le righe aperte crediti/debiti della società del giornale e costruisce gli indici
+
+        Returns:
+            Numero righe aperte
+        """
+        journal = self.odoo.execute('account.journal', 'read', [self.journal_id], fields=['company_id'])[0]
+        lines = self._read_all(
+            'account.move.line',
+            [
+                ('company_id', '=', journal['company_id'][0]),
+                ('account_id.account_type', 'in', ['asset_receivable', 'liability_payable']),
+                ('parent_state', '=', 'posted'),
+                ('reconciled', '=', False),
+                ('amount_residual', '!=', 0),
+            ],
+            ['id', 'move_name', 'name', 'ref', 'partner_id', 'amount_residual', 'date', 'date_maturity']
+        )
+
+        items = []
+        for line in lines:
+            # La riga credito/debito di una fattura ha come 'name' il riferimento di pagamento
+            references = {normalize_reference(value) for value in (line.get('name'), line.get('ref'))
+                          if value and (_QR_PATTERN.fullmatch(value.strip().upper())
+                                        or _SCOR_PATTERN.fullmatch(normalize_reference(value)))}
+            numbers = {value.strip().upper() for value in (line.get('move_name'), line.get('ref'))
+                       if value and value.strip()}
+            items.append({
+                'id': line['id'],
+                'cents': to_cents(line['amount_residual']),
+                'day': date.fromisoformat(line.get('date_maturity') or line['date']).toordinal(),
+                'partner_id': line['partner_id'][0] if line.get('partner_id') else None,
+                'references': references,
+                'numbers': numbers,
+                'move_name': line.get('move_name'),
+            })
+
+        self.index = OpenItemIndex(items)
+        return len(items)
+
+    def load_statement_lines(self, date_from: str = None, date_to: str = None) -> List[Dict]:
+        """
+        Legge le righe estratto non riconciliate del giornale
+
+        Args:
+            date_from: Data inizio ISO (opzionale)
+            date_to: Data fine ISO (opzionale)
+
+        Returns:
+            Righe account.bank.statement.line
+        """
+        domain = [('journal_id', '=', self.journal_id), ('is_reconciled', '=', False)]
+        if date_from:
+            domain.append(('date', '>=', date_from))
+        if date_to:
+            domain.append(('date', '<=', date_to))
+        return self._read_all('account.bank.statement.line', domain,
+                              ['id', 'date', 'amount', 'payment_ref', 'ref', 'partner_id'])
+
+    def match(self, statement_lines: List[Dict]) -> Tuple[List[Dict], Dict]:
+        """
+        Abbina le righe estratto alle righe aperte (in ordine di data)
+
+        Args:
+            statement_lines: Righe da load_statement_lines
+
+        Returns:
+            Tuple (abbinamenti, conteggi per metodo)
+        """
+        counts = {'reference': 0, 'invoice': 0, 'amount': 0, 'ambiguous': 0, 'none': 0}
+        matches = []
+        for line in sorted(statement_lines, key=lambda l: (l['date'], l['id'])):
+            text = ' '.join(filter(None, [line.get('payment_ref'), line.get('ref')]))
+            position, method = self.index.find(
+                to_cents(line['amount']),
+                date.fromisoformat(line['date']).toordinal(),
+                self.date_window,
+                extract_references(text),
+                extract_invoice_numbers(text),
+                line['partner_id'][0] if line.get('partner_id') else None,
+            )
+            counts[method] += 1
+            if position is None:
+                continue
+            self.index.used.add(position)
+            item = self.index.items[position]
+            matches.append({'line': line, 'move_line_id': item['id'], 'move_name': item['move_name'],
+                            'method': method})
+        return matches, counts
+
+    def commit(self, matches: List[Dict]) -> List[Tuple[int, Optional[str]]]:
+        """
+        Registra gli abbinamenti in Odoo a blocchi
+
+        Args:
+            matches: Abbinamenti da match()
+
+        Returns:
+            Lista (ID riga estratto, errore o None)
+        """
+        results = []
+        for start in range(0, len(matches), self.batch_size):
+            block = matches[start:start + self.batch_size]
+            results.extend(self.manager.reconcile_lines([(m['line']['id'], [m['move_line_id']]) for m in block]))
+            done = sum(1 for _, error in results if error is None)
+            print(f"   ✅ Riconciliate {done}/{len(matches)}")
+        return results
+
+    def run(self, date_from: str = None, date_to: str = None, dry_run: bool = True) -> Dict:
+        """
+        Esegue lettura, abbinamento e (se non simulazione) registrazione
+
+        Args:
+            date_from: Data inizio ISO righe estratto (opzionale)
+            date_to: Data fine ISO righe estratto (opzionale)
+            dry_run: Se True, mostra solo gli abbinamenti proposti
+
+        Returns:
+            Report con conteggi, tasso di abbinamento ed errori
+        """
+        print(f"\n{'🔍 SIMULAZIONE' if dry_run else '💾 RICONCILIAZIONE'} GIORNALE {self.journal_id}")
+        print(f"{'='*70}")
+
+        open_count = self.load_open_items()
+        lines = self.load_statement_lines(date_from, date_to)
+        print(f"📥 Righe aperte crediti/debiti: {open_count}")
+        print(f"📄 Righe estratto da riconciliare: {len(lines)}")
+
+        matches, counts = self.match(lines)
+        for m in matches:
+            line = m['line']
+            print(f"   🔗 {line['date']} | {line['amount']:>10.2f} | {(line.get('payment_ref') or '')[:35]:35s} "
+                  f"→ {m['move_name']} ({m['method']})")
+
+        report = {
+            'journal_id': self.journal_id,
+            'open_items': open_count,
+            'statement_lines': len(lines),
+            'matched': len(matches),
+            'by_method': counts,
+            'match_rate': len(matches) / len(lines) if lines else 0.0,
+            'reconciled': 0,
+            'errors': [],
+            'dry_run': dry_run,
+        }
+
+        if not dry_run and matches:
+            for line_id, error in self.commit(matches):
+                if error:
+                    report['errors'].append({'line_id': line_id, 'error': error})
+                    print(f"   ❌ Riga {line_id}: {error}")
+                else:
+                    report['reconciled'] += 1
+
+        print(f"\n📈 RIEPILOGO:")
+        print(f"   Abbinate: {len(matches)}/{len(lines)} ({report['match_rate']:.1%})")
+        print(f"   per riferimento QR/SCOR: {counts['reference']}, per numero fattura: {counts['invoice']}, "
+              f"per importo: {counts['amount']}")
+        print(f"   Più candidati (manuale): {counts['ambiguous']}, nessun candidato: {counts['none']}")
+        if dry_run:
+            print(f"\n⚠️  MODALITÀ SIMULAZIONE - Nessuna riconciliazione salvata in Odoo")
+            print(f"   Esegui con --save per registrare gli abbinamenti")
+        else:
+            print(f"   Riconciliate: {report['reconciled']}, errori: {len(report['errors'])}")
+
+        return report
+
+
+if __name__ == "__main__":
+    import sys
+    from ubs_csv_importer import get_cli_option
+
+    odoo = OdooConnector()
+    if not odoo.connect():
+        sys.exit(1)
+
+    window = get_cli_option(sys.argv, '--window')
+    engine = ReconciliationEngine(
+        odoo,
+        journal_id=int(get_cli_option(sys.argv, '--journal', config.DEFAULT_JOURNAL_ID)),
+        date_window=int(window) if window else None,
+    )
+    engine.run(
+        date_from=get_cli_option(sys.argv, '--from'),
+        date_to=get_cli_option(sys.argv, '--to'),
+        dry_run='--save' not in sys.argv,
+    )
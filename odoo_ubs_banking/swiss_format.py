@@ -0,0 +1,113 @@
+"""
+Decodifica importi e date in formato svizzero (export UBS)
+
+Gli importi diventano centesimi interi (esatti, nessun errore di
+arrotondamento float nelle somme confrontate con il Saldo). Le date
+dd.mm.yyyy vengono convertite una sola volta per valore distinto: un
+estratto contiene poche centinaia di date diverse su migliaia di righe.
+"""
+
+from datetime import date
+from functools import lru_cache
+
+# Separatori migliaia ammessi: apostrofo, apostrofo tipografico, spazi
+_THOUSANDS = str.maketrans('', '', "'\u2019 \u00a0\u202f")
+
+
+@lru_cache(maxsize=65536)
+def parse_amount_cents(amount_str: str) -> int:
+    """
+    Converte un importo in formato svizzero in centesimi interi
+
+    Args:
+        amount_str: Importo (es. "1'234,56", "-1 234.56", "1'200.00-")
+
+    Returns:
+        Centesimi (es. 123456, -123456, -120000)
+
+    Raises:
+        ValueError: Se l'importo non è valido
+    """
+    value = amount_str.translate(_THOUSANDS)
+
+    negative = False
+    if value.startswith('-'):
+        negative = True
+        value = value[1:]
+    elif value.startswith('+'):
+        value = value[1:]
+    elif value.endswith('-'):
+        negative = True
+        value = value[:-1]
+
+    # L'ultimo separatore (virgola o punto) è quello decimale
+    separator = max(value.rfind(','), value.rfind('.'))
+    if separator >= 0:
+        integer = value[:separator].replace(',', '').replace('.', '')
+        fraction = value[separator + 1:]
+    else:
+        integer = value
+        fraction = ''
+
+    if not (integer or fraction) or not (integer + fraction).isdigit():
+        raise ValueError(f"Importo non valido: {amount_str!r}")
+
+    cents = int(integer or 0) * 100
+    if len(fraction) <= 2:
+        cents += int(fraction.ljust(2, '0'))
+    else:
+        # Più di due decimali: arrotonda al centesimo (metà per eccesso)
+        cents += (int(fraction[:3]) + 5) // 10
+
+    return -cents if negative else cents
+
+
+@lru_cache(maxsize=4096)
+def parse_date_iso(date_str: str) -> str:
+    """
+    Converte una data dd.mm.yyyy in formato ISO (memoizzata)
+
+    Args:
+        date_str: Data formato UBS (es. "31.12.2024")
+
+    Returns:
+        Data formato Odoo (es. "2024-12-31")
+
+    Raises:
+        ValueError: Se la data non è valida
+    """
+    return date.fromordinal(parse_date_ordinal(date_str)).isoformat()
+
+
+@lru_cache(maxsize=4096)
+def parse_date_ordinal(date_str: str) -> int:
+    """
+    Converte una data dd.mm.yyyy in giorno ordinale (memoizzata)
+
+    Args:
+        date_str: Data formato UBS (es. "31.12.2024")
+
+    Returns:
+        Giorno ordinale (date.toordinal())
+
+    Raises:
+        ValueError: Se la data non è valida
+    """
+    parts = date_str.strip().split('.')
+    if len(parts) != 3 or len(parts[2]) != 4:
+        raise ValueError(f"Data non valida: {date_str!r}")
+    day, month, year = parts
+    return date(int(year), int(month), int(day)).toordinal()
+
+
+def cents_to_amount(cents: int) -> float:
+    """
+    Converte centesimi nel float richiesto dai campi monetari Odoo
+
+    Args:
+        cents: Importo in centesimi
+
+    Returns:
+        Importo (float più vicino al valore decimale esatto)
+    """
+    return cents / 100
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""
+Test riconciliazione a blocchi contro il server Odoo finto
+
+Verifica che BankStatementManager.reconcile_lines sposti le contropartite
+sospese con un solo write per blocco e che, se reconcile fallisce, la riga
+estratto torni sul conto sospeso (riconciliabile in un'esecuzione successiva).
+
+USO:
+    python test_reconcile_batch.py
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import xmlrpc.client
+
+os.environ.setdefault('UBS_ODOO_SESSION_FILE', os.path.join(tempfile.mkdtemp(), 'sessions.json'))
+
+from fake_odoo_server import FakeOdoo, FakeOdooServer
+from odoo_connector import BankStatementManager, OdooConnector
+
+SUSPENSE_ACCOUNT = 195
+RECEIVABLE_ACCOUNT = 1100
+JOURNAL_ID = 9
+
+
+class FailingReconcileOdoo(FakeOdoo):
+    """Server finto in cui reconcile fallisce per le righe contabili indicate"""
+
+    def __init__(self, failing_lines=(), **kwargs):
+        super().__init__(partners=3, **kwargs)
+        self.failing_lines = set(failing_lines)
+
+    def execute_kw(self, model, method, args, kwargs):
+        if method == 'reconcile' and self.failing_lines & set(args[0]):
+            raise xmlrpc.client.Fault(2, "UserError: riconciliazione rifiutata")
+        return super().execute_kw(model, method, args, kwargs)
+
+
+def _seed(odoo: FakeOdoo, count: int):
+    """Righe estratto con contropartita sospesa e una fattura aperta ciascuna"""
+    matches = []
+    for number in range(count):
+        move_id = odoo._store('account.move', {'state': 'posted', 'journal_id': [JOURNAL_ID, '']})
+        suspense_id = odoo._store('account.move.line', {
+            'move_id': [move_id, ''], 'account_id': [SUSPENSE_ACCOUNT, ''], 'partner_id': False,
+            'reconciled': False,
+        })
+        line_id = odoo._store('account.bank.statement.line', {
+            'move_id': [move_id, ''], 'journal_id': [JOURNAL_ID, ''], 'amount': 100.0 + number,
+        })
+        invoice_line_id = odoo._store('account.move.line', {
+            'move_id': [odoo._store('account.move', {'state': 'posted'}), ''],
+            'account_id': [RECEIVABLE_ACCOUNT, ''], 'partner_id': [number + 1, ''], 'reconciled': False,
+        })
+        matches.append((line_id, [invoice_line_id], suspense_id))
+    return matches
+
+
+def _run(odoo: FakeOdoo, matches):
+    server = FakeOdooServer(odoo).start()
+    try:
+        with contextlib.redirect_stdout(io.StringIO()):
+            connector = OdooConnector(server.url, 'test', 'test', 'test')
+            connector.connect()
+        manager = BankStatementManager(connector)
+        return manager.reconcile_lines([(line_id, aml_ids) for line_id, aml_ids, _ in matches])
+    finally:
+        server.stop()
+
+
+def test_reconcile_batch_single_write():
+    odoo = FailingReconcileOdoo()
+    matches = _seed(odoo, 5)
+    results = _run(odoo, matches)
+
+    assert [error for _, error in results] == [None] * 5
+    assert odoo.calls['account.move.write'] == 1
+    assert odoo.calls['account.move.line.reconcile'] == 5
+    for _, _, suspense_id in matches:
+        line = odoo.records['account.move.line'][suspense_id]
+        assert line['account_id'][0] == RECEIVABLE_ACCOUNT and line['reconciled']
+
+
+def test_reconcile_fault_restores_suspense():
+    odoo = FailingReconcileOdoo()
+    matches = _seed(odoo, 4)
+    failed_line, [failed_invoice_line], failed_suspense = matches[2]
+    odoo.failing_lines = {failed_invoice_line}
+    results = _run(odoo, matches)
+
+    errors = dict(results)
+    assert errors[failed_line] and all(errors[line_id] is None for line_id, _, _ in matches if line_id != failed_line)
+
+    suspense = odoo.records['account.move.line'][failed_suspense]
+    assert suspense['account_id'][0] == SUSPENSE_ACCOUNT
+    assert suspense['partner_id'] is False
+    assert not odoo.records['account.move.line'][failed_invoice_line]['reconciled']
+    assert all(move['state'] == 'posted' for move in odoo.records['account.move'].values())
+
+    # La riga rimasta sul conto sospeso può essere riconciliata di nuovo
+    odoo.failing_lines = set()
+    assert _run(odoo, [matches[2]]) == [(failed_line, None)]
+
+
+if __name__ == '__main__':
+    test_reconcile_batch_single_write()
+    test_reconcile_fault_restores_suspense()
+    print("[OK] Riconciliazione a blocchi")
@@ -0,0 +1,476 @@
+"""
+Rappresentazione colonnare compatta dei movimenti bancari
+
+Ogni colonna è un array.array (memoria contigua, nessun oggetto Python per
+riga): date come giorni ordinali int32, importi e saldi in centesimi int64,
+testi internati in una tabella di stringhe condivisa. I controlli su un intero
+estratto conto (totali, duplicati, saldi progressivi) scorrono gli array
+senza materializzare un dizionario per movimento.
+"""
+
+from array import array
+from datetime import date
+from itertools import accumulate
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from swiss_format import cents_to_amount
+
+# Valore sentinella per saldo assente nella colonna balances
+NO_BALANCE = -(2 ** 63)
+
+# Indice sentinella per stringa assente (None) nelle colonne di testo
+NO_STRING = -1
+
+
+class StringTable:
+    """Tabella di stringhe internate: ogni testo distinto è memorizzato una sola volta"""
+
+    def __init__(self):
+        self.values: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def intern(self, value: Optional[str]) -> int:
+        """
+        Restituisce l'indice di una stringa, aggiungendola se nuova
+
+        Args:
+            value: Testo da internare (None = assente)
+
+        Returns:
+            Indice nella tabella o NO_STRING
+        """
+        if value is None:
+            return NO_STRING
+        index = self._index.get(value)
+        if index is None:
+            index = len(self.values)
+            self.values.append(value)
+            self._index[value] = index
+        return index
+
+    def get(self, index: int) -> Optional[str]:
+        """
+        Restituisce la stringa di un indice
+
+        Args:
+            index: Indice nella tabella
+
+        Returns:
+            Testo o None per NO_STRING
+        """
+        return None if index == NO_STRING else self.values[index]
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+
+class TransactionBatch:
+    """Movimenti bancari in formato colonnare (array.array)"""
+
+    def __init__(self, strings: StringTable = None):
+        """
+        Inizializza batch vuoto
+
+        Args:
+            strings: Tabella stringhe da condividere tra più batch (opzionale)
+        """
+        self.strings = strings or StringTable()
+        self.dates = array('i')          # giorni ordinali (date.toordinal())
+        self.amounts = array('q')        # centesimi, positivo=entrata
+        self.balances = array('q')       # centesimi, NO_BALANCE se assente
+        self.payment_refs = array('i')   # indici StringTable
+        self.partner_names = array('i')
+        self.refs = array('i')
+        self._date_cache: Dict[str, int] = {}
+
+    @classmethod
+    def from_transactions(cls, transactions: Iterable[Dict], strings: StringTable = None) -> 'TransactionBatch':
+        """
+        Costruisce un batch da movimenti normalizzati (vedi UBSCSVParser)
+
+        Args:
+            transactions: Iterabile di dizionari transazione
+            strings: Tabella stringhe condivisa (opzionale)
+
+        Returns:
+            Nuovo TransactionBatch
+        """
+        batch = cls(strings)
+        for transaction in transactions:
+            batch.append(transaction)
+        return batch
+
+    def append(self, transaction: Dict) -> None:
+        """
+        Aggiunge un movimento normalizzato
+
+        Args:
+            transaction: Dizionario con date, amount(_cents), payment_ref, partner_name, ref, balance(_cents)
+        """
+        amount_cents = transaction.get('amount_cents')
+        if amount_cents is None:
+            amount_cents = to_cents(transaction['amount'])
+
+        balance_cents = transaction.get('balance_cents')
+        if balance_cents is None and transaction.get('balance') is not None:
+            balance_cents = to_cents(transaction['balance'])
+
+        self.append_values(
+            self._date_to_day(transaction['date']),
+            amount_cents,
+            NO_BALANCE if balance_cents is None else balance_cents,
+            transaction.get('payment_ref'),
+            transaction.get('partner_name'),
+            transaction.get('ref'),
+        )
+
+    def append_values(self, day: int, amount_cents: int, balance_cents: int,
+                      payment_ref: Optional[str], partner_name: Optional[str],
+                      ref: Optional[str]) -> None:
+        """
+        Aggiunge un movimento già convertito in valori colonnari
+
+        Args:
+            day: Data come giorno ordinale
+            amount_cents: Importo in centesimi
+            balance_cents: Saldo in centesimi o NO_BALANCE
+            payment_ref: Descrizione movimento
+            partner_name: Nome controparte
+            ref: Riferimento transazione
+        """
+        intern = self.strings.intern
+        self.dates.append(day)
+        self.amounts.append(amount_cents)
+        self.balances.append(balance_cents)
+        self.payment_refs.append(intern(payment_ref))
+        self.partner_names.append(intern(partner_name))
+        self.refs.append(intern(ref))
+
+    def _date_to_day(self, iso_date: str) -> int:
+        day = self._date_cache.get(iso_date)
+        if day is None:
+            day = date.fromisoformat(iso_date).toordinal()
+            self._date_cache[iso_date] = day
+        return day
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def row(self, index: int) -> Dict:
+        """
+        Materializza un movimento nel formato dizionario normalizzato
+
+        Args:
+            index: Posizione del movimento nel batch
+
+        Returns:
+            Dizionario transazione (stesso formato di UBSCSVParser)
+        """
+        amount = self.amounts[index]
+        balance = self.balances[index]
+        if balance == NO_BALANCE:
+            balance = None
+        return {
+            'date': date.fromordinal(self.dates[index]).isoformat(),
+            'payment_ref': self.strings.get(self.payment_refs[index]),
+            'amount': cents_to_amount(amount),
+            'amount_cents': amount,
+            'partner_name': self.strings.get(self.partner_names[index]),
+            'ref': self.strings.get(self.refs[index]),
+            'balance': None if balance is None else cents_to_amount(balance),
+            'balance_cents': balance,
+        }
+
+    def __iter__(self) -> Iterator[Dict]:
+        for index in range(len(self)):
+            yield self.row(index)
+
+    # ------------------------------------------------------------------
+    # Controlli su tutto l'estratto conto
+    # ------------------------------------------------------------------
+
+    def total_cents(self) -> int:
+        """Somma esatta di tutti gli importi in centesimi"""
+        return sum(self.amounts)
+
+    def credit_debit_cents(self) -> Dict[str, int]:
+        """
+        Totali entrate/uscite in centesimi
+
+        Returns:
+            {'credit': int, 'debit': int} (debit negativo)
+        """
+        credit = sum(a for a in self.amounts if a > 0)
+        return {'credit': credit, 'debit': self.total_cents() - credit}
+
+    def date_range(self) -> Optional[Dict[str, str]]:
+        """
+        Intervallo date coperto dal batch
+
+        Returns:
+            {'from': 'YYYY-MM-DD', 'to': 'YYYY-MM-DD'} o None se vuoto
+        """
+        if not self.dates:
+            return None
+        return {
+            'from': date.fromordinal(min(self.dates)).isoformat(),
+            'to': date.fromordinal(max(self.dates)).isoformat(),
+        }
+
+    def invalid_indices(self) -> List[int]:
+        """
+        Indici dei movimenti non importabili (importo zero o data mancante)
+
+        Returns:
+            Lista indici
+        """
+        return [i for i, (day, amount) in enumerate(zip(self.dates, self.amounts))
+                if amount == 0 or day <= 0]
+
+    def duplicate_indices(self) -> List[int]:
+        """
+        Indici dei movimenti ripetuti nel batch (stessa data, importo, riferimento e descrizione)
+
+        Il primo movimento di ogni gruppo non viene segnalato.
+
+        Returns:
+            Lista indici dei duplicati
+        """
+        seen = set()
+        duplicates = []
+        keys = zip(self.dates, self.amounts, self.refs, self.payment_refs)
+        for index, key in enumerate(keys):
+            if key in seen:
+                duplicates.append(index)
+            else:
+                seen.add(key)
+        return duplicates
+
+    def running_balance_cents(self, opening_cents: int = 0) -> array:
+        """
+        Saldo progressivo calcolato dagli importi
+
+        Args:
+            opening_cents: Saldo iniziale in centesimi
+
+        Returns:
+            array('q') con il saldo dopo ogni movimento
+        """
+        return array('q', accumulate(self.amounts, initial=opening_cents))[1:]
+
+    def chronological_order(self) -> List[int]:
+        """
+        Indici dei movimenti in ordine cronologico
+
+        Gli export UBS possono essere dal più vecchio o dal più recente: se le
+        date sono decrescenti l'ordine del file viene invertito, se sono miste
+        i movimenti vengono ordinati per data mantenendo l'ordine del file a
+        parità di data.
+
+        Returns:
+            Lista indici dal movimento più vecchio al più recente
+        """
+        dates = self.dates
+        pairs = list(zip(dates, dates[1:]))
+        if all(a <= b for a, b in pairs):
+            return list(range(len(dates)))
+        if all(a >= b for a, b in pairs):
+            return list(range(len(dates) - 1, -1, -1))
+        return sorted(range(len(dates)), key=dates.__getitem__)
+
+    def balance_mismatches(self) -> List[int]:
+        """
+        Indici dei movimenti il cui Saldo riportato non torna con gli importi
+
+        Il saldo iniziale è ricavato dal primo movimento (in ordine cronologico)
+        con Saldo valorizzato; dopo una discrepanza tutti i saldi successivi
+        risultano diversi (vedi verify_balances per le sole interruzioni).
+
+        Returns:
+            Lista indici con saldo progressivo diverso dal Saldo del CSV
+        """
+        order = self.chronological_order()
+        balances = [self.balances[i] for i in order]
+        amounts = array('q', (self.amounts[i] for i in order))
+
+        first = next((k for k, b in enumerate(balances) if b != NO_BALANCE), None)
+        if first is None:
+            return []
+
+        opening = balances[first] - sum(amounts[:first + 1])
+        running = accumulate(amounts, initial=opening)
+        next(running)
+        return sorted(order[k] for k, (reported, computed) in enumerate(zip(balances, running))
+                      if reported != NO_BALANCE and reported != computed)
+
+    def verify_balances(self, opening_cents: Optional[int] = None) -> Dict:
+        """
+        Verifica il Saldo riportato contro la somma progressiva degli importi
+
+        Un solo passaggio vettoriale in ordine cronologico (NumPy se installato):
+        con la somma cumulativa degli importi, Saldo meno somma cumulativa è
+        costante finché non mancano movimenti. Ogni variazione tra due Saldo
+        consecutivi è un'interruzione, segnalata una volta sola.
+
+        Args:
+            opening_cents: Saldo noto prima del primo movimento (es. ultimo saldo
+                           Odoo del giornale); None = ricavato dal primo Saldo
+
+        Returns:
+            Dizionario con order ('asc', 'desc', 'mixed'), opening_cents,
+            closing_cents, opening_difference_cents (rispetto a opening_cents),
+            gaps (interruzioni) e missing_days (giorni feriali senza movimenti
+            all'interno delle interruzioni)
+        """
+        try:
+            order, direction, opening, closing, breaks = self._balance_breaks_numpy()
+        except ImportError:
+            order, direction, opening, closing, breaks = self._balance_breaks()
+
+        result = {
+            'order': direction,
+            'opening_cents': opening,
+            'closing_cents': closing,
+            'opening_difference_cents': None,
+            'gaps': [],
+            'missing_days': [],
+        }
+        if opening is not None and opening_cents is not None:
+            result['opening_difference_cents'] = opening - opening_cents
+
+        for position, expected, reported in breaks:
+            index = int(order[position])
+            day, previous_day = self.dates[index], self.dates[int(order[position - 1])]
+            result['gaps'].append({
+                'index': index,
+                'date': date.fromordinal(day).isoformat(),
+                'previous_date': date.fromordinal(previous_day).isoformat(),
+                'expected_cents': expected,
+                'reported_cents': reported,
+                'difference_cents': reported - expected,
+            })
+            result['missing_days'].extend(
+                date.fromordinal(d).isoformat() for d in range(previous_day + 1, day)
+                if date.fromordinal(d).weekday() < 5
+            )
+        return result
+
+    def _balance_breaks_numpy(self) -> tuple:
+        """
+        Ordine, saldo iniziale e finale e interruzioni calcolati con NumPy
+
+        Returns:
+            (ordine cronologico, direzione, saldo iniziale, saldo finale,
+            lista (posizione cronologica, saldo atteso, Saldo riportato))
+
+        Raises:
+            ImportError: numpy non installato
+        """
+        import numpy as np
+
+        columns = self.to_numpy()
+        dates = columns['dates']
+        steps = np.diff(dates)
+        if (steps >= 0).all():
+            order, direction = np.arange(len(dates)), 'asc'
+        elif (steps <= 0).all():
+            order, direction = np.arange(len(dates) - 1, -1, -1), 'desc'
+        else:
+            order, direction = np.argsort(dates, kind='stable'), 'mixed'
+
+        amounts = columns['amounts'][order]
+        balances = columns['balances'][order]
+        positions = np.flatnonzero(balances != NO_BALANCE)
+        if not positions.size:
+            return order, direction, None, None, []
+
+        running = np.cumsum(amounts)
+        # Saldo implicito prima del primo movimento: costante se non mancano movimenti
+        base = balances[positions] - running[positions]
+        differences = np.diff(base)
+        changes = np.flatnonzero(differences)
+        at = positions[changes + 1]
+        breaks = zip(at.tolist(), (balances[at] - differences[changes]).tolist(), balances[at].tolist())
+
+        first, last = positions[0], positions[-1]
+        return (order, direction, int(balances[first] - amounts[first]),
+                int(balances[last] + running[-1] - running[last]), list(breaks))
+
+    def _balance_breaks(self) -> tuple:
+        """Come _balance_breaks_numpy, in Python puro (numpy non installato)"""
+        order = self.chronological_order()
+        if order == list(range(len(self))):
+            direction = 'asc'
+        elif order == list(range(len(self) - 1, -1, -1)):
+            direction = 'desc'
+        else:
+            direction = 'mixed'
+
+        if direction == 'asc':
+            amounts, balances = self.amounts, self.balances
+        else:
+            amounts = [self.amounts[i] for i in order]
+            balances = [self.balances[i] for i in order]
+
+        # (posizione, Saldo meno somma cumulativa) per ogni movimento con Saldo
+        checkpoints = [(k, reported - running)
+                       for k, (reported, running) in enumerate(zip(balances, accumulate(amounts)))
+                       if reported != NO_BALANCE]
+        if not checkpoints:
+            return order, direction, None, None, []
+
+        breaks = [(k, balances[k] - (current - previous), balances[k])
+                  for (_, previous), (k, current) in zip(checkpoints, checkpoints[1:]) if current != previous]
+        first = checkpoints[0][0]
+        return (order, direction, balances[first] - amounts[first],
+                checkpoints[-1][1] + sum(amounts), breaks)
+
+    def summary(self) -> Dict:
+        """
+        Riepilogo dei controlli sull'intero batch
+
+        Returns:
+            Dizionario con conteggi, totali, intervallo date e anomalie
+        """
+        totals = self.credit_debit_cents()
+        return {
+            'count': len(self),
+            'total_cents': totals['credit'] + totals['debit'],
+            'credit_cents': totals['credit'],
+            'debit_cents': totals['debit'],
+            'date_range': self.date_range(),
+            'invalid': self.invalid_indices(),
+            'duplicates': self.duplicate_indices(),
+            'balance_check': self.verify_balances(),
+        }
+
+    def to_numpy(self) -> Dict:
+        """
+        Viste NumPy senza copia delle colonne numeriche (richiede numpy)
+
+        Returns:
+            Dizionario colonna -> numpy.ndarray
+        """
+        import numpy as np
+
+        return {
+            'dates': np.frombuffer(self.dates, dtype=np.int32),
+            'amounts': np.frombuffer(self.amounts, dtype=np.int64),
+            'balances': np.frombuffer(self.balances, dtype=np.int64),
+            'payment_refs': np.frombuffer(self.payment_refs, dtype=np.int32),
+            'partner_names': np.frombuffer(self.partner_names, dtype=np.int32),
+            'refs': np.frombuffer(self.refs, dtype=np.int32),
+        }
+
+
+def to_cents(amount: float) -> int:
+    """
+    Converte un importo in centesimi interi
+
+    Args:
+        amount: Importo (es. 1234.56)
+
+    Returns:
+        Centesimi (es. 123456)
+    """
+    return int(round(amount * 100))
@@ -0,0 +1,162 @@
+"""
+Generatore di export CSV UBS sintetici (benchmark e prove senza dati reali)
+
+Scrive file con la stessa struttura dell'export e-banking: header conto,
+header transazioni, movimenti dal più recente con Saldo coerente. Encoding,
+formato numerico svizzero e numero di righe sono configurabili; le
+descrizioni contengono umlaut e accenti per mettere alla prova il
+rilevamento encoding.
+
+USO:
+    python ubs_csv_generator.py movimenti_test.csv 100000
+    python ubs_csv_generator.py movimenti_test.csv 100000 --encoding windows-1252 --format space
+"""
+
+import os
+import random
+from datetime import date, timedelta
+from typing import Dict
+
+import config
+
+# Formati importo: separatore migliaia, separatore decimale
+NUMBER_FORMATS = {
+    'apostrophe': ("'", ','),        # 1'234,56 (export UBS standard)
+    'apostrophe_dot': ("'", '.'),    # 1'234.56
+    'typographic': ('’', '.'),  # 1’234.56
+    'space': (' ', ','),             # 1 234,56
+    'plain': ('', '.'),              # 1234.56
+}
+
+ENCODINGS = ('utf-8', 'utf-8-sig', 'windows-1252', 'latin-1', 'utf-16')
+
+_HEADER = ['Bewertungsdatum', 'Bankbeziehung', 'Portfolio', 'Produkt', 'IBAN', 'Whrg.']
+_COLUMNS = ['Datum von', 'Datum bis', 'Beschreibung', 'Abschlussdatum', 'Buchungsdatum', 'Valuta',
+            'Beschreibung 1', 'Beschreibung 2', 'Beschreibung 3', 'Transaktions-Nr.',
+            'Devisenkurs zum Originalbetrag in Abrechnungswährung', 'Einzelbetrag', 'Belastung',
+            'Gutschrift', 'Saldo']
+
+_PARTNERS = ['Müller Immobilien GmbH', 'Société Générale Genève SA', 'Rossi Mario', 'Zürcher Käserei AG',
+             'Café Crème Sàrl', 'Bäckerei Hänni', 'ACME Corporation', 'Office Supplies SA',
+             'Gastro Ticino Sagl', 'Lüthi & Söhne KG']
+_CREDITS = ['Überweisung', 'Gutschrift QR-Rechnung', 'Bonifico da cliente']
+_DEBITS = ['Lastschrift', 'Kartenzahlung', 'Dauerauftrag', 'e-Banking Zahlung']
+_MONTHS = ['Januar', 'Februar', 'März', 'April', 'Mai', 'Juni', 'Juli', 'August', 'September',
+           'Oktober', 'November', 'Dezember']
+
+
+def format_amount(cents: int, number_format: str = 'apostrophe') -> str:
+    """
+    Formatta un importo in centesimi come negli export svizzeri
+
+    Args:
+        cents: Importo in centesimi
+        number_format: Chiave di NUMBER_FORMATS
+
+    Returns:
+        Importo formattato (es. "1'234,56")
+    """
+    thousands, decimal = NUMBER_FORMATS[number_format]
+    sign = '-' if cents < 0 else ''
+    units, fraction = divmod(abs(cents), 100)
+    return f"{sign}{units:,}".replace(',', thousands) + f"{decimal}{fraction:02d}"
+
+
+def generate_ubs_csv(file_path: str, rows: int = 10000, encoding: str = 'utf-8',
+                     number_format: str = 'apostrophe', seed: int = 42,
+                     iban: str = None, start: date = None, opening_cents: int = 100_000_00) -> Dict:
+    """
+    Scrive un export CSV UBS sintetico
+
+    Args:
+        file_path: File da scrivere
+        rows: Numero movimenti
+        encoding: Encoding del file (vedi ENCODINGS)
+        number_format: Formato importi (vedi NUMBER_FORMATS)
+        seed: Seed del generatore casuale (stesso seed = stesso file)
+        iban: IBAN nell'header (default giornale predefinito)
+        start: Data del primo movimento (default 01.01.2024)
+        opening_cents: Saldo prima del primo movimento
+
+    Returns:
+        Riepilogo: righe, periodo, saldo iniziale e finale in centesimi, dimensione file
+    """
+    if number_format not in NUMBER_FORMATS:
+        raise ValueError(f"Formato numerico non valido: {number_format} ({', '.join(NUMBER_FORMATS)})")
+    try:
+        NUMBER_FORMATS[number_format][0].encode(encoding)
+    except UnicodeEncodeError:
+        raise ValueError(f"Il formato {number_format} non è rappresentabile in {encoding}")
+
+    rng = random.Random(seed)
+    iban = iban or config.GIORNALI_UBS['UBS_CHF']['iban']
+    start = start or date(2024, 1, 1)
+    per_day = max(1, rows // 250)
+
+    # Movimenti in ordine cronologico, poi scritti dal più recente come nell'export UBS
+    movements = []
+    balance = opening_cents
+    for i in range(rows):
+        day = start + timedelta(days=i // per_day)
+        credit = rng.random() < 0.4
+        cents = rng.randint(500, 2_500_000) if credit else -rng.randint(500, 800_000)
+        balance += cents
+        partner = rng.choice(_PARTNERS)
+        movements.append((day, cents, balance, partner, i + 1))
+    first_day = movements[0][0] if movements else start
+    last_day = movements[-1][0] if movements else start
+    date_from, date_to = first_day.strftime('%d.%m.%Y'), last_day.strftime('%d.%m.%Y')
+
+    with open(file_path, 'w', encoding=encoding, newline='') as f:
+        f.write(';'.join(_HEADER) + '\r\n')
+        f.write(';'.join([date_to, '0278-12345678', 'Portfolio Standard', 'Privatkonto', iban,
+                          'CHF']) + '\r\n')
+        f.write('\r\n')
+        f.write(';'.join(_COLUMNS) + '\r\n')
+
+        for day, cents, balance, partner, number in reversed(movements):
+            day_str = day.strftime('%d.%m.%Y')
+            amount = format_amount(abs(cents), number_format)
+            if cents > 0:
+                kind, text = rng.choice(_CREDITS), f"Pagamento fattura INV/{day.year}/{number:05d}"
+            else:
+                kind, text = rng.choice(_DEBITS), f"Ordine {number} - Lieferung für {_MONTHS[day.month - 1]}"
+            f.write(';'.join([
+                date_from, date_to, kind, '', day_str, day_str,
+                f'"{text}"', f'"{partner}"', f'"Referenz: {number:08d}"', f"TRX{number:09d}", '',
+                amount, '' if cents > 0 else amount, amount if cents > 0 else '',
+                format_amount(balance, number_format),
+            ]) + '\r\n')
+
+    return {
+        'file': file_path,
+        'rows': rows,
+        'encoding': encoding,
+        'number_format': number_format,
+        'period': (first_day.isoformat(), last_day.isoformat()),
+        'opening_cents': opening_cents,
+        'closing_cents': movements[-1][2] if movements else opening_cents,
+        'bytes': os.path.getsize(file_path),
+    }
+
+
+if __name__ == "__main__":
+    import sys
+    from ubs_csv_importer import get_cli_option
+
+    if len(sys.argv) < 2:
+        print("USO: python ubs_csv_generator.py <file.csv> [righe] [--encoding utf-8] [--format apostrophe] [--seed 42]")
+        print(f"     encoding: {', '.join(ENCODINGS)}")
+        print(f"     formati:  {', '.join(NUMBER_FORMATS)}")
+        sys.exit(1)
+
+    count = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else 10000
+    summary = generate_ubs_csv(
+        sys.argv[1],
+        rows=count,
+        encoding=get_cli_option(sys.argv, '--encoding', 'utf-8'),
+        number_format=get_cli_option(sys.argv, '--format', 'apostrophe'),
+        seed=int(get_cli_option(sys.argv, '--seed', 42)),
+    )
+    print(f"✅ {summary['file']}: {summary['rows']} movimenti {summary['period'][0]} → {summary['period'][1]}, "
+          f"{summary['bytes'] / 1024:.0f} KB ({summary['encoding']}, {summary['number_format']})")
@@ -1,50 +1,64 @@
 """
 Importatore CSV movimenti bancari UBS in Odoo
+
+Accetta anche estratti ISO 20022 camt.053/camt.054 (vedi camt_parser).
 """
 
 import csv
+import glob
+import itertools
 import os
-from typing import List, Dict, Optional, Tuple
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
 from datetime import datetime
-import chardet
 import config
-from odoo_connector import (
-    OdooConnector,
-    BankStatementManager,
-    format_date_odoo,
-    format_amount_odoo
-)
+from camt_parser import CamtParser, is_camt_file
+from dedup_index import DedupIndex
+from encoding_detection import detect_encoding, normalize_iban
+from import_checkpoint import ImportCheckpoint
+from import_pipeline import UploadJob, UploadPipeline
+from import_report import ImportReport
+from transaction_batch import TransactionBatch, to_cents
+from odoo_connector import OdooConnector, BankStatementManager
+from partner_index import PartnerIndex
+from swiss_format import parse_amount_cents, parse_date_iso, cents_to_amount
+
+# Estensioni dei file estratto letti da una cartella
+STATEMENT_EXTENSIONS = ('.csv', '.xml')
 
 
 class UBSCSVParser:
     """Parser per file CSV esportati da UBS e-banking"""
 
-    def __init__(self, file_path: str):
+    def __init__(self, file_path: str, encoding: str = None):
         """
         Inizializza parser
 
         Args:
             file_path: Percorso file CSV UBS
+            encoding: Encoding del file (default: rilevato automaticamente)
         """
         self.file_path = file_path
-        self.encoding = self._detect_encoding()
+        self.encoding = encoding or self._detect_encoding()
         self.header_info = {}
         self.transactions = []
+        self.period = None  # (data_da, data_a) ISO dell'export, da 'Datum von'/'Datum bis'
 
     def _detect_encoding(self) -> str:
         """
-        Rileva encoding del file
+        Rileva encoding del file leggendo solo un campione iniziale
 
         Returns:
             Nome encoding (es. 'utf-8', 'windows-1252')
         """
-        with open(self.file_path, 'rb') as f:
-            result = chardet.detect(f.read())
-            return result['encoding'] or 'utf-8'
+        return detect_encoding(self.file_path)
 
     def parse(self) -> Tuple[Dict, List[Dict]]:
         """
-        Parsa il file CSV UBS
+        Parsa il file CSV UBS caricando tutti i movimenti in memoria
+
+        Wrapper di compatibilità su iter_transactions(): per export grandi
+        usare direttamente l'iteratore.
 
         Returns:
             Tuple (header_info, transactions)
@@ -54,33 +68,137 @@ class UBSCSVParser:
         Raises:
             ValueError: Se file non valido
         """
-        with open(self.file_path, 'r', encoding=self.encoding) as f:
-            # Leggi tutte le righe
-            lines = f.readlines()
+        self.transactions = list(self.iter_transactions())
+        return self.header_info, self.transactions
+
+    def parse_batch(self) -> Tuple[Dict, TransactionBatch]:
+        """
+        Parsa il file CSV UBS in formato colonnare compatto
+
+        Returns:
+            Tuple (header_info, batch)
+            - header_info: Info account (IBAN, valuta, ecc.)
+            - batch: TransactionBatch con tutti i movimenti
+
+        Raises:
+            ValueError: Se file non valido
+        """
+        batch = TransactionBatch.from_transactions(self.iter_transactions(include_raw=False))
+        return self.header_info, batch
+
+    def iter_batches(self, batch_size: int = 5000) -> Iterator[TransactionBatch]:
+        """
+        Legge il file in streaming restituendo blocchi colonnari di dimensione fissa
+
+        Args:
+            batch_size: Numero massimo di movimenti per blocco
+
+        Yields:
+            TransactionBatch con al massimo batch_size movimenti
+        """
+        batch = TransactionBatch()
+        for transaction in self.iter_transactions(include_raw=False):
+            batch.append(transaction)
+            if len(batch) >= batch_size:
+                yield batch
+                batch = TransactionBatch()
+        if len(batch):
+            yield batch
+
+    def iter_transactions(self, include_raw: bool = True) -> Iterator[Dict]:
+        """
+        Legge il file CSV UBS riga per riga e restituisce i movimenti uno alla volta
+
+        L'header account e l'header transazioni vengono individuati durante la
+        lettura, quindi la memoria usata non dipende dalla dimensione del file.
+        header_info è disponibile dopo il primo movimento restituito.
+
+        Args:
+            include_raw: Se True, ogni movimento conserva la riga CSV originale in 'raw_data'
+
+        Yields:
+            Dizionario transazione normalizzato (vedi _parse_transaction_row)
 
-            if len(lines) < 3:
-                raise ValueError("File CSV troppo corto, non sembra un export UBS valido")
+        Raises:
+            ValueError: Se file non valido
+        """
+        with open(self.file_path, 'r', encoding=self.encoding, newline='') as f:
+            reader = csv.reader(f, delimiter=';')
+
+            # Cerca header transazioni (di solito riga 3), leggendo solo le righe necessarie
+            preamble = []
+            preamble_count = 0
+            fieldnames = None
+            for row in reader:
+                if self._is_transaction_header(row):
+                    fieldnames = row
+                    break
+                # Servono solo le prime due righe (nomi e valori header account)
+                if len(preamble) < 2:
+                    preamble.append(row)
+                preamble_count += 1
+
+            if fieldnames is None:
+                if preamble_count < 3:
+                    raise ValueError("File CSV troppo corto, non sembra un export UBS valido")
+                raise ValueError("Header transazioni non trovato nel CSV")
 
             # Parsea header account (prima riga dati)
-            self._parse_header(lines)
+            self._parse_header(preamble)
 
-            # Parsea transazioni
-            self._parse_transactions(lines)
+            # Il DictReader continua dalla posizione corrente del file
+            for row in csv.DictReader(f, fieldnames=fieldnames, delimiter=';'):
+                # Salta righe vuote
+                if not any(row.values()):
+                    continue
 
-        return self.header_info, self.transactions
+                if self.period is None:
+                    self.period = self._parse_period(row)
 
-    def _parse_header(self, lines: List[str]) -> None:
+                # Estrai dati transazione
+                transaction = self._parse_transaction_row(row, include_raw)
+                if transaction:
+                    yield transaction
+
+    @staticmethod
+    def _parse_period(row: Dict[str, str]) -> Optional[Tuple[str, str]]:
+        """
+        Estrae il periodo dell'export dalle colonne 'Datum von'/'Datum bis'
+
+        Args:
+            row: Prima riga transazione
+
+        Returns:
+            Tuple (data_da, data_a) ISO o None se assente
+        """
+        try:
+            return parse_date_iso(row['Datum von']), parse_date_iso(row['Datum bis'])
+        except (KeyError, ValueError, AttributeError):
+            return None
+
+    @staticmethod
+    def _is_transaction_header(row: List[str]) -> bool:
+        """
+        Verifica se una riga CSV è l'header delle transazioni
+
+        Args:
+            row: Riga CSV già divisa in colonne
+
+        Returns:
+            True se la riga contiene le colonne transazioni UBS
+        """
+        line = ';'.join(row)
+        return 'Buchungsdatum' in line or 'Valuta' in line or 'Belastung' in line
+
+    def _parse_header(self, rows: List[List[str]]) -> None:
         """
         Parsea le righe di header con info account
 
         Args:
-            lines: Tutte le righe del file
+            rows: Righe CSV che precedono l'header transazioni
         """
         # Prima riga: nomi colonne header
         # Seconda riga: valori header
-        reader = csv.reader(lines[:2], delimiter=';')
-        rows = list(reader)
-
         if len(rows) >= 2:
             header_keys = rows[0]
             header_values = rows[1]
@@ -90,45 +208,13 @@ class UBSCSVParser:
                 if i < len(header_values):
                     self.header_info[key.strip()] = header_values[i].strip()
 
-    def _parse_transactions(self, lines: List[str]) -> None:
-        """
-        Parsea le righe con le transazioni
-
-        Args:
-            lines: Tutte le righe del file
-        """
-        # Trova riga header transazioni (di solito riga 3)
-        transaction_header_index = None
-        for i, line in enumerate(lines):
-            if 'Buchungsdatum' in line or 'Valuta' in line or 'Belastung' in line:
-                transaction_header_index = i
-                break
-
-        if transaction_header_index is None:
-            raise ValueError("Header transazioni non trovato nel CSV")
-
-        # Parsea transazioni
-        reader = csv.DictReader(
-            lines[transaction_header_index:],
-            delimiter=';'
-        )
-
-        for row in reader:
-            # Salta righe vuote
-            if not any(row.values()):
-                continue
-
-            # Estrai dati transazione
-            transaction = self._parse_transaction_row(row)
-            if transaction:
-                self.transactions.append(transaction)
-
-    def _parse_transaction_row(self, row: Dict[str, str]) -> Optional[Dict]:
+    def _parse_transaction_row(self, row: Dict[str, str], include_raw: bool = True) -> Optional[Dict]:
         """
         Parsea una singola riga transazione
 
         Args:
             row: Riga CSV come dizionario
+            include_raw: Se True, conserva la riga originale in 'raw_data'
 
         Returns:
             Dizionario transazione o None se riga non valida
@@ -155,17 +241,17 @@ class UBSCSVParser:
             if not date_str:
                 return None
 
-            # Calcola importo (positivo=entrata, negativo=uscita)
-            amount = 0.0
+            # Calcola importo in centesimi esatti (positivo=entrata, negativo=uscita)
+            amount_cents = 0
             if gutschrift:  # Accredito (entrata)
-                amount = format_amount_odoo(gutschrift)
+                amount_cents = parse_amount_cents(gutschrift)
             elif belastung:  # Addebito (uscita)
-                amount = -format_amount_odoo(belastung)
+                amount_cents = -parse_amount_cents(belastung)
             elif einzelbetrag:  # Importo singolo (potrebbe avere segno)
-                amount = format_amount_odoo(einzelbetrag)
+                amount_cents = parse_amount_cents(einzelbetrag)
 
             # Se importo zero, salta
-            if amount == 0.0:
+            if amount_cents == 0:
                 return None
 
             # Combina descrizioni
@@ -175,15 +261,22 @@ class UBSCSVParser:
             # Partner name (di solito in Beschreibung 2)
             partner_name = beschreibung2 if beschreibung2 else None
 
-            return {
-                'date': format_date_odoo(date_str),
+            balance_cents = parse_amount_cents(saldo) if saldo else None
+
+            transaction = {
+                'date': parse_date_iso(date_str),
                 'payment_ref': payment_ref,
-                'amount': amount,
+                'amount': cents_to_amount(amount_cents),
+                'amount_cents': amount_cents,
                 'partner_name': partner_name,
                 'ref': transaktions_nr if transaktions_nr else None,
-                'balance': format_amount_odoo(saldo) if saldo else None,
-                'raw_data': dict(row)  # Conserva dati originali per debug
+                'balance': cents_to_amount(balance_cents) if balance_cents is not None else None,
+                'balance_cents': balance_cents,
             }
+            if include_raw:
+                transaction['raw_data'] = dict(row)  # Conserva dati originali per debug
+
+            return transaction
 
         except Exception as e:
             print(f"⚠️  Errore parsing riga: {e}")
@@ -212,45 +305,75 @@ class UBSImporter:
             raise ValueError(f"Giornale bancario ID {self.journal_id} non trovato")
 
         self.journal_info = journal_info
+        self.dedup_index: Optional[DedupIndex] = None
+        self.partner_index: Optional[PartnerIndex] = None
+        self.report: Optional[ImportReport] = None
+        self.verbose = True
         print(f"📁 Giornale selezionato: {journal_info['name']} ({journal_info['code']})")
 
-    def import_csv(self, csv_file_path: str, dry_run: bool = True) -> Dict:
+    def import_csv(self, csv_file_path: str, dry_run: bool = True, columnar: bool = False,
+                   chunk_size: int = None, dedup: bool = True, resume: bool = False,
+                   uploaders: int = None, ordered: bool = True, partners: bool = True,
+                   verify: bool = False, summary_only: bool = False, report_file: str = None,
+                   verbose: bool = True, statements: str = None) -> Dict:
         """
-        Importa movimenti da CSV UBS
+        Importa movimenti da CSV UBS (o estratto camt.053/camt.054 XML)
 
         Args:
-            csv_file_path: Percorso file CSV
+            csv_file_path: Percorso file CSV o XML camt
             dry_run: Se True, simula import senza salvare (default True)
+            columnar: Se True, carica l'estratto in un TransactionBatch compatto e
+                      verifica totali, duplicati e saldi prima dell'import
+            chunk_size: Movimenti per chiamata create (default config.IMPORT_CHUNK_SIZE)
+            dedup: Se True, salta i movimenti già presenti in Odoo o nell'indice locale
+            resume: Se True, riprende dall'ultimo blocco registrato nel checkpoint
+            uploaders: Thread che inviano i blocchi a Odoo mentre il file viene letto
+                       (default config.IMPORT_UPLOADERS, 0 = invio sincrono)
+            ordered: Se True, i blocchi vengono creati nell'ordine del file (un solo
+                     uploader); se False più uploader lavorano in parallelo sullo stesso giornale
+            partners: Se True, abbina le controparti ai partner Odoo (partner_id)
+            verify: Se True, esegue i controlli colonnari e non scrive nulla se i
+                    saldi non tornano (interruzioni, saldo iniziale diverso da Odoo)
+            summary_only: Se True, le statistiche tengono solo contatori e totali
+                          (nessun 'movements', righe originali non conservate)
+            report_file: File .jsonl o .csv in cui scrivere l'esito di ogni movimento
+            verbose: Se False, non stampa una riga per movimento
+            statements: Raggruppa le righe in estratti conto account.bank.statement
+                        per data contabile ('date') o per file ('file'), con saldi
+                        iniziale/finale dal Saldo (None = righe senza estratto)
 
         Returns:
             Dizionario con statistiche import
         """
-        stats = {
-            'file': csv_file_path,
-            'total_lines': 0,
-            'imported': 0,
-            'skipped': 0,
-            'errors': 0,
-            'dry_run': dry_run,
-            'movements': []
-        }
+        if statements not in (None, 'date', 'file'):
+            raise ValueError(f"Raggruppamento estratti non valido: {statements} (usa 'date' o 'file')")
+        columnar = columnar or verify
+        stats = self._new_stats(csv_file_path, dry_run, keep_movements=not summary_only)
 
         print(f"\n{'🔍 SIMULAZIONE' if dry_run else '💾 IMPORTAZIONE'} MOVIMENTI BANCARI UBS")
         print(f"{'='*70}\n")
 
         # Parsea CSV
         print(f"📄 Parsing file: {os.path.basename(csv_file_path)}")
-        parser = UBSCSVParser(csv_file_path)
+        parser = CamtParser(csv_file_path) if is_camt_file(csv_file_path) else UBSCSVParser(csv_file_path)
 
+        batch = None
         try:
-            header_info, transactions = parser.parse()
+            if columnar:
+                header_info, batch = parser.parse_batch()
+                transactions = iter(batch)
+            else:
+                # Lettura in streaming: il primo movimento forza il parsing dell'header
+                transactions = parser.iter_transactions(include_raw=not summary_only)
+                first = next(transactions, None)
+                if first is not None:
+                    transactions = itertools.chain([first], transactions)
+                header_info = parser.header_info
         except Exception as e:
-            print(f"❌ Errore parsing CSV: {e}")
+            print(f"❌ Errore parsing file: {e}")
             stats['errors'] += 1
             return stats
 
-        stats['total_lines'] = len(transactions)
-
         # Mostra info header
         print(f"\n📋 Info Account:")
         if 'IBAN' in header_info:
@@ -258,67 +381,741 @@ class UBSImporter:
         if 'Whrg.' in header_info:
             print(f"   Valuta: {header_info['Whrg.']}")
 
-        print(f"\n📊 Trovate {len(transactions)} transazioni")
+        if batch is not None:
+            stats['checks'] = self._print_batch_checks(batch, getattr(parser, 'balances', None))
+            if verify and not stats['checks']['passed'] and not dry_run:
+                print(f"\n❌ Verifica saldi fallita: nessun movimento scritto in Odoo")
+                print(f"   Controlla l'export o importa senza --verify")
+                stats['errors'] += 1
+                stats['verification_failed'] = True
+                return stats
+
+        # Indice duplicati: un'unica lettura delle righe Odoo del periodo dell'export
+        period = parser.period
+        if batch is not None and len(batch):
+            date_range = batch.date_range()
+            period = (date_range['from'], date_range['to'])
+        dedup_index = self._start_dedup(dedup, period)
+
+        # Checkpoint: ogni blocco elaborato viene registrato accanto al CSV
+        checkpoint = None
+        start_row = 0
+        if statements and resume:
+            print(f"\n⚠️  --resume non usato con gli estratti: i movimenti già importati vengono saltati dal controllo duplicati")
+        if not dry_run and not statements:
+            checkpoint = ImportCheckpoint(csv_file_path, self.journal_id)
+            start_row = checkpoint.begin(resume)
+            if checkpoint.pending and not dedup:
+                # Senza controllo duplicati le righe del blocco interrotto già in Odoo verrebbero ricreate
+                print(f"\n❌ Blocco {checkpoint.pending['chunk']} interrotto durante l'invio: "
+                      f"--resume richiede il controllo duplicati")
+                print(f"   Riprendi senza --no-dedup: python ubs_csv_importer.py {csv_file_path} --save --resume")
+                stats['errors'] += 1
+                stats['resume_refused'] = True
+                return stats
+            if resume and start_row:
+                stats['resumed_from_row'] = start_row + 1
+                print(f"\n⏩ Ripresa dalla riga {start_row + 1} (checkpoint: {os.path.basename(checkpoint.path)})")
+                if checkpoint.completed:
+                    print(f"   ✅ Import già completato in una sessione precedente")
+                if checkpoint.pending:
+                    print(f"   ⚠️  Blocco {checkpoint.pending['chunk']} interrotto durante l'invio: "
+                          f"le righe già create verranno saltate dal controllo duplicati")
+            elif resume:
+                print(f"\n⚠️  Nessun checkpoint valido per questo file: import dall'inizio")
+
+        partner_index = self.get_partner_index() if partners else None
+
+        self._start_report(report_file, verbose, stats)
+        try:
+            if statements:
+                self._import_statements(transactions, stats, dry_run, statements, chunk_size, dedup_index,
+                                        partner_index, getattr(parser, 'balances', None),
+                                        os.path.basename(csv_file_path))
+            else:
+                self._import_rows(transactions, stats, dry_run, chunk_size, dedup_index, checkpoint, start_row,
+                                  uploaders, ordered, partner_index)
+        except Exception as e:
+            # Errore di rete/server durante l'invio: l'import si ferma all'ultimo blocco salvato
+            print(f"\n❌ Import interrotto: {e}")
+            stats['errors'] += 1
+            stats['interrupted'] = True
+            if checkpoint:
+                print(f"   Ultima riga salvata: {checkpoint.last_row}. "
+                      f"Riprendi con: python ubs_csv_importer.py {csv_file_path} --save --resume")
+            return stats
+        finally:
+            self._finish_report()
+
+        if checkpoint:
+            checkpoint.finish(stats)
+
+        other_accounts = getattr(parser, 'other_accounts', None)
+        if other_accounts:
+            # camt multi-conto: solo il conto dell'header va in questo giornale
+            stats['other_accounts'] = dict(other_accounts)
+            for iban, count in other_accounts.items():
+                print(f"\n⚠️  Estratti di un altro conto ({iban}): {count} movimenti non importati in questo giornale")
+            print(f"   Importa la cartella che contiene il file (python ubs_csv_importer.py <cartella>) "
+                  f"per assegnarli ai rispettivi giornali")
+
+        self._print_summary(stats)
+        return stats
+
+    def import_transactions(self, transactions: Iterable[Dict], dry_run: bool = True, source: str = None,
+                            period: Tuple[str, str] = None, chunk_size: int = None, dedup: bool = True,
+                            uploaders: int = None, partners: bool = True, summary_only: bool = False,
+                            report_file: str = None, verbose: bool = True,
+                            file_starts: Iterable[int] = None) -> Dict:
+        """
+        Importa movimenti già parsati (es. più file dello stesso conto uniti in ordine)
+
+        Nessun checkpoint per file: un import ripetuto viene reso idempotente dal
+        controllo duplicati. Con file_starts ogni file ha i propri contatori di
+        occorrenza, così un movimento presente in due export sovrapposti viene
+        creato una volta sola.
+
+        Args:
+            transactions: Movimenti normalizzati nell'ordine di import
+            dry_run: Se True, simula import senza salvare (default True)
+            source: Descrizione origine per statistiche e messaggi
+            period: (data_da, data_a) ISO coperto dai movimenti (opzionale)
+            chunk_size: Movimenti per chiamata create (default config.IMPORT_CHUNK_SIZE)
+            dedup: Se True, salta i movimenti già importati
+            uploaders: Thread uploader in parallelo (default config.IMPORT_UPLOADERS)
+            partners: Se True, abbina le controparti ai partner Odoo (partner_id)
+            summary_only: Se True, le statistiche tengono solo contatori e totali
+            report_file: File .jsonl o .csv in cui scrivere l'esito di ogni movimento
+            verbose: Se False, non stampa una riga per movimento
+            file_starts: Numeri di riga (da 1) in cui inizia ciascun file unito
+
+        Returns:
+            Dizionario con statistiche import
+        """
+        stats = self._new_stats(source, dry_run, keep_movements=not summary_only)
+        print(f"\n{'🔍 SIMULAZIONE' if dry_run else '💾 IMPORTAZIONE'} {self.journal_info['name']}: {source}")
+
+        dedup_index = self._start_dedup(dedup, period)
+        partner_index = self.get_partner_index() if partners else None
+        self._start_report(report_file, verbose, stats)
+        try:
+            self._import_rows(transactions, stats, dry_run, chunk_size, dedup_index, uploaders=uploaders,
+                              partner_index=partner_index, file_starts=file_starts)
+        except Exception as e:
+            print(f"\n❌ Import interrotto: {e}")
+            stats['errors'] += 1
+            stats['interrupted'] = True
+            return stats
+        finally:
+            self._finish_report()
+
+        self._print_summary(stats)
+        return stats
+
+    @staticmethod
+    def _new_stats(source: Optional[str], dry_run: bool, keep_movements: bool = True) -> Dict:
+        """Statistiche iniziali di un import (senza 'movements' in modalità solo riepilogo)"""
+        stats = {
+            'file': source,
+            'total_lines': 0,
+            'imported': 0,
+            'skipped': 0,
+            'errors': 0,
+            'partners_matched': 0,
+            'credit_cents': 0,
+            'debit_cents': 0,
+            'dry_run': dry_run,
+        }
+        if keep_movements:
+            stats['movements'] = []
+        return stats
+
+    def _start_report(self, report_file: Optional[str], verbose: bool, stats: Dict) -> None:
+        """Apre il report per riga (se richiesto) e imposta l'output a console"""
+        self.verbose = verbose
+        self.report = ImportReport(report_file) if report_file else None
+        if self.report:
+            stats['report_file'] = report_file
+            print(f"📝 Esito per riga in: {report_file}")
+
+    def _finish_report(self) -> None:
+        """Chiude il report per riga"""
+        if self.report:
+            self.report.close()
+            self.report = None
+
+    def _start_dedup(self, dedup: bool, period: Optional[Tuple[str, str]]) -> Optional[DedupIndex]:
+        """Prepara l'indice duplicati leggendo in anticipo le righe Odoo del periodo"""
+        if not dedup:
+            return None
+        dedup_index = self.get_dedup_index()
+        dedup_index.start_import()
+        if period:
+            dedup_index.ensure_range(*period)
+        return dedup_index
+
+    def _import_rows(self, transactions: Iterable[Dict], stats: Dict, dry_run: bool, chunk_size: int = None,
+                     dedup_index: Optional[DedupIndex] = None, checkpoint: Optional[ImportCheckpoint] = None,
+                     start_row: int = 0, uploaders: int = None, ordered: bool = True,
+                     partner_index: Optional[PartnerIndex] = None, file_starts: Iterable[int] = None) -> None:
+        """
+        Importa i movimenti a blocchi (una chiamata create per blocco)
+
+        Args:
+            transactions: Movimenti normalizzati
+            stats: Statistiche import da aggiornare
+            dry_run: Se True, non crea nulla in Odoo
+            chunk_size: Movimenti per blocco (default config.IMPORT_CHUNK_SIZE)
+            dedup_index: Indice duplicati (None = nessun controllo)
+            checkpoint: Journal checkpoint (None = non registrato)
+            start_row: Righe già importate da saltare (ripresa da checkpoint)
+            uploaders: Thread uploader (default config.IMPORT_UPLOADERS, 0 = sincrono)
+            ordered: Se True, blocchi creati nell'ordine di lettura
+            partner_index: Indice partner per valorizzare partner_id (None = solo partner_name)
+            file_starts: Righe (da 1) in cui inizia un nuovo file (contatori duplicati azzerati)
+
+        Raises:
+            Exception: Errore di rete/server che interrompe l'import
+        """
+        chunk_size = chunk_size or config.IMPORT_CHUNK_SIZE
+        if uploaders is None:
+            uploaders = config.IMPORT_UPLOADERS
+
+        # Upload in parallelo al parsing: il file continua a essere letto mentre Odoo crea i blocchi
+        pipeline = None
+        if uploaders and not dry_run:
+            # Un solo giornale: in modalità ordinata i blocchi vanno tutti allo stesso uploader
+            pipeline = UploadPipeline(self.odoo, workers=uploaders, ordered=ordered, journals=1).start()
+            print(f"\n🚀 Upload in parallelo: {pipeline.workers} uploader"
+                  f"{'' if ordered else ' (ordine di creazione non garantito)'}")
+            if pipeline.workers < pipeline.requested_workers:
+                print(f"   ℹ️  {pipeline.requested_workers} uploader richiesti: con l'ordine del file garantito "
+                      f"un giornale usa un solo uploader (--unordered per usarli tutti)")
+
         print(f"\n{'─'*70}")
 
-        # Importa ogni transazione
-        for i, transaction in enumerate(transactions, 1):
-            try:
-                # Prepara dati per Odoo
-                odoo_data = {
-                    'journal_id': self.journal_id,
-                    'date': transaction['date'],
-                    'payment_ref': transaction['payment_ref'],
-                    'amount': transaction['amount'],
-                }
-
-                # Aggiungi campi opzionali se presenti
-                if transaction.get('partner_name'):
-                    odoo_data['partner_name'] = transaction['partner_name']
-
-                if transaction.get('ref'):
-                    odoo_data['ref'] = transaction['ref']
-
-                # Mostra movimento
+        chunk = []
+        chunk_first_row = start_row + 1
+        file_starts = set(file_starts or ())
+        try:
+            for i, transaction in enumerate(transactions, 1):
+                if i in file_starts and dedup_index:
+                    # Il blocco in corso appartiene al file precedente: diviso con i suoi contatori
+                    if i > chunk_first_row:
+                        self._flush_chunk(chunk, stats, dry_run, dedup_index, checkpoint, (chunk_first_row, i - 1),
+                                          pipeline)
+                        chunk = []
+                        chunk_first_row = i
+                    dedup_index.start_file()
+
+                stats['total_lines'] += 1
+
+                # Riga già importata in una sessione precedente
+                if i <= start_row:
+                    if dedup_index:
+                        # Mantiene allineati i contatori di occorrenza delle impronte
+                        dedup_index.keys_for(self._prepare_odoo_data(transaction))
+                    continue
+
+                odoo_data = self._prepare_row(transaction, stats, partner_index)
+                if odoo_data is not None:
+                    chunk.append(odoo_data)
+
+                if len(chunk) >= chunk_size:
+                    self._flush_chunk(chunk, stats, dry_run, dedup_index, checkpoint, (chunk_first_row, i),
+                                      pipeline)
+                    chunk = []
+                    chunk_first_row = i + 1
+
+            if stats['total_lines'] >= chunk_first_row:
+                self._flush_chunk(chunk, stats, dry_run, dedup_index, checkpoint,
+                                  (chunk_first_row, stats['total_lines']), pipeline)
+
+            if pipeline:
+                self._collect_uploads(pipeline.close(), stats, dedup_index, checkpoint)
+
+        except Exception:
+            if pipeline:
+                # Annulla i blocchi ancora in coda; quelli già creati restano nell'indice duplicati
+                pipeline.failed.set()
+                try:
+                    self._collect_uploads(pipeline.close(), stats, dedup_index, None)
+                except Exception:
+                    pass
+            raise
+
+    def _prepare_row(self, transaction: Dict, stats: Dict,
+                     partner_index: Optional[PartnerIndex] = None) -> Optional[Dict]:
+        """
+        Prepara un movimento per Odoo aggiornando contatori, console e report
+
+        Returns:
+            Valori account.bank.statement.line o None se la riga non è valida
+        """
+        try:
+            odoo_data = self._prepare_odoo_data(transaction, partner_index)
+            if odoo_data.get('partner_id'):
+                stats['partners_matched'] += 1
+            cents = to_cents(odoo_data['amount'])
+            stats['credit_cents' if cents > 0 else 'debit_cents'] += cents
+
+            # Mostra movimento
+            if self.verbose:
                 amount_str = f"CHF {transaction['amount']:>10.2f}"
                 status = "📗" if transaction['amount'] > 0 else "📕"
                 print(f"{status} {transaction['date']} | {amount_str} | {transaction['payment_ref'][:50]}")
 
-                # Importa in Odoo (se non dry_run)
-                if not dry_run:
-                    line_id = self.manager.create_statement_line(odoo_data)
-                    odoo_data['odoo_id'] = line_id
-                    print(f"   ✅ Importato con ID {line_id}")
-
-                stats['imported'] += 1
+            if 'movements' in stats:
                 stats['movements'].append(odoo_data)
+            return odoo_data
 
-            except Exception as e:
-                print(f"   ❌ Errore: {e}")
-                stats['errors'] += 1
+        except Exception as e:
+            print(f"   ❌ Errore: {e}")
+            stats['errors'] += 1
+            if self.report:
+                self.report.write(transaction, 'error', error=str(e))
+            return None
+
+    def _import_statements(self, transactions: Iterable[Dict], stats: Dict, dry_run: bool, group_by: str,
+                           chunk_size: int = None, dedup_index: Optional[DedupIndex] = None,
+                           partner_index: Optional[PartnerIndex] = None,
+                           statement_balances: Dict = None, source: str = None) -> None:
+        """
+        Importa i movimenti raggruppati in estratti conto (account.bank.statement)
+
+        Le righe di ogni gruppo (data contabile o intero file) vengono create
+        insieme al loro estratto con comandi (0, 0, vals); più estratti vengono
+        inviati nella stessa create fino a chunk_size righe. Saldo finale =
+        Saldo UBS dell'ultima riga del gruppo, saldo iniziale = finale - righe
+        del gruppo; senza Saldo per riga (camt) i saldi partono da OPBD.
+
+        Args:
+            transactions: Movimenti normalizzati
+            stats: Statistiche import da aggiornare
+            dry_run: Se True, non crea nulla in Odoo
+            group_by: 'date' (un estratto per data) o 'file' (un estratto per file)
+            chunk_size: Righe massime per chiamata create (default config.IMPORT_CHUNK_SIZE)
+            dedup_index: Indice duplicati (None = nessun controllo)
+            partner_index: Indice partner (None = solo partner_name)
+            statement_balances: Saldi camt (CamtParser.balances, opzionale)
+            source: Nome file (nome dell'estratto con group_by='file')
+
+        Raises:
+            Exception: Errore di rete/server che interrompe l'import
+        """
+        chunk_size = chunk_size or config.IMPORT_CHUNK_SIZE
+        stats['statements'] = 0
+
+        print(f"\n{'─'*70}")
+
+        # Gruppi in memoria: righe (valori Odoo, Saldo in centesimi) nell'ordine del file
+        rows: List[Tuple[Dict, Optional[int]]] = []
+        for transaction in transactions:
+            stats['total_lines'] += 1
+            odoo_data = self._prepare_row(transaction, stats, partner_index)
+            if odoo_data is not None:
+                rows.append((odoo_data, transaction.get('balance_cents')))
+        if not rows:
+            return
+
+        # Export UBS dal più recente: righe in ordine cronologico prima di raggruppare
+        if rows[0][0]['date'] > rows[-1][0]['date']:
+            rows.reverse()
+        rows.sort(key=lambda row: row[0]['date'])
+
+        groups: Dict[str, List[Tuple[Dict, Optional[int]]]] = {}
+        for row in rows:
+            groups.setdefault(row[0]['date'] if group_by == 'date' else source, []).append(row)
+
+        running = None
+        if statement_balances and 'OPBD' in statement_balances:
+            running = statement_balances['OPBD']['amount_cents']
+
+        pending: List[Tuple[Dict, List[str]]] = []
+        pending_lines = 0
+        for key, group in groups.items():
+            lines = [odoo_data for odoo_data, _ in group]
+            total = sum(to_cents(odoo_data['amount']) for odoo_data in lines)
+            end = group[-1][1]
+            if end is not None:
+                start = end - total
+            elif running is not None:
+                start, end = running, running + total
+            else:
+                start = None
+            running = end
+
+            fingerprints = None
+            if dedup_index:
+                dedup_index.ensure_range(lines[0]['date'], lines[-1]['date'])
+                new_lines, fingerprints, duplicates = dedup_index.split_new(lines)
+                for odoo_data in duplicates:
+                    odoo_data['duplicate'] = True
+                    if self.report:
+                        self.report.write(odoo_data, 'skipped')
+                if duplicates:
+                    stats['skipped'] += len(duplicates)
+                    print(f"   ⏭️  {key}: già importati, saltati: {len(duplicates)} righe")
+                    if not new_lines:
+                        continue
+                    # Estratto parziale: i saldi del gruppo completo non corrispondono alle righe nuove
+                    start = None
+                lines = new_lines
+
+            statement = {
+                'name': f"{self.journal_info['code']} {key}",
+                'date': lines[-1]['date'],
+                'journal_id': self.journal_id,
+                'lines': lines,
+            }
+            if start is not None:
+                statement['balance_start'] = cents_to_amount(start)
+                statement['balance_end_real'] = cents_to_amount(end)
+            pending.append((statement, fingerprints))
+            pending_lines += len(lines)
+
+            if pending_lines >= chunk_size:
+                self._flush_statements(pending, stats, dry_run, dedup_index)
+                pending, pending_lines = [], 0
+
+        self._flush_statements(pending, stats, dry_run, dedup_index)
+
+    def _flush_statements(self, pending: List[Tuple[Dict, Optional[List[str]]]], stats: Dict, dry_run: bool,
+                          dedup_index: Optional[DedupIndex] = None) -> None:
+        """Crea in Odoo un blocco di estratti con le loro righe e aggiorna le statistiche"""
+        if not pending:
+            return
 
-        # Riepilogo
+        if dry_run:
+            results = [(None, [None] * len(statement['lines']), None) for statement, _ in pending]
+        else:
+            results = self.manager.create_statements([statement for statement, _ in pending])
+
+        for (statement, fingerprints), (statement_id, line_ids, error) in zip(pending, results):
+            lines = statement['lines']
+            balances = ''
+            if 'balance_start' in statement:
+                balances = f", saldo {statement['balance_start']:.2f} → {statement['balance_end_real']:.2f}"
+
+            if error:
+                stats['errors'] += len(lines)
+                print(f"   ❌ Estratto {statement['name']} rifiutato ({len(lines)} righe): {error}")
+                for odoo_data in lines:
+                    odoo_data['error'] = error
+                    if self.report:
+                        self.report.write(odoo_data, 'error', error=error)
+                continue
+
+            stats['statements'] += 1
+            stats['imported'] += len(lines)
+            for odoo_data, line_id in zip(lines, line_ids):
+                if line_id:
+                    odoo_data['odoo_id'] = line_id
+                if self.report:
+                    self.report.write(odoo_data, 'imported' if line_id else 'simulated', line_id)
+            label = f"ID {statement_id}" if statement_id else "simulato"
+            print(f"   🧾 Estratto {statement['name']} ({label}): {len(lines)} righe{balances}")
+
+            if dedup_index and not dry_run:
+                dedup_index.record(lines, fingerprints)
+
+    def _print_summary(self, stats: Dict) -> None:
+        """Mostra il riepilogo finale di un import"""
         print(f"\n{'─'*70}")
+        print(f"\n📊 Trovate {stats['total_lines']} transazioni")
         print(f"\n📈 RIEPILOGO:")
         print(f"   Totale righe: {stats['total_lines']}")
         print(f"   Importate: {stats['imported']}")
+        if 'statements' in stats:
+            print(f"   Estratti conto: {stats['statements']}")
+        print(f"   Già presenti (saltate): {stats['skipped']}")
+        print(f"   Partner riconosciuti: {stats['partners_matched']}")
         print(f"   Errori: {stats['errors']}")
+        print(f"   Entrate: {stats['credit_cents'] / 100:.2f}   Uscite: {stats['debit_cents'] / 100:.2f}")
+        if stats.get('report_file'):
+            print(f"   Esito per riga: {stats['report_file']}")
 
-        if dry_run:
+        if stats['dry_run']:
             print(f"\n⚠️  MODALITÀ SIMULAZIONE - Nessun dato salvato in Odoo")
             print(f"   Esegui con dry_run=False per salvare realmente")
 
-        return stats
+    def _prepare_odoo_data(self, transaction: Dict, partner_index: Optional[PartnerIndex] = None) -> Dict:
+        """
+        Prepara i valori account.bank.statement.line di un movimento
+
+        Args:
+            transaction: Dizionario transazione normalizzato
+            partner_index: Indice partner (None = nessun abbinamento)
+
+        Returns:
+            Dizionario valori per Odoo
+        """
+        odoo_data = {
+            'journal_id': self.journal_id,
+            'date': transaction['date'],
+            'payment_ref': transaction['payment_ref'],
+            'amount': transaction_amount(transaction),
+        }
+
+        # Aggiungi campi opzionali se presenti
+        if transaction.get('partner_name'):
+            odoo_data['partner_name'] = transaction['partner_name']
+
+        if transaction.get('ref'):
+            odoo_data['ref'] = transaction['ref']
+
+        if transaction.get('partner_iban'):
+            odoo_data['account_number'] = transaction['partner_iban']
+
+        if partner_index:
+            partner_id = partner_index.resolve(transaction.get('partner_name'), transaction.get('partner_iban'),
+                                               transaction.get('payment_ref'))
+            if partner_id:
+                odoo_data['partner_id'] = partner_id
+
+        return odoo_data
+
+    def get_partner_index(self) -> PartnerIndex:
+        """
+        Restituisce l'indice partner (letto da Odoo alla prima richiesta)
+
+        Returns:
+            PartnerIndex condiviso da tutti gli import di questo importatore
+        """
+        if self.partner_index is None:
+            print(f"👥 Lettura partner e conti bancari da Odoo...")
+            self.partner_index = PartnerIndex(self.odoo).load()
+            print(f"   {len(self.partner_index.by_name)} nomi, {len(self.partner_index.by_iban)} IBAN")
+        return self.partner_index
+
+    def get_dedup_index(self) -> DedupIndex:
+        """
+        Restituisce l'indice duplicati del giornale (creato alla prima richiesta)
+
+        Returns:
+            DedupIndex condiviso da tutti gli import di questo importatore
+        """
+        if self.dedup_index is None:
+            self.dedup_index = DedupIndex(self.odoo, self.journal_id)
+        return self.dedup_index
+
+    def _flush_chunk(self, chunk: List[Dict], stats: Dict, dry_run: bool,
+                     dedup_index: Optional[DedupIndex] = None,
+                     checkpoint: Optional[ImportCheckpoint] = None,
+                     row_range: Tuple[int, int] = None,
+                     pipeline: Optional[UploadPipeline] = None) -> None:
+        """
+        Crea in Odoo un blocco di movimenti e aggiorna le statistiche
+
+        I movimenti già importati vengono saltati; gli ID restituiti da Odoo
+        vengono scritti in 'odoo_id' di ciascun movimento creato.
+
+        Args:
+            chunk: Valori dei movimenti da creare (nell'ordine del CSV)
+            stats: Statistiche import da aggiornare
+            dry_run: Se True, non crea nulla in Odoo
+            dedup_index: Indice duplicati (None = nessun controllo)
+            checkpoint: Journal checkpoint (None = non registrato)
+            row_range: Righe del file (prima, ultima) coperte dal blocco
+            pipeline: Uploader in parallelo (None = creazione sincrona)
+        """
+        fingerprints = None
+        if dedup_index and chunk:
+            dates = [odoo_data['date'] for odoo_data in chunk]
+            dedup_index.ensure_range(min(dates), max(dates))
+            chunk, fingerprints, duplicates = dedup_index.split_new(chunk)
+            for odoo_data in duplicates:
+                odoo_data['duplicate'] = True
+                if self.report:
+                    self.report.write(odoo_data, 'skipped')
+            if duplicates:
+                stats['skipped'] += len(duplicates)
+                print(f"   ⏭️  Già importati, saltati: {len(duplicates)} righe")
+
+        if dry_run:
+            stats['imported'] += len(chunk)
+            if self.report:
+                for odoo_data in chunk:
+                    self.report.write(odoo_data, 'simulated')
+            return
+
+        if pipeline and pipeline.failed.is_set():
+            # Un blocco precedente è fallito: attende quelli in volo e interrompe l'import
+            self._collect_uploads(pipeline.close(), stats, dedup_index, checkpoint)
+
+        if checkpoint:
+            checkpoint.mark_pending(*row_range)
+
+        if pipeline:
+            pipeline.submit(self.journal_id, chunk, (chunk, fingerprints, row_range))
+            self._collect_uploads(pipeline.completed(), stats, dedup_index, checkpoint)
+            return
+
+        results = self.manager.create_statement_lines(chunk)
+        self._apply_results(chunk, results, stats, dedup_index, fingerprints, checkpoint, row_range)
+
+    def _collect_uploads(self, jobs: List[UploadJob], stats: Dict,
+                         dedup_index: Optional[DedupIndex],
+                         checkpoint: Optional[ImportCheckpoint]) -> None:
+        """
+        Applica i risultati degli uploader nell'ordine di invio
+
+        Dopo un blocco fallito il checkpoint non avanza più: le righe create dai
+        blocchi successivi vengono solo registrate nell'indice duplicati, così
+        una ripresa non le crea di nuovo.
+
+        Args:
+            jobs: Blocchi completati (vedi UploadPipeline.completed)
+            stats: Statistiche import da aggiornare
+            dedup_index: Indice duplicati (None = nessun controllo)
+            checkpoint: Journal checkpoint (None = non registrato)
+
+        Raises:
+            Exception: Errore del primo blocco fallito
+        """
+        failure = None
+        for job in jobs:
+            chunk, fingerprints, row_range = job.context
+            if job.error:
+                failure = failure or job.error
+                continue
+            self._apply_results(chunk, job.results, stats, dedup_index, fingerprints,
+                                None if failure else checkpoint, row_range)
+        if failure:
+            raise Exception(failure)
+
+    def _apply_results(self, chunk: List[Dict], results: List[Tuple[Optional[int], Optional[str]]],
+                       stats: Dict, dedup_index: Optional[DedupIndex], fingerprints: Optional[List[str]],
+                       checkpoint: Optional[ImportCheckpoint], row_range: Tuple[int, int]) -> None:
+        """Registra l'esito di un blocco creato (statistiche, indice duplicati, checkpoint)"""
+        created = []
+        for odoo_data, (line_id, error) in zip(chunk, results):
+            if line_id:
+                odoo_data['odoo_id'] = line_id
+                created.append(line_id)
+                stats['imported'] += 1
+            else:
+                odoo_data['error'] = error
+                stats['errors'] += 1
+                print(f"   ❌ Errore {odoo_data['date']} {odoo_data['amount']:.2f}: {error}")
+            if self.report:
+                self.report.write(odoo_data, 'imported' if line_id else 'error', line_id, error)
+
+        if created:
+            print(f"   ✅ Blocco importato: {len(created)}/{len(chunk)} righe (ID {created[0]}..{created[-1]})")
+
+        if dedup_index and chunk:
+            dedup_index.record(chunk, fingerprints)
+
+        if checkpoint:
+            checkpoint.commit(*row_range, odoo_ids=created, errors=len(chunk) - len(created))
+
+    def _print_batch_checks(self, batch: TransactionBatch, statement_balances: Dict = None) -> Dict:
+        """
+        Esegue e mostra i controlli sull'intero estratto in formato colonnare
+
+        Oltre a totali e duplicati verifica i saldi: Saldo riportato contro la
+        somma progressiva degli importi, saldo iniziale contro l'ultimo saldo
+        del giornale in Odoo (una sola lettura) e, per i camt, saldo finale
+        contro il saldo di chiusura dell'estratto.
+
+        Args:
+            batch: Movimenti dell'estratto
+            statement_balances: Saldi dell'estratto camt (CamtParser.balances, opzionale)
 
+        Returns:
+            Riepilogo controlli (vedi TransactionBatch.summary) con 'odoo_balance'
+            e 'passed' (False se i saldi non tornano)
+        """
+        summary = batch.summary()
+        check = summary['balance_check']
+
+        odoo_balance = None
+        if summary['date_range']:
+            odoo_balance = self.manager.get_journal_balance(self.journal_id, summary['date_range']['from'])
+        summary['odoo_balance'] = odoo_balance
+
+        # camt: nessun saldo per movimento, si usano apertura (OPBD) e chiusura (CLBD) dell'estratto
+        if check['opening_cents'] is None and statement_balances and 'OPBD' in statement_balances:
+            check['opening_cents'] = statement_balances['OPBD']['amount_cents']
+            check['closing_cents'] = check['opening_cents'] + summary['total_cents']
+            if 'CLBD' in statement_balances:
+                check['closing_difference_cents'] = (statement_balances['CLBD']['amount_cents']
+                                                     - check['closing_cents'])
+        if odoo_balance and check['opening_cents'] is not None:
+            check['opening_difference_cents'] = check['opening_cents'] - odoo_balance['balance_cents']
+
+        summary['passed'] = not (check['gaps'] or check['opening_difference_cents']
+                                 or check.get('closing_difference_cents'))
+
+        print(f"\n🔎 Controlli estratto ({summary['count']} movimenti):")
+        if summary['date_range']:
+            print(f"   Periodo: {summary['date_range']['from']} → {summary['date_range']['to']}")
+        print(f"   Entrate: {summary['credit_cents'] / 100:>14.2f}")
+        print(f"   Uscite:  {summary['debit_cents'] / 100:>14.2f}")
+        print(f"   Netto:   {summary['total_cents'] / 100:>14.2f}")
+        if check['opening_cents'] is not None:
+            print(f"   Saldo iniziale: {check['opening_cents'] / 100:>14.2f}   "
+                  f"finale: {check['closing_cents'] / 100:>14.2f}")
+        if odoo_balance:
+            print(f"   Saldo Odoo al {odoo_balance['date']}: {odoo_balance['balance_cents'] / 100:>14.2f}")
+        if summary['duplicates']:
+            print(f"   ⚠️  Possibili duplicati: {len(summary['duplicates'])}")
+        for gap in check['gaps']:
+            print(f"   ⚠️  Saldo interrotto tra {gap['previous_date']} e {gap['date']}: "
+                  f"differenza {gap['difference_cents'] / 100:.2f} (movimenti mancanti?)")
+        if check['missing_days']:
+            print(f"   ⚠️  Giorni feriali senza movimenti nelle interruzioni: {', '.join(check['missing_days'][:10])}")
+        if check['opening_difference_cents']:
+            print(f"   ⚠️  Saldo iniziale diverso dal saldo Odoo: "
+                  f"differenza {check['opening_difference_cents'] / 100:.2f}")
+        if check.get('closing_difference_cents'):
+            print(f"   ⚠️  Saldo finale diverso dalla chiusura dell'estratto: "
+                  f"differenza {check['closing_difference_cents'] / 100:.2f}")
+        if summary['passed']:
+            print(f"   ✅ Saldi coerenti")
+
+        return summary
+
+
+def transaction_amount(transaction: Dict) -> float:
+    """
+    Importo da scrivere in Odoo, ricavato dai centesimi esatti quando disponibili
+
+    Args:
+        transaction: Dizionario transazione normalizzato
+
+    Returns:
+        Importo float per il campo monetario Odoo
+    """
+    cents = transaction.get('amount_cents')
+    return cents_to_amount(cents) if cents is not None else transaction['amount']
 
-def import_ubs_csv(csv_file: str, journal_id: int = None, dry_run: bool = True) -> Dict:
+
+def import_ubs_csv(csv_file: str, journal_id: int = None, dry_run: bool = True,
+                   columnar: bool = False, chunk_size: int = None, dedup: bool = True,
+                   resume: bool = False, uploaders: int = None, ordered: bool = True,
+                   partners: bool = True, verify: bool = False, summary_only: bool = False,
+                   report_file: str = None, verbose: bool = True, statements: str = None) -> Dict:
     """
     Funzione helper per importare CSV UBS
 
     Args:
-        csv_file: Percorso file CSV
+        csv_file: Percorso file CSV (o XML camt.053/camt.054)
         journal_id: ID giornale bancario (opzionale)
         dry_run: Se True, simula senza salvare
+        columnar: Se True, verifica l'intero estratto in formato colonnare prima dell'import
+        chunk_size: Movimenti per chiamata create (default config.IMPORT_CHUNK_SIZE)
+        dedup: Se True, salta i movimenti già importati
+        resume: Se True, riprende un import interrotto dal checkpoint
+        uploaders: Thread uploader in parallelo al parsing (default config.IMPORT_UPLOADERS)
+        ordered: Se False, più uploader creano blocchi dello stesso giornale in parallelo
+        partners: Se True, abbina le controparti ai partner Odoo
+        verify: Se True, non scrive nulla se la verifica dei saldi fallisce
+        summary_only: Se True, statistiche con soli contatori e totali
+        report_file: File .jsonl o .csv con l'esito di ogni movimento
+        verbose: Se False, non stampa una riga per movimento
+        statements: Crea estratti conto per data ('date') o per file ('file')
 
     Returns:
         Statistiche import
@@ -330,7 +1127,210 @@ def import_ubs_csv(csv_file: str, journal_id: int = None, dry_run: bool = True)
 
     # Importa
     importer = UBSImporter(odoo, journal_id)
-    return importer.import_csv(csv_file, dry_run)
+    return importer.import_csv(csv_file, dry_run, columnar=columnar, chunk_size=chunk_size, dedup=dedup,
+                               resume=resume, uploaders=uploaders, ordered=ordered, partners=partners,
+                               verify=verify, summary_only=summary_only, report_file=report_file,
+                               verbose=verbose, statements=statements)
+
+
+def expand_sources(sources: List[str]) -> List[str]:
+    """
+    Espande cartelle e pattern glob nei file estratto da importare
+
+    Args:
+        sources: Percorsi file, cartelle (tutti i .csv/.xml) o pattern (es. 'export/*.csv')
+
+    Returns:
+        Lista file ordinata e senza duplicati
+    """
+    files = []
+    for source in sources:
+        if os.path.isdir(source):
+            files.extend(os.path.join(source, name) for name in os.listdir(source)
+                         if name.lower().endswith(STATEMENT_EXTENSIONS))
+        elif glob.has_magic(source):
+            files.extend(glob.glob(source))
+        else:
+            files.append(source)
+    return sorted({os.path.abspath(f) for f in files if os.path.isfile(f)})
+
+
+def journal_for_iban(iban: Optional[str]) -> Optional[int]:
+    """
+    Trova il giornale bancario di un conto confrontando l'IBAN con GIORNALI_UBS
+
+    Args:
+        iban: IBAN dall'header dell'estratto (qualsiasi formato)
+
+    Returns:
+        ID giornale o None se il conto non è configurato
+    """
+    if not iban:
+        return None
+    iban = normalize_iban(iban)
+    for giornale in config.GIORNALI_UBS.values():
+        if normalize_iban(giornale.get('iban')) == iban:
+            return giornale['id']
+    return None
+
+
+def parse_statement_file(file_path: str) -> List[Dict]:
+    """
+    Parsa un file estratto (CSV o camt) in un processo separato
+
+    Restituisce solo dati serializzabili: movimenti senza 'raw_data'. Un camt
+    con estratti di più conti dà un risultato per conto.
+
+    Args:
+        file_path: Percorso file
+
+    Returns:
+        Lista di dizionari con file, iban, period, transactions ed eventuale error
+    """
+    try:
+        if not is_camt_file(file_path):
+            parser = UBSCSVParser(file_path)
+            transactions = list(parser.iter_transactions(include_raw=False))
+            return [_parsed_file(file_path, parser, transactions)]
+
+        parser = CamtParser(file_path)
+        results = [_parsed_file(file_path, parser, list(parser.iter_transactions(include_raw=False)))]
+        for iban in parser.other_accounts:
+            account_parser = CamtParser(file_path, account=iban)
+            results.append(_parsed_file(file_path, account_parser,
+                                        list(account_parser.iter_transactions(include_raw=False))))
+        return results
+    except Exception as e:
+        return [{'file': file_path, 'iban': None, 'period': None, 'transactions': [], 'error': str(e)}]
+
+
+def _parsed_file(file_path: str, parser, transactions: List[Dict]) -> Dict:
+    """Risultato di parse_statement_file per un conto"""
+    return {
+        'file': file_path,
+        'iban': parser.header_info.get('IBAN'),
+        'period': parser.period,
+        'transactions': transactions,
+        'error': None,
+    }
+
+
+def import_ubs_directory(sources: List[str], dry_run: bool = True, workers: int = None,
+                         chunk_size: int = None, dedup: bool = True, uploaders: int = None,
+                         partners: bool = True, verbose: bool = True) -> Dict:
+    """
+    Importa in un'unica esecuzione tutti gli estratti di più conti
+
+    I file vengono parsati in parallelo (ProcessPoolExecutor) e assegnati al
+    giornale tramite l'IBAN dell'header (un camt multi-conto a più giornali). Per ogni giornale i movimenti di tutti
+    i file vengono uniti in ordine (periodo, nome file) e inviati a blocchi;
+    i giornali vengono importati in parallelo, ognuno con la propria connessione.
+
+    Args:
+        sources: File, cartelle o pattern glob
+        dry_run: Se True, simula senza salvare
+        workers: Processi di parsing (default: numero CPU)
+        chunk_size: Movimenti per chiamata create (default config.IMPORT_CHUNK_SIZE)
+        dedup: Se True, salta i movimenti già importati
+        uploaders: Thread uploader per giornale (default config.IMPORT_UPLOADERS)
+        partners: Se True, abbina le controparti ai partner Odoo
+        verbose: Se False, non stampa una riga per movimento
+
+    Returns:
+        Statistiche (solo contatori e totali): file, file non assegnati, statistiche per giornale
+    """
+    files = expand_sources(sources)
+    summary = {'files': len(files), 'unrouted': [], 'parse_errors': [], 'journals': {}}
+    print(f"📂 File trovati: {len(files)}")
+    if not files:
+        return summary
+
+    # Parsing in parallelo: map mantiene l'ordine dei file
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        parsed = list(itertools.chain.from_iterable(pool.map(parse_statement_file, files)))
+
+    by_journal: Dict[int, List[Dict]] = {}
+    for result in parsed:
+        name = os.path.basename(result['file'])
+        if result['error']:
+            print(f"❌ {name}: {result['error']}")
+            summary['parse_errors'].append(result['file'])
+            continue
+        journal_id = journal_for_iban(result['iban'])
+        if journal_id is None:
+            print(f"⚠️  {name}: IBAN {result['iban'] or '-'} non presente in GIORNALI_UBS, file saltato")
+            summary['unrouted'].append(result['file'])
+            continue
+        by_journal.setdefault(journal_id, []).append(result)
+
+    odoo = OdooConnector()
+    if not odoo.connect():
+        raise Exception("Impossibile connettersi a Odoo")
+
+    def import_journal(journal_id: int, results: List[Dict]) -> Dict:
+        # Ordine di import: periodo dell'export (o prima data), poi nome file
+        results.sort(key=lambda r: (r['period'] or (min((t['date'] for t in r['transactions']), default=''), ''),
+                                    os.path.basename(r['file'])))
+        dates = [t['date'] for r in results for t in r['transactions']]
+        period = (min(dates), max(dates)) if dates else None
+
+        file_starts = list(itertools.accumulate([1] + [len(r['transactions']) for r in results[:-1]]))
+
+        connector = odoo.clone() if len(by_journal) > 1 else odoo
+        importer = UBSImporter(connector, journal_id)
+        stats = importer.import_transactions(
+            itertools.chain.from_iterable(r['transactions'] for r in results),
+            dry_run=dry_run,
+            source=f"{len(results)} file",
+            period=period,
+            chunk_size=chunk_size,
+            dedup=dedup,
+            uploaders=uploaders,
+            partners=partners,
+            summary_only=True,
+            verbose=verbose,
+            file_starts=file_starts,
+        )
+        stats['files'] = [r['file'] for r in results]
+        return stats
+
+    # Un thread per giornale: ordine garantito nel giornale, parallelismo tra giornali
+    with ThreadPoolExecutor(max_workers=max(1, len(by_journal))) as pool:
+        futures = {journal_id: pool.submit(import_journal, journal_id, results)
+                   for journal_id, results in by_journal.items()}
+        for journal_id, future in futures.items():
+            summary['journals'][journal_id] = future.result()
+
+    print(f"\n{'='*70}")
+    print(f"📈 RIEPILOGO CARTELLA: {len(files)} file")
+    for journal_id, stats in summary['journals'].items():
+        print(f"   Giornale {journal_id}: {len(stats['files'])} file, {stats['imported']} importati, "
+              f"{stats['skipped']} saltati, {stats['errors']} errori")
+    if summary['unrouted']:
+        print(f"   ⚠️  File senza giornale: {len(summary['unrouted'])}")
+    if summary['parse_errors']:
+        print(f"   ❌ File non leggibili: {len(summary['parse_errors'])}")
+
+    return summary
+
+
+def get_cli_option(argv: List[str], name: str, default=None):
+    """
+    Legge il valore di un'opzione da riga di comando (es. --chunk-size 500)
+
+    Args:
+        argv: Argomenti (sys.argv)
+        name: Nome opzione
+        default: Valore se l'opzione non è presente
+
+    Returns:
+        Valore stringa dell'opzione o default
+    """
+    if name in argv:
+        position = argv.index(name)
+        if position + 1 < len(argv):
+            return argv[position + 1]
+    return default
 
 
 if __name__ == "__main__":
@@ -339,8 +1339,24 @@ if __name__ == "__main__":
     print("🏦 IMPORTATORE MOVIMENTI BANCARI UBS → ODOO")
     print("="*70)
 
+    # Cartella o pattern: import di più file e più conti in un'unica esecuzione
+    if len(sys.argv) > 1 and (os.path.isdir(sys.argv[1]) or glob.has_magic(sys.argv[1])):
+        workers = get_cli_option(sys.argv, '--workers')
+        import_ubs_directory(
+            [sys.argv[1]],
+            dry_run='--save' not in sys.argv,
+            workers=int(workers) if workers else None,
+            chunk_size=int(get_cli_option(sys.argv, '--chunk-size', config.IMPORT_CHUNK_SIZE)),
+            dedup='--no-dedup' not in sys.argv,
+            uploaders=int(get_cli_option(sys.argv, '--uploaders', config.IMPORT_UPLOADERS)),
+            partners='--no-partners' not in sys.argv,
+            verbose='--quiet' not in sys.argv
+        )
+
+        print(f"\n✅ Completato!")
+
     # Se passato file CSV come argomento
-    if len(sys.argv) > 1:
+    elif len(sys.argv) > 1:
         csv_file = sys.argv[1]
         dry_run = '--save' not in sys.argv
 
@@ -349,7 +1365,22 @@ if __name__ == "__main__":
             sys.exit(1)
 
         # Importa
-        stats = import_ubs_csv(csv_file, dry_run=dry_run)
+        stats = import_ubs_csv(
+            csv_file,
+            dry_run=dry_run,
+            columnar='--check' in sys.argv,
+            chunk_size=int(get_cli_option(sys.argv, '--chunk-size', config.IMPORT_CHUNK_SIZE)),
+            dedup='--no-dedup' not in sys.argv,
+            resume='--resume' in sys.argv,
+            uploaders=int(get_cli_option(sys.argv, '--uploaders', config.IMPORT_UPLOADERS)),
+            ordered='--unordered' not in sys.argv,
+            partners='--no-partners' not in sys.argv,
+            verify='--verify' in sys.argv,
+            summary_only='--summary-only' in sys.argv,
+            report_file=get_cli_option(sys.argv, '--report'),
+            verbose='--quiet' not in sys.argv,
+            statements=get_cli_option(sys.argv, '--statements')
+        )
 
         print(f"\n✅ Completato!")
 
@@ -357,5 +1388,17 @@ if __name__ == "__main__":
         print("\nUSO:")
         print("  python ubs_csv_importer.py <file.csv>              # Simula import")
         print("  python ubs_csv_importer.py <file.csv> --save      # Importa realmente")
+        print("  python ubs_csv_importer.py <file.csv> --check     # Verifica totali/duplicati/saldi prima")
+        print("  python ubs_csv_importer.py <file.csv> --save --verify          # Non importare se i saldi non tornano")
+        print("  python ubs_csv_importer.py <file.csv> --save --chunk-size 1000  # Righe per chiamata create")
+        print("  python ubs_csv_importer.py <file.csv> --save --no-dedup        # Non saltare i già importati")
+        print("  python ubs_csv_importer.py <file.csv> --save --resume          # Riprendi import interrotto")
+        print("  python ubs_csv_importer.py <file.csv> --save --no-partners     # Non abbinare i partner Odoo")
+        print("  python ubs_csv_importer.py <file.csv> --save --uploaders 2     # Invio a Odoo in parallelo alla lettura")
+        print("  python ubs_csv_importer.py <file.csv> --summary-only --quiet --report esito.jsonl  # File grandi")
+        print("  python ubs_csv_importer.py <file.csv> --save --statements date # Un estratto conto per giorno")
+        print("  python ubs_csv_importer.py <estratto.xml> --save               # Estratto camt.053/camt.054")
+        print("  python ubs_csv_importer.py <cartella> --save --workers 4       # Tutti i file di tutti i conti")
+        print("  python ubs_csv_importer.py 'export/*.csv' --save               # File da pattern")
         print("\nESEMPIO:")
         print("  python ubs_csv_importer.py movimenti_ubs_2024.csv")
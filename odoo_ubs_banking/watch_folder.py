@@ -0,0 +1,324 @@
+"""
+Import automatico degli export UBS depositati in una cartella
+
+Processo sempre attivo: controlla la cartella di deposito, attende che ogni
+nuovo file sia completo (dimensione e data modifica invariate per
+WATCH_SETTLE_SECONDS) e lo importa nel giornale del suo IBAN. Connessione
+Odoo, indice duplicati e indice partner vengono creati una sola volta e
+riusati per tutti i file.
+
+Su Linux la cartella è osservata con inotify (nessuna dipendenza esterna);
+altrove, o se inotify non è disponibile, con un controllo ogni
+WATCH_POLL_SECONDS. Esito dei file:
+    archivio/AAAA-MM/<file>   importato senza errori
+    archivio/errori/<file>    IBAN sconosciuto, file illeggibile o righe rifiutate
+    (resta nella cartella)    import interrotto da errore di rete: ripreso dal
+                              checkpoint al controllo successivo
+
+USO:
+    python watch_folder.py <cartella>                 # Simulazione (non sposta i file)
+    python watch_folder.py <cartella> --save          # Importa e archivia
+    python watch_folder.py <cartella> --save --archive /srv/ubs/archivio --statements date
+"""
+
+import ctypes
+import ctypes.util
+import os
+import select
+import shutil
+import struct
+import time
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+
+import config
+from camt_parser import CamtParser, is_camt_file
+from odoo_connector import OdooConnector
+from ubs_csv_importer import UBSImporter, UBSCSVParser, STATEMENT_EXTENSIONS, journal_for_iban
+
+# Eventi inotify: file chiuso dopo scrittura, file spostato nella cartella
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class _INotify:
+    """Osservatore inotify minimo via libc (solo Linux)"""
+
+    def __init__(self, folder: str):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = libc.inotify_init()
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init fallito")
+        if libc.inotify_add_watch(self.fd, os.fsencode(folder), _IN_CLOSE_WRITE | _IN_MOVED_TO) < 0:
+            os.close(self.fd)
+            raise OSError(ctypes.get_errno(), f"inotify_add_watch fallito su {folder}")
+
+    def wait(self, timeout: float) -> bool:
+        """
+        Attende eventi sulla cartella
+
+        Returns:
+            True se è arrivato almeno un evento (letti e scartati)
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return False
+        data = os.read(self.fd, 64 * 1024)
+        # Solo il risveglio conta: la cartella viene comunque riletta
+        return len(data) >= _EVENT_HEADER.size
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def statement_iban(file_path: str) -> Optional[str]:
+    """
+    Legge l'IBAN dall'header di un export (solo l'inizio del file)
+
+    Args:
+        file_path: File CSV UBS o XML camt
+
+    Returns:
+        IBAN o None se non presente
+    """
+    parser = CamtParser(file_path) if is_camt_file(file_path) else UBSCSVParser(file_path)
+    next(parser.iter_transactions(include_raw=False), None)
+    return parser.header_info.get('IBAN')
+
+
+class FolderWatcher:
+    """Importa in automatico gli export UBS depositati in una cartella"""
+
+    def __init__(self, folder: str, connector: OdooConnector, archive_folder: str = None,
+                 dry_run: bool = True, poll_seconds: float = None, settle_seconds: float = None,
+                 import_options: Dict = None):
+        """
+        Inizializza osservatore
+
+        Args:
+            folder: Cartella di deposito degli export
+            connector: OdooConnector già connesso (riusato per tutti i file)
+            archive_folder: Cartella archivio (default <folder>/archivio)
+            dry_run: Se True, simula gli import e non sposta i file
+            poll_seconds: Intervallo di controllo senza inotify (default config.WATCH_POLL_SECONDS)
+            settle_seconds: Secondi senza modifiche prima dell'import (default config.WATCH_SETTLE_SECONDS)
+            import_options: Opzioni passate a UBSImporter.import_csv (es. statements, uploaders)
+        """
+        self.folder = os.path.abspath(folder)
+        self.archive_folder = os.path.abspath(archive_folder or os.path.join(self.folder, 'archivio'))
+        self.odoo = connector
+        self.dry_run = dry_run
+        self.poll_seconds = poll_seconds if poll_seconds is not None else config.WATCH_POLL_SECONDS
+        self.settle_seconds = settle_seconds if settle_seconds is not None else config.WATCH_SETTLE_SECONDS
+        self.import_options = import_options or {}
+
+        self._importers: Dict[int, UBSImporter] = {}
+        self._pending: Dict[str, Tuple[int, float, float]] = {}   # file -> (dimensione, mtime, stabile da)
+        self._done: Dict[str, Tuple[int, float]] = {}             # simulazione: file già elaborati
+        self._retry: Dict[str, float] = {}                        # import interrotti: riprova dopo
+        self.processed = 0
+
+    def run(self, max_files: int = None) -> None:
+        """
+        Ciclo principale (Ctrl+C per fermare)
+
+        Args:
+            max_files: Ferma dopo N file elaborati (default: mai)
+        """
+        watcher = None
+        try:
+            watcher = _INotify(self.folder)
+            mode = "inotify"
+        except (OSError, AttributeError):
+            mode = f"controllo ogni {self.poll_seconds:g}s"
+
+        print(f"👀 Cartella osservata: {self.folder} ({mode})")
+        print(f"   Archivio: {self.archive_folder}"
+              f"{' (simulazione: i file non vengono spostati)' if self.dry_run else ''}")
+
+        try:
+            while max_files is None or self.processed < max_files:
+                try:
+                    self.scan()
+                except Exception as e:
+                    # Cartella non raggiungibile o errore imprevisto: il servizio continua al prossimo controllo
+                    print(f"⚠️  Controllo cartella fallito: {e}")
+                # Con file in attesa di stabilizzarsi si ricontrolla presto anche con inotify
+                timeout = min(self.settle_seconds, self.poll_seconds) if self._pending else self.poll_seconds
+                if watcher:
+                    watcher.wait(timeout)
+                else:
+                    time.sleep(timeout)
+        except KeyboardInterrupt:
+            print(f"\n⏹️  Interrotto: {self.processed} file elaborati")
+        finally:
+            if watcher:
+                watcher.close()
+
+    def scan(self) -> int:
+        """
+        Rilegge la cartella e importa i file completi
+
+        Returns:
+            Numero di file elaborati in questo controllo
+        """
+        now = time.time()
+        seen = set()
+        processed = 0
+
+        for entry in sorted(os.scandir(self.folder), key=lambda e: e.name):
+            if not entry.is_file() or entry.name.startswith('.'):
+                continue
+            if not entry.name.lower().endswith(STATEMENT_EXTENSIONS):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue   # spostato o cancellato dopo la lettura della cartella
+            signature = (stat.st_size, stat.st_mtime)
+            seen.add(entry.path)
+
+            if self._done.get(entry.path) == signature or self._retry.get(entry.path, 0) > now:
+                continue
+
+            # Debounce: il file deve restare invariato per settle_seconds
+            previous = self._pending.get(entry.path)
+            if previous is None or previous[:2] != signature:
+                self._pending[entry.path] = (*signature, now)
+                continue
+            if now - previous[2] < self.settle_seconds or stat.st_size == 0:
+                continue
+
+            del self._pending[entry.path]
+            self.process_file(entry.path)
+            if os.path.exists(entry.path) and entry.path not in self._retry:
+                self._done[entry.path] = signature
+            processed += 1
+            self.processed += 1
+
+        # File spariti (spostati o cancellati da altri)
+        for path in list(self._pending):
+            if path not in seen:
+                del self._pending[path]
+        return processed
+
+    def process_file(self, file_path: str) -> Optional[Dict]:
+        """
+        Importa un file nel giornale del suo IBAN e lo archivia
+
+        Args:
+            file_path: File completo da importare
+
+        Returns:
+            Statistiche import o None se il file non è stato importato
+        """
+        name = os.path.basename(file_path)
+        print(f"\n📥 Nuovo file: {name}")
+
+        try:
+            iban = statement_iban(file_path)
+        except Exception as e:
+            print(f"❌ {name}: file non leggibile: {e}")
+            self._archive(file_path, 'errori')
+            return None
+
+        journal_id = journal_for_iban(iban)
+        if journal_id is None:
+            print(f"⚠️  {name}: IBAN {iban or '-'} non presente in GIORNALI_UBS")
+            self._archive(file_path, 'errori')
+            return None
+
+        try:
+            importer = self._importer(journal_id)
+            resume = os.path.exists(f"{file_path}.checkpoint.jsonl")
+            stats = importer.import_csv(file_path, dry_run=self.dry_run, resume=resume,
+                                        **self.import_options)
+        except Exception as e:
+            stats = {'interrupted': True, 'errors': 1}
+            print(f"❌ {name}: {e}")
+
+        if stats.get('interrupted'):
+            # Errore di rete/server: il file resta e viene ripreso dal checkpoint
+            print(f"🔁 {name}: nuovo tentativo tra {self.poll_seconds * 6:g}s")
+            self._retry[file_path] = time.time() + self.poll_seconds * 6
+            self._reconnect()
+            return stats
+
+        self._retry.pop(file_path, None)
+        self._archive(file_path, 'errori' if stats.get('errors') else datetime.now().strftime('%Y-%m'))
+        return stats
+
+    def _importer(self, journal_id: int) -> UBSImporter:
+        """Importatore del giornale (creato una volta, con indici duplicati e partner riusati)"""
+        if journal_id not in self._importers:
+            self._importers[journal_id] = UBSImporter(self.odoo, journal_id)
+        return self._importers[journal_id]
+
+    def _reconnect(self) -> None:
+        """Riautentica la connessione dopo un errore di rete"""
+        try:
+            self.odoo.connect()
+        except Exception as e:
+            print(f"⚠️  Riconnessione a Odoo fallita: {e}")
+
+    def _archive(self, file_path: str, subfolder: str) -> None:
+        """Sposta il file (e il suo checkpoint) nell'archivio (errori segnalati, non propagati)"""
+        if self.dry_run:
+            return
+        try:
+            target_folder = os.path.join(self.archive_folder, subfolder)
+            os.makedirs(target_folder, exist_ok=True)
+
+            base, extension = os.path.splitext(os.path.basename(file_path))
+            target = os.path.join(target_folder, base + extension)
+            counter = 1
+            while os.path.exists(target):
+                counter += 1
+                target = os.path.join(target_folder, f"{base}_{counter}{extension}")
+
+            shutil.move(file_path, target)
+            checkpoint = f"{file_path}.checkpoint.jsonl"
+            if os.path.exists(checkpoint):
+                shutil.move(checkpoint, f"{target}.checkpoint.jsonl")
+        except OSError as e:
+            # Il file resta nella cartella: non viene reimportato finché non cambia
+            print(f"⚠️  {os.path.basename(file_path)}: archiviazione fallita: {e}")
+            return
+        print(f"🗄️  Archiviato: {os.path.relpath(target, self.folder)}")
+
+
+if __name__ == "__main__":
+    import sys
+    from ubs_csv_importer import get_cli_option
+
+    folder = sys.argv[1] if len(sys.argv) > 1 and not sys.argv[1].startswith('--') else config.WATCH_FOLDER
+    if not folder or not os.path.isdir(folder):
+        print("USO: python watch_folder.py <cartella> [--save] [--archive <cartella>] [--statements date|file]")
+        print("     (oppure UBS_WATCH_FOLDER nel .env)")
+        sys.exit(1)
+
+    print("🏦 IMPORT AUTOMATICO MOVIMENTI BANCARI UBS → ODOO")
+    print("="*70)
+
+    odoo = OdooConnector()
+    if not odoo.connect():
+        sys.exit(1)
+
+    uploaders = get_cli_option(sys.argv, '--uploaders')
+    options = {
+        'summary_only': True,
+        'verbose': '--verbose' in sys.argv,
+        'verify': '--verify' in sys.argv,
+        'statements': get_cli_option(sys.argv, '--statements'),
+    }
+    if uploaders:
+        options['uploaders'] = int(uploaders)
+
+    FolderWatcher(
+        folder,
+        odoo,
+        archive_folder=get_cli_option(sys.argv, '--archive', config.WATCH_ARCHIVE_FOLDER or None),
+        dry_run='--save' not in sys.argv,
+        import_options=options,
+    ).run()
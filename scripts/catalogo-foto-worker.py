@@ -24,37 +24,72 @@ ODOO_USER = "paul@lapa.ch"
 ODOO_PASS = "admin123"
 
 
-def get_odoo_session():
+ODOO_SESSION_FILE = os.path.join(WORKING_DIR, ".catalogo-foto-odoo-session.json")
+ODOO_SESSION_TTL = 24 * 3600
+
+_odoo_session = {}
+
+
+def get_odoo_session(refresh=False):
+    """session_id Odoo riusato tra job ed esecuzioni (nuovo login solo se scaduto o rifiutato)"""
+    if not refresh:
+        if not _odoo_session:
+            try:
+                with open(ODOO_SESSION_FILE, "r", encoding="utf-8") as f:
+                    _odoo_session.update(json.load(f))
+            except (OSError, ValueError):
+                pass
+        if _odoo_session.get("db") == ODOO_DB and _odoo_session.get("expires", 0) > time.time():
+            return _odoo_session["session_id"]
+
     r = requests.post(f"{ODOO_URL}/web/session/authenticate", json={
         "jsonrpc": "2.0", "params": {"db": ODOO_DB, "login": ODOO_USER, "password": ODOO_PASS}
     }, timeout=15)
-    return r.cookies.get("session_id")
+    sid = r.cookies.get("session_id")
+    if not sid or r.json().get("error"):
+        raise RuntimeError("Odoo login failed")
+    _odoo_session.clear()
+    _odoo_session.update({"db": ODOO_DB, "session_id": sid, "expires": time.time() + ODOO_SESSION_TTL})
+    # session_id = credenziale: file leggibile solo dall'utente, scritto in modo atomico
+    temp_path = f"{ODOO_SESSION_FILE}.{os.getpid()}.tmp"
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w", encoding="utf-8") as f:
+            json.dump(_odoo_session, f)
+        os.replace(temp_path, ODOO_SESSION_FILE)
+    except OSError:
+        pass
+    return sid
+
+
+def odoo_call(model, method, args, kwargs=None):
+    """call_kw con la sessione in cache; se Odoo la rifiuta, nuovo login e un nuovo tentativo"""
+    payload = {
+        "jsonrpc": "2.0", "method": "call",
+        "params": {"model": model, "method": method, "args": args, "kwargs": kwargs or {}}
+    }
+    for refresh in (False, True):
+        r = requests.post(f"{ODOO_URL}/web/dataset/call_kw", json=payload,
+                          headers={"Content-Type": "application/json"},
+                          cookies={"session_id": get_odoo_session(refresh)}, timeout=15)
+        error = r.json().get("error")
+        if not error:
+            return r.json().get("result")
+        data = error.get("data") or {}
+        expired = "SessionExpired" in str(data.get("name", "")) or "Session Expired" in str(error.get("message", ""))
+        if not expired or refresh:
+            raise RuntimeError(data.get("message") or error.get("message", "Odoo error"))
 
 
 def add_catalogato_tag(product_id):
     """Add tag 'Catalogato App' (ID 316) to product.template via product.product ID"""
-    sid = get_odoo_session()
     # Get template ID from product.product
-    r = requests.post(f"{ODOO_URL}/web/dataset/call_kw", json={
-        "jsonrpc": "2.0", "method": "call",
-        "params": {
-            "model": "product.product", "method": "search_read",
-            "args": [[["id", "=", product_id]]],
-            "kwargs": {"fields": ["product_tmpl_id"], "limit": 1}
-        }
-    }, headers={"Content-Type": "application/json"}, cookies={"session_id": sid}, timeout=15)
-    tmpl_id = r.json().get("result", [{}])[0].get("product_tmpl_id", [None])[0]
+    products = odoo_call("product.product", "search_read", [[["id", "=", product_id]]],
+                         {"fields": ["product_tmpl_id"], "limit": 1})
+    tmpl_id = (products or [{}])[0].get("product_tmpl_id", [None])[0]
     if not tmpl_id:
         return
     # Add tag 316 to template
-    requests.post(f"{ODOO_URL}/web/dataset/call_kw", json={
-        "jsonrpc": "2.0", "method": "call",
-        "params": {
-            "model": "product.template", "method": "write",
-            "args": [[tmpl_id], {"product_tag_ids": [[4, 316]]}],
-            "kwargs": {}
-        }
-    }, headers={"Content-Type": "application/json"}, cookies={"session_id": sid}, timeout=15)
+    odoo_call("product.template", "write", [[tmpl_id], {"product_tag_ids": [[4, 316]]}])
 
 
 def log(msg):
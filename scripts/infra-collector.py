@@ -38,6 +38,10 @@ SSH_EXE = r"C:\Program Files\Git\usr\bin\ssh.exe"
 if not os.path.exists(SSH_EXE):
     SSH_EXE = "ssh"  # fallback
 
+# uid Odoo riusato tra esecuzioni (ogni 2 minuti): niente authenticate a ogni giro
+ODOO_SESSION_FILE = os.path.join(HOME_DIR, ".lapa-infra-odoo-session.json")
+ODOO_SESSION_TTL = 24 * 3600
+
 
 def ssh_cmd(host, cmd, timeout=SSH_TIMEOUT):
     try:
@@ -672,6 +676,57 @@ def build_summary(devices):
     }
 
 
+class OdooRPCError(RuntimeError):
+    """Errore restituito da Odoo JSON-RPC"""
+
+    def __init__(self, error):
+        data = error.get('data') or {}
+        super().__init__(data.get('message') or 'query error')
+        self.access_denied = str(data.get('name', '')).endswith('AccessDenied')
+
+
+def odoo_jsonrpc(odoo_url, service, method, args):
+    payload = {
+        'jsonrpc': '2.0', 'method': 'call',
+        'params': {'service': service, 'method': method, 'args': args},
+    }
+    req = urllib.request.Request(
+        f'{odoo_url}/jsonrpc',
+        data=json.dumps(payload).encode('utf-8'),
+        headers={'Content-Type': 'application/json'},
+        method='POST',
+    )
+    with urllib.request.urlopen(req, timeout=15) as resp:
+        res = json.loads(resp.read().decode('utf-8'))
+    if 'error' in res:
+        raise OdooRPCError(res['error'])
+    return res.get('result')
+
+
+def odoo_uid(odoo_url, odoo_db, odoo_user, odoo_pass, refresh=False):
+    """uid salvato dall'esecuzione precedente (se non scaduto) o nuovo authenticate"""
+    key = f'{odoo_url}|{odoo_db}|{odoo_user}'
+    try:
+        with open(ODOO_SESSION_FILE, 'r', encoding='utf-8') as f:
+            cached = json.load(f).get(key, {})
+    except (OSError, ValueError):
+        cached = {}
+    if not refresh and cached.get('expires', 0) > time.time():
+        return cached['uid']
+
+    uid = odoo_jsonrpc(odoo_url, 'common', 'authenticate', [odoo_db, odoo_user, odoo_pass, {}])
+    if not uid:
+        raise RuntimeError('Auth fallita')
+    temp_path = f'{ODOO_SESSION_FILE}.{os.getpid()}.tmp'
+    try:
+        with os.fdopen(os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'w', encoding='utf-8') as f:
+            json.dump({key: {'uid': uid, 'expires': time.time() + ODOO_SESSION_TTL}}, f)
+        os.replace(temp_path, ODOO_SESSION_FILE)
+    except OSError:
+        pass
+    return uid
+
+
 def main():
     print(f"[{datetime.now().strftime('%H:%M:%S')}] LAPA Infra Collector starting...")
     start = time.time()
@@ -720,47 +775,21 @@ def main():
     odoo_user = os.environ.get('ODOO_USERNAME', 'paul@lapa.ch')
     odoo_pass = os.environ.get('ODOO_PASSWORD', '__REDACTED__')
     try:
-        # 1) authenticate
-        auth_payload = {
-            'jsonrpc': '2.0', 'method': 'call',
-            'params': {
-                'service': 'common', 'method': 'authenticate',
-                'args': [odoo_db, odoo_user, odoo_pass, {}],
-            },
-        }
-        req = urllib.request.Request(
-            f'{odoo_url}/jsonrpc',
-            data=json.dumps(auth_payload).encode('utf-8'),
-            headers={'Content-Type': 'application/json'},
-            method='POST',
-        )
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            auth_res = json.loads(resp.read().decode('utf-8'))
-        uid = auth_res.get('result')
-        if not uid:
-            raise RuntimeError('Auth fallita')
+        # 1) authenticate (uid in cache dall'esecuzione precedente)
+        uid = odoo_uid(odoo_url, odoo_db, odoo_user, odoo_pass)
         # 2) search_count ordini creati oggi (UTC 00:00)
         today_utc = datetime.now(timezone.utc).strftime('%Y-%m-%d 00:00:00')
-        count_payload = {
-            'jsonrpc': '2.0', 'method': 'call',
-            'params': {
-                'service': 'object', 'method': 'execute_kw',
-                'args': [odoo_db, uid, odoo_pass, 'sale.order', 'search_count',
-                         [[['create_date', '>=', today_utc]]]],
-            },
-        }
-        req = urllib.request.Request(
-            f'{odoo_url}/jsonrpc',
-            data=json.dumps(count_payload).encode('utf-8'),
-            headers={'Content-Type': 'application/json'},
-            method='POST',
-        )
-        with urllib.request.urlopen(req, timeout=15) as resp:
-            count_res = json.loads(resp.read().decode('utf-8'))
-        if 'error' in count_res:
-            raise RuntimeError(count_res['error'].get('data', {}).get('message', 'query error'))
+        count_args = ['sale.order', 'search_count', [[['create_date', '>=', today_utc]]]]
+        try:
+            count = odoo_jsonrpc(odoo_url, 'object', 'execute_kw', [odoo_db, uid, odoo_pass, *count_args])
+        except OdooRPCError as e:
+            if not e.access_denied:
+                raise
+            # uid in cache rifiutato: nuova autenticazione e nuovo tentativo
+            uid = odoo_uid(odoo_url, odoo_db, odoo_user, odoo_pass, refresh=True)
+            count = odoo_jsonrpc(odoo_url, 'object', 'execute_kw', [odoo_db, uid, odoo_pass, *count_args])
         odoo['connected'] = True
-        odoo['ordersToday'] = int(count_res.get('result', 0))
+        odoo['ordersToday'] = int(count or 0)
         odoo['details'] = f'Odoo OK, {odoo["ordersToday"]} ordini oggi'
     except Exception as e:
         odoo['connected'] = False